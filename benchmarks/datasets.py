@@ -0,0 +1,56 @@
+"""Generate synthetic BIDS datasets to run bids2cite on."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from bids2cite._authors import orcid_check_digit
+
+
+def synthetic_orcid(index: int) -> str:
+    """Return a valid ORCID iD built from an index."""
+    base = f"0000000{index:08d}"
+    digits = base + orcid_check_digit(base)
+    return "-".join(digits[i : i + 4] for i in range(0, 16, 4))
+
+
+def synthetic_ds_desc(n_authors: int, n_references: int) -> dict[str, object]:
+    """Return a dataset description with authors and references to resolve.
+
+    All authors have an ORCID iD,
+    references alternate between DOIs (Crossref) and PMIDs (PubMed).
+    """
+    authors = [
+        f"Given{i} Family{i}, ORCID:{synthetic_orcid(i)}" for i in range(n_authors)
+    ]
+    references = [
+        f"Reference {i}; doi:10.5555/synthetic.{i}"
+        if i % 2 == 0
+        else f"Reference {i}; pmid:{10_000_000 + i}"
+        for i in range(n_references)
+    ]
+    return {
+        "Name": f"Synthetic dataset with {n_authors} authors",
+        "BIDSVersion": "1.8.0",
+        "DatasetType": "raw",
+        # not bundled with bids2cite: its text is requested from GitHub
+        "License": "MIT",
+        "Authors": authors,
+        "Funding": [f"Grant {i}" for i in range(3)],
+        "ReferencesAndLinks": references,
+    }
+
+
+def make_dataset(root: Path, n_authors: int, n_references: int | None = None) -> Path:
+    """Create a dataset with n_authors authors and n_references references.
+
+    :param n_references: Defaults to n_authors.
+    """
+    if n_references is None:
+        n_references = n_authors
+    root.mkdir(parents=True, exist_ok=True)
+    ds_desc = synthetic_ds_desc(n_authors, n_references)
+    with (root / "dataset_description.json").open("w", encoding="utf-8") as f:
+        json.dump(ds_desc, f, indent=4)
+    return root
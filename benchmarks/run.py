@@ -0,0 +1,197 @@
+"""Benchmark bids2cite against local stand-in servers.
+
+Run from the root of the repository::
+
+    python -m benchmarks.run --sizes 1 10 100 --latency 0.02 --output results.json
+
+For each dataset size (number of authors and of references),
+the wall time, number of requests per service and peak memory of each stage
+are reported, then the same for a complete run of bids2cite().
+The lookup cache is disabled so every run starts cold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.datasets import make_dataset
+from benchmarks.stubs import StubServers
+from bids2cite._authors import update_authors
+from bids2cite._cache import configure_cache
+from bids2cite._http import configure_http
+from bids2cite._license import update_license
+from bids2cite._references import update_references
+from bids2cite._writers import WRITERS, Metadata, write_outputs
+from bids2cite.bids2cite import bids2cite
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 5000]
+
+
+def measure(
+    func: Callable[[], Any], servers: StubServers, trace_memory: bool = True
+) -> tuple[Any, dict[str, Any]]:
+    """Run a function and return its result, duration, requests and peak memory."""
+    before = servers.request_counts()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    after = servers.request_counts()
+    return result, {
+        "duration": round(duration, 4),
+        "requests": {name: after[name] - before[name] for name in after},
+        "peak_memory": peak,
+    }
+
+
+def benchmark_size(
+    size: int,
+    servers: StubServers,
+    directory: Path,
+    max_workers: int = 8,
+    trace_memory: bool = True,
+) -> dict[str, dict[str, Any]]:
+    """Benchmark each stage of bids2cite on a dataset with size authors and references."""
+    bids_dir = make_dataset(directory / f"ds-{size}", n_authors=size)
+    output_dir = bids_dir / "derivatives" / "bids2cite"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ds_desc = json.loads((bids_dir / "dataset_description.json").read_text())
+
+    results = {}
+    authors, results["authors"] = measure(
+        lambda: update_authors(ds_desc, True, max_workers=max_workers),
+        servers,
+        trace_memory,
+    )
+    references, results["references"] = measure(
+        lambda: update_references(ds_desc, True), servers, trace_memory
+    )
+    (license_name, license_url), results["license"] = measure(
+        lambda: update_license(bids_dir, output_dir, ds_desc, True), servers, trace_memory
+    )
+    metadata = Metadata(
+        name=ds_desc["Name"],
+        authors=authors,
+        references=references,
+        funding=ds_desc["Funding"],
+        license_name=license_name,
+        license_url=license_url,
+    )
+    _, results["outputs"] = measure(
+        lambda: write_outputs(
+            metadata, output_dir, list(WRITERS), write=lambda path, x: path.write_text(x)
+        ),
+        servers,
+        trace_memory,
+    )
+    _, results["bids2cite"] = measure(
+        lambda: bids2cite(
+            bids_dir,
+            output_format="all",
+            skip_prompt=True,
+            max_workers=max_workers,
+            use_cache=False,
+            force=True,
+        ),
+        servers,
+        trace_memory,
+    )
+    return results
+
+
+def run_benchmarks(
+    sizes: list[int],
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+    max_workers: int = 8,
+    trace_memory: bool = True,
+) -> list[dict[str, Any]]:
+    """Benchmark bids2cite for several dataset sizes.
+
+    :return: One record per size and stage.
+    """
+    configure_cache(enabled=False)
+    records = []
+    with StubServers(latency, error_rate, seed) as servers:
+        configure_http(endpoints=servers.endpoints)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for size in sizes:
+                    results = benchmark_size(
+                        size, servers, Path(tmp), max_workers, trace_memory
+                    )
+                    records.extend(
+                        {"size": size, "stage": stage, **metrics}
+                        for stage, metrics in results.items()
+                    )
+        finally:
+            configure_http()
+    return records
+
+
+def print_records(records: list[dict[str, Any]]) -> None:
+    print(f"{'size':>6}  {'stage':<11} {'time (s)':>9}  {'peak (MB)':>9}  requests")
+    for x in records:
+        peak = "" if x["peak_memory"] is None else f"{x['peak_memory'] / 2**20:.1f}"
+        requests = ", ".join(f"{k}={v}" for k, v in x["requests"].items() if v)
+        duration = f"{x['duration']:.3f}"
+        print(f"{x['size']:>6}  {x['stage']:<11} {duration:>9}  {peak:>9}  {requests}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Numbers of authors and references of the synthetic datasets.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds before each answer."
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with a 503 error.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Do not trace memory (tracing slows down the stages).",
+    )
+    parser.add_argument("--output", help="JSON file where to save the results.")
+    args = parser.parse_args(argv)
+
+    records = run_benchmarks(
+        sizes=args.sizes,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        max_workers=args.max_workers,
+        trace_memory=not args.no_memory,
+    )
+    print_records(records)
+    if args.output:
+        Path(args.output).write_text(json.dumps(records, indent=4))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Local stand-in servers for the services bids2cite queries.
+
+Each server answers like the real API for the parts bids2cite uses:
+
+- ORCID: ``/v3.0/{orcid}/record``, ``/v3.0/{orcid}/person``
+  and ``/v3.0/{orcid}/employments``
+- Crossref: ``/works/{doi}``
+- NCBI: ``/entrez/eutils/esummary.fcgi?db=pubmed&id=...``
+- GitHub: ``/licenses/{key}``
+
+Answers are generated from the identifiers, so any identifier can be resolved.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlparse
+
+# public base URLs of the services and the name of their stand-in
+PUBLIC_URLS = {
+    "orcid": "https://pub.orcid.org",
+    "crossref": "https://api.crossref.org",
+    "ncbi": "https://eutils.ncbi.nlm.nih.gov",
+    "github": "https://api.github.com",
+}
+
+
+def orcid_work(orcid: str, index: int) -> dict[str, Any]:
+    """Summary of a work as listed in the works section of an ORCID record."""
+    doi = f"10.5555/{orcid}.{index}"
+    return {
+        "last-modified-date": {"value": 1577836800000},
+        "external-ids": {
+            "external-id": [
+                {
+                    "external-id-type": "doi",
+                    "external-id-value": doi,
+                    "external-id-url": {"value": f"https://doi.org/{doi}"},
+                    "external-id-relationship": "self",
+                }
+            ]
+        },
+        "work-summary": [
+            {
+                "put-code": index,
+                "title": {"title": {"value": f"Title of work {index} of {orcid}"}},
+                "type": "journal-article",
+                "publication-date": {"year": {"value": "2020"}},
+                "journal-title": {"value": "Journal of Synthetic Data"},
+                "visibility": "public",
+                "path": f"/{orcid}/work/{index}",
+            }
+        ],
+    }
+
+
+def orcid_record(orcid: str) -> dict[str, Any]:
+    """Full ORCID record, with a number of works that depends on the ORCID iD."""
+    number = int(orcid.replace("-", "")[-6:-1])
+    return {
+        "orcid-identifier": {"path": orcid},
+        "person": {
+            "name": {
+                "given-names": {"value": f"Given{number}"},
+                "family-name": {"value": f"Family{number}"},
+            },
+            "path": f"/{orcid}/person",
+        },
+        "activities-summary": {
+            "employments": {
+                "affiliation-group": [
+                    {
+                        "summaries": [
+                            {
+                                "employment-summary": {
+                                    "organization": {"name": f"University {number % 50}"},
+                                    "role-title": "Researcher",
+                                }
+                            }
+                        ]
+                    }
+                ],
+                "path": f"/{orcid}/employments",
+            },
+            "works": {
+                "group": [orcid_work(orcid, i) for i in range(20 + number % 100)],
+                "path": f"/{orcid}/works",
+            },
+        },
+    }
+
+
+def crossref_work(doi: str) -> dict[str, Any]:
+    return {
+        "status": "ok",
+        "message": {
+            "DOI": doi,
+            "title": [f"Title of {doi}"],
+            "short-container-title": ["J. Synth."],
+            "created": {"date-parts": [[2020, 1, 1]]},
+            "author": [{"given": f"Given{i}", "family": f"Family{i}"} for i in range(8)],
+        },
+    }
+
+
+def pubmed_summary(pmid: str) -> dict[str, Any]:
+    return {
+        "uid": pmid,
+        "title": f"Title of {pmid}",
+        "fulljournalname": "Journal of Synthetic Data",
+        "pubdate": "2020 Jan 1",
+        "authors": [{"name": f"Family{i} G"} for i in range(8)],
+        "articleids": [
+            {"idtype": "pubmed", "value": pmid},
+            {"idtype": "doi", "value": f"10.5555/{pmid}"},
+        ],
+    }
+
+
+def github_license(key: str) -> dict[str, Any]:
+    return {
+        "key": key,
+        "body": f"{key} license\n\n" + "Lorem ipsum dolor sit amet. " * 200,
+    }
+
+
+def _orcid(path: str, _: dict[str, list[str]]) -> Any:
+    if match := re.fullmatch(r"/v3\.0/([0-9X-]{19})/record", path):
+        return orcid_record(match[1])
+    if match := re.fullmatch(r"/v3\.0/([0-9X-]{19})/person", path):
+        return orcid_record(match[1])["person"]
+    if match := re.fullmatch(r"/v3\.0/([0-9X-]{19})/employments", path):
+        return orcid_record(match[1])["activities-summary"]["employments"]
+    return None
+
+
+def _crossref(path: str, _: dict[str, list[str]]) -> Any:
+    if path.startswith("/works/"):
+        return crossref_work(unquote(path[len("/works/") :]))
+    return None
+
+
+def _ncbi(path: str, query: dict[str, list[str]]) -> Any:
+    if path != "/entrez/eutils/esummary.fcgi":
+        return None
+    pmids = ",".join(query.get("id", [])).split(",")
+    result: dict[str, Any] = {"uids": pmids}
+    result.update({pmid: pubmed_summary(pmid) for pmid in pmids})
+    return {"result": result}
+
+
+def _github(path: str, _: dict[str, list[str]]) -> Any:
+    if path.startswith("/licenses/"):
+        return github_license(path[len("/licenses/") :])
+    return None
+
+
+ROUTES: dict[str, Callable[[str, dict[str, list[str]]], Any]] = {
+    "orcid": _orcid,
+    "crossref": _crossref,
+    "ncbi": _ncbi,
+    "github": _github,
+}
+
+
+class StubServer:
+    """Stand-in for one service, running in a background thread.
+
+    :param service: One of 'orcid', 'crossref', 'ncbi', 'github'.
+    :param latency: Seconds to wait before answering each request.
+    :param error_rate: Fraction of requests answered with a 503 error.
+    :param seed: Seed of the random generator deciding which requests fail.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.service = service
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests: Counter[str] = Counter()
+        # paths requested, without query
+        self.paths: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+        route = ROUTES[self.service]
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.requests["total"] += 1
+                    failed = stub._random.random() < stub.error_rate
+                    if failed:
+                        stub.requests["errors"] += 1
+
+                if failed:
+                    self._send(503, b"", {"Retry-After": "0"})
+                    return
+
+                url = urlparse(self.path)
+                with stub._lock:
+                    stub.paths[url.path] += 1
+                content = route(url.path, parse_qs(url.query))
+                if content is None:
+                    self._send(404, b"{}")
+                    return
+                self._send(200, json.dumps(content).encode())
+
+            def _send(
+                self, status: int, body: bytes, headers: dict[str, str] | None = None
+            ) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> StubServer:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StubServers:
+    """Stand-ins for all the services, to use as a context manager.
+
+    >>> with StubServers(latency=0.01) as servers:
+    ...     configure_http(endpoints=servers.endpoints)
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.servers = {
+            service: StubServer(service, latency, error_rate, seed) for service in ROUTES
+        }
+
+    @property
+    def endpoints(self) -> dict[str, str]:
+        """Endpoint overrides to pass to bids2cite._http.configure_http."""
+        return {PUBLIC_URLS[name]: server.url for name, server in self.servers.items()}
+
+    def request_counts(self) -> dict[str, int]:
+        """Number of requests received by each service so far."""
+        return {name: server.requests["total"] for name, server in self.servers.items()}
+
+    def __enter__(self) -> StubServers:
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        for server in self.servers.values():
+            server.stop()
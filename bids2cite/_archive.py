@@ -0,0 +1,144 @@
+"""Archive of HTTP responses to record a run and replay it without network.
+
+An archive is a JSON file (gzip compressed if its name ends with '.gz')
+mapping each request (method and URL with sorted query parameters)
+to the status, content type and body of its response
+(JSON bodies are stored as JSON).
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import io
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+if TYPE_CHECKING:
+    import requests
+
+log = logging.getLogger("bids2datacite")
+
+ARCHIVE_VERSION = 1
+
+
+def request_key(method: str, url: str, params: dict[str, Any] | None = None) -> str:
+    """Return the key of a request in an archive.
+
+    The query parameters (from the URL and params) are sorted,
+    so the same request always has the same key.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query.extend((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+    url = urlunsplit(parts._replace(query=urlencode(sorted(query)), fragment=""))
+    return f"{method.upper()} {url}"
+
+
+class HttpArchive:
+    """Responses recorded during a run, indexed by request.
+
+    :param path: File where the archive is read from and saved to.
+    :type path: Path
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path: Path) -> HttpArchive:
+        """Read an archive.
+
+        Raises FileNotFoundError if the file does not exist
+        and ValueError if it is not an archive of this version of bids2cite.
+        """
+        archive = cls(path)
+        opener = gzip.open if archive.path.suffix == ".gz" else open
+        with opener(archive.path, "rt", encoding="utf-8") as f:
+            try:
+                content = json.load(f)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path} is not an HTTP archive: {exc}") from exc
+        if not isinstance(content, dict) or content.get("version") != ARCHIVE_VERSION:
+            raise ValueError(
+                f"{path} is not an HTTP archive of version {ARCHIVE_VERSION}."
+            )
+        archive.entries = content["entries"]
+        return archive
+
+    def save(self) -> None:
+        """Write the archive, entries sorted by request."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            content = {
+                "version": ARCHIVE_VERSION,
+                "entries": dict(sorted(self.entries.items())),
+            }
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "wt", encoding="utf-8") as f:
+            json.dump(
+                content,
+                f,
+                indent=None if self.path.suffix == ".gz" else 2,
+                ensure_ascii=False,
+            )
+            f.write("\n")
+        log.info(f"{len(self)} responses saved to {self.path}")
+
+    def add(self, key: str, response: requests.Response) -> None:
+        """Record the response to a request (replaces any previous one)."""
+        entry: dict[str, Any] = {
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", ""),
+        }
+        try:
+            body = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(response.content).decode("ascii")
+        else:
+            entry["body"] = body
+            # JSON answers are stored as is to keep archives readable
+            if "json" in entry["content_type"]:
+                try:
+                    entry["json"] = json.loads(body)
+                    del entry["body"]
+                except json.JSONDecodeError:
+                    pass
+        with self._lock:
+            self.entries[key] = entry
+
+    def response(self, key: str) -> requests.Response:
+        """Return the recorded response to a request.
+
+        Raises requests.ConnectionError if the request was not recorded,
+        as if the service could not be reached.
+        """
+        import requests
+
+        if (entry := self.entries.get(key)) is None:
+            raise requests.ConnectionError(f"no response recorded for '{key}'")
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        if "json" in entry:
+            body = json.dumps(entry["json"]).encode("utf-8")
+        elif "body_base64" in entry:
+            body = base64.b64decode(entry["body_base64"])
+        else:
+            body = entry["body"].encode("utf-8")
+        # read like the content of a real response, streamed or not
+        response.raw = io.BytesIO(body)
+        if entry["content_type"]:
+            response.headers["Content-Type"] = entry["content_type"]
+        response.encoding = "utf-8"
+        response.url = key.split(" ", 1)[1]
+        return response
@@ -2,29 +2,70 @@
 
 from __future__ import annotations
 
+import bisect
+import csv
+import difflib
+import functools
+import itertools
 import logging
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
-
-import pandas as pd
-import requests
-from rich.prompt import Prompt
+from typing import TYPE_CHECKING, Any
 
+from bids2cite._cache import cached
+from bids2cite._deadline import not_enriched, submit
+from bids2cite._http import http_get
+from bids2cite._orcid_index import get_orcid_index
 from bids2cite._utils import VALID_RESPONSE, print_ordered_list, prompt_format
 
+if TYPE_CHECKING:
+    import requests
+
 log = logging.getLogger("bids2datacite")
 
+DEFAULT_MAX_WORKERS = 8
+
+# number of potential authors shown at once when selecting an author
+ROSTER_PAGE_SIZE = 20
+
+ORCID_API_URL = "https://pub.orcid.org/v3.0"
+
+# ORCID iD with or without hyphens, anywhere in a string:
+# bare, prefixed by 'ORCID:' or as part of an orcid.org URL
+ORCID_PATTERN = re.compile(
+    r"(?<![0-9X-])(\d{4})-?(\d{4})-?(\d{4})-?(\d{3}[0-9X])(?![0-9X])", re.IGNORECASE
+)
+
+
+# sections of an ORCID record that are read, instead of the full record
+# that also contains all the works, fundings, peer reviews...
+ORCID_SECTIONS = ("person", "employments")
+
 
 def affiliation_from_orcid(orcid_record: dict[str, Any]) -> str | None:
-    """Get affiliation the most recent employment (top of the list)."""
-    if employer := (
-        orcid_record.get("activities-summary", {})
-        .get("employments", {})
-        .get("employment-summary", [])
-    ):
-        return str(employer[0].get("organization", {}).get("name"))
+    """Get affiliation from the employments of an ORCID record.
+
+    The first current employment (without end date) is used,
+    or the most recent one (top of the list) if they have all ended.
+    """
+    employments = orcid_record.get("activities-summary", {}).get("employments") or {}
+    # API v3.0 groups employments, v2.x lists them
+    if groups := employments.get("affiliation-group"):
+        employers = [
+            x["employment-summary"]
+            for group in groups
+            for x in group.get("summaries", [])
+            if "employment-summary" in x
+        ]
     else:
+        employers = employments.get("employment-summary", [])
+    if not employers:
         return None
+    current = [x for x in employers if not x.get("end-date")]
+    employer = current[0] if current else employers[0]
+    return str(employer.get("organization", {}).get("name"))
 
 
 def first_name_from_orcid(orcid_record: dict[str, Any]) -> str:
@@ -41,21 +82,88 @@ def last_name_from_orcid(orcid_record: dict[str, Any]) -> str:
     )
 
 
+def orcid_check_digit(base_digits: str) -> str:
+    """Compute the ISO 7064 MOD 11-2 check digit of the first 15 digits of an ORCID iD."""
+    total = 0
+    for digit in base_digits:
+        total = (total + int(digit)) * 2
+    result = (12 - total % 11) % 11
+    return "X" if result == 10 else str(result)  # noqa: PLR2004
+
+
+def find_orcid(text: str) -> str | None:
+    """Return the first thing looking like an ORCID iD in a string.
+
+    The iD is returned as '0000-0000-0000-0000' but its check digit is not validated.
+    """
+    if match := ORCID_PATTERN.search(text):
+        return "-".join(match.groups()).upper()
+    return None
+
+
+def is_valid_orcid(orcid: str) -> bool:
+    """Check that the check digit of a normalized ORCID iD is correct."""
+    digits = orcid.replace("-", "")
+    return orcid_check_digit(digits[:-1]) == digits[-1]
+
+
+def normalize_orcid(orcid: str) -> str | None:
+    """Return an ORCID iD as '0000-0000-0000-0000' or None if it is not valid."""
+    if (found := find_orcid(orcid)) is None or not is_valid_orcid(found):
+        return None
+    return found
+
+
 def get_author_info_from_orcid(orcid: str) -> dict[str, Any]:
-    """Get author info from ORCID."""
-    orcid = orcid.strip()
+    """Get author info from ORCID.
+
+    Invalid ORCID iDs are reported without querying ORCID.
+    """
+    if (normalized_orcid := normalize_orcid(orcid)) is None:
+        log.warning(f"Invalid ORCID iD: {orcid.strip()}")
+        return {}
+    return _lookup_orcid(normalized_orcid)
+
+
+def _lookup_orcid(orcid: str) -> dict[str, Any]:
+    """Look up a valid ORCID iD in the local index if any, then on ORCID."""
+    if (index := get_orcid_index()) is not None and (author_info := index.get(orcid)):
+        return author_info
+    return _get_author_info_from_orcid(orcid)
 
-    url = f"https://pub.orcid.org/v3.0/{orcid}/record"
 
-    response = requests.get(
-        url,
-        headers={
-            "Accept": "application/json",
-        },
+def _get_orcid_section(orcid: str, section: str) -> requests.Response:
+    return http_get(
+        f"{ORCID_API_URL}/{orcid}/{section}", headers={"Accept": "application/json"}
     )
+
+
+@cached("orcid")
+def _get_author_info_from_orcid(orcid: str) -> dict[str, Any]:
+    """Query ORCID for the name and employments of a valid ORCID iD.
+
+    Both sections are requested at the same time.
+    """
+    import requests
+
+    with ThreadPoolExecutor(max_workers=len(ORCID_SECTIONS)) as executor:
+        futures = [
+            submit(executor, _get_orcid_section, orcid, section)
+            for section in ORCID_SECTIONS
+        ]
+        try:
+            person, employments = [x.result() for x in futures]
+        except requests.RequestException as exc:
+            log.warning(f"Could not query ORCID for {orcid}: {exc}")
+            return {}
+
     author_info = {}
-    if response.status_code == VALID_RESPONSE:
-        record = response.json()
+    if person.status_code == VALID_RESPONSE and employments.status_code == VALID_RESPONSE:
+        # same structure as the full record
+        record = {
+            "person": person.json(),
+            "activities-summary": {"employments": employments.json()},
+        }
         first_name = first_name_from_orcid(record)
         last_name = last_name_from_orcid(record)
         affiliation = affiliation_from_orcid(record)
@@ -76,23 +184,19 @@ def parse_author(author: str) -> dict[str, str | None]:
     """Parse author string to get first name, last name, affiliation and ORCID."""
     author = author.strip().replace("  ", " ")
 
-    author_info: dict[str, str | None] = {
-        "first_name": None,
-        "last_name": None,
-        "affiliation": None,
-        "id": None,
-    }
-
     if author == "":
         return {"firstname": None, "lastname": None}
-    if "orcid:" in author.lower():
-        if author_info := get_author_info_from_orcid(author.split(":")[1]):
-            return author_info
-    elif "orcid.org/" in author:
-        if author_info := get_author_info_from_orcid(author.split("orcid.org/")[1]):
+
+    # only query ORCID for strings containing a valid ORCID iD
+    if orcid := find_orcid(author):
+        if not is_valid_orcid(orcid):
+            log.warning(f"Invalid ORCID iD '{orcid}' for author: {author}")
+        elif author_info := _lookup_orcid(orcid):
             return author_info
-    elif author_info := get_author_info_from_orcid(author):
-        return author_info
+        else:
+            not_enriched(author)
+    elif "orcid" in author.lower():
+        log.warning(f"Could not find a valid ORCID iD for author: {author}")
 
     if "," in author:
         first_name, last_name = author.split(",")
@@ -104,42 +208,268 @@ def parse_author(author: str) -> dict[str, str | None]:
         first_name = author
         last_name = ""
 
-    first_name = first_name.strip()
-    last_name = last_name.strip()
+    return {"firstname": first_name.strip(), "lastname": last_name.strip()}
 
-    author_info["firstname"] = first_name
-    author_info["lastname"] = last_name
-    return author_info
 
+def resolve_authors(
+    authors: list[str], max_workers: int = DEFAULT_MAX_WORKERS
+) -> list[dict[str, str | None]]:
+    """Parse several authors concurrently.
+
+    Authors are returned in the same order as in the input list.
+    """
+    if max_workers <= 1 or len(authors) <= 1:
+        return [parse_author(author) for author in authors]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(authors))) as executor:
+        futures = [submit(executor, parse_author, author) for author in authors]
+        return [x.result() for x in futures]
+
+
+def read_authors_file(authors_file: Path) -> list[dict[str, str | None]]:
+    """Read the TSV file listing potential new authors.
+
+    The columns first_name and last_name are required,
+    ORCID and affiliation are optional.
+    Missing columns and empty cells are returned as None.
+    """
+    with authors_file.open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter="\t"))
+    return [
+        {
+            column: (row.get(column) or "").strip() or None
+            for column in ["first_name", "last_name", "affiliation", "ORCID"]
+        }
+        for row in rows
+    ]
 
-def display_new_authors(authors_file: Path | None = None) -> int:
-    """Display new authors from authors file."""
-    if authors_file is not None and authors_file.exists():
-        tmp = pd.read_csv(authors_file, sep="\t")
-        authors_list = [
+
+def fold_name(name: str) -> str:
+    """Normalize a name to compare it: lower case, no accent, no punctuation."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    letters = "".join(x for x in decomposed if not unicodedata.combining(x))
+    return " ".join(re.sub(r"[^\w\s]", " ", letters.casefold()).split())
+
+
+class AuthorsRoster:
+    """Potential authors loaded once and indexed by ORCID iD and name.
+
+    :param rows: Rows of an authors file (see read_authors_file).
+    :type rows: list[dict[str, str | None]]
+    """
+
+    def __init__(self, rows: list[dict[str, str | None]]) -> None:
+        self.authors: list[dict[str, str | None]] = [
             {
-                "first_name": tmp["first_name"][ind],
-                "last_name": tmp["last_name"][ind],
-                "affiliation": tmp["affiliation"][ind],
-                "ORCID": tmp["ORCID"][ind],
+                "firstname": row["first_name"],
+                "lastname": row["last_name"],
+                "affiliation": row["affiliation"],
+                "id": f"ORCID:{row['ORCID']}" if row["ORCID"] else None,
             }
-            for ind in tmp.index
+            for row in rows
         ]
+        self.by_orcid: dict[str, int] = {}
+        self.by_name: dict[str, list[int]] = {}
+        # full names and their parts, for fuzzy search
+        self._words: dict[str, set[int]] = {}
+        # (folded name or part of it, index) sorted for prefix search
+        self._prefixes: list[tuple[str, int]] = []
+        for i, row in enumerate(rows):
+            if row["ORCID"] and (orcid := normalize_orcid(row["ORCID"])):
+                self.by_orcid.setdefault(orcid, i)
+            first = fold_name(row["first_name"] or "")
+            last = fold_name(row["last_name"] or "")
+            self.by_name.setdefault(f"{first} {last}".strip(), []).append(i)
+            keys = {f"{first} {last}".strip(), f"{last} {first}".strip(), *last.split()}
+            self._prefixes.extend((key, i) for key in keys if key)
+            for word in {f"{first} {last}".strip(), first, last} - {""}:
+                self._words.setdefault(word, set()).add(i)
+        self._prefixes.sort()
+
+    @classmethod
+    def from_file(cls, authors_file: Path) -> AuthorsRoster:
+        return cls(read_authors_file(authors_file))
+
+    def __len__(self) -> int:
+        return len(self.authors)
+
+    def label(self, index: int) -> str:
+        """Return a one line description of an author."""
+        author = self.authors[index]
+        label = f"{author['firstname'] or ''} {author['lastname'] or ''}".strip()
+        details = [x for x in (author["affiliation"], author["id"]) if x]
+        return f"{label} ({', '.join(details)})" if details else label
+
+    def search(self, query: str, limit: int = 50) -> list[int]:
+        """Return the indices of the authors matching a query.
+
+        The query can be an ORCID iD or the beginning of a name
+        (first name, last name or both in any order).
+        If nothing starts with the query, the closest names are returned.
+        """
+        if (orcid := normalize_orcid(query)) is not None:
+            return [self.by_orcid[orcid]] if orcid in self.by_orcid else []
+
+        if not (folded := fold_name(query)):
+            return list(range(min(limit, len(self))))
+
+        matches = dict.fromkeys(self.by_name.get(folded, []))
+        start = bisect.bisect_left(self._prefixes, (folded, -1))
+        for key, index in itertools.islice(self._prefixes, start, None):
+            if not key.startswith(folded) or len(matches) >= limit:
+                break
+            matches[index] = None
+        if matches:
+            return list(matches)[:limit]
+
+        close = difflib.get_close_matches(folded, self._words, n=limit, cutoff=0.6)
+        found = dict.fromkeys(i for word in close for i in sorted(self._words[word]))
+        return list(found)[:limit]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_roster(authors_file: Path, mtime_ns: int) -> AuthorsRoster:  # noqa: ARG001
+    return AuthorsRoster.from_file(authors_file)
+
+
+def load_roster(authors_file: Path) -> AuthorsRoster:
+    """Return the roster of an authors file, only read again if it was modified."""
+    return _load_roster(authors_file.resolve(), authors_file.stat().st_mtime_ns)
+
+
+def select_from_roster(
+    roster: AuthorsRoster, page_size: int = ROSTER_PAGE_SIZE
+) -> dict[str, str | None] | None:
+    """Let the user search the roster and select an author.
+
+    :return: The selected author or None to add an author not in the roster.
+    """
+    from rich.prompt import Prompt
+
+    matches = list(range(len(roster)))
+    page = 0
+    while True:
+        n_pages = max(1, -(-len(matches) // page_size))
+        shown = matches[page * page_size : (page + 1) * page_size]
+        print_ordered_list(
+            msg=f"Potential authors to add (page {page + 1}/{n_pages}, "
+            f"{len(matches)} matching):",
+            items=[roster.label(i) for i in shown],
+        )
+        answer = Prompt.ask(
+            prompt_format(
+                "Select an author by number, search by name or ORCID, "
+                "'n' / 'p' for next / previous page "
+                "(0 --> add an author not listed)"
+            )
+        ).strip()
+
+        if answer == "0":
+            return None
+        if answer.isdigit() and 1 <= int(answer) <= len(shown):
+            return dict(roster.authors[shown[int(answer) - 1]])
+        if answer.lower() == "n":
+            page = min(page + 1, n_pages - 1)
+        elif answer.lower() == "p":
+            page = max(page - 1, 0)
+        elif found := roster.search(answer, limit=len(roster)):
+            matches = found
+            page = 0
+        else:
+            print(f"No author matching '{answer}'.")
 
-        print_ordered_list(msg="List of potential authors to add:", items=authors_list)
 
-        return len(authors_list)
-    else:
-        return 0
+def rm_empty_authors(authors: list[dict[str, str | None]]) -> list[dict[str, str | None]]:
+    """Remove empty authors (without name nor ORCID iD)."""
+    return [x for x in authors if x["firstname"] is not None or x.get("id")]
 
 
-def rm_empty_authors(authors: list[dict[str, str | None]]) -> list[dict[str, str | None]]:
-    """Remove empty authors."""
-    return [x for x in authors if x["firstname"] is not None]
+def _author_label(author: dict[str, str | None]) -> str:
+    return f"{author.get('firstname') or ''} {author.get('lastname') or ''}".strip()
+
+
+def merge_authors(
+    authors: list[dict[str, str | None]],
+) -> tuple[list[dict[str, str | None]], list[str]]:
+    """Merge the authors listed several times.
+
+    Authors are the same if they have the same ORCID iD,
+    or the same name (ignoring accents, case and punctuation)
+    and no different ORCID iDs.
+    A merged author takes the missing affiliation or id from its duplicates,
+    and keeps its first value when they differ.
+
+    :return: The authors in the order they first appear, and the conflicts
+             resolved while merging them.
+    """
+    merged: list[dict[str, str | None]] = []
+    conflicts: list[str] = []
+    # key ('orcid:...' or 'name:...') --> index in merged, None if ambiguous
+    index: dict[str, int | None] = {}
+
+    def merge(target: int, source: dict[str, str | None]) -> None:
+        author = merged[target]
+        for field, value in source.items():
+            if value in (None, ""):
+                continue
+            current = author.get(field)
+            if current in (None, ""):
+                author[field] = value
+            elif current != value and (
+                field not in ("firstname", "lastname")
+                or fold_name(current) != fold_name(value)
+            ):
+                conflicts.append(
+                    f"{_author_label(author)}: kept {field} '{current}' over '{value}'"
+                )
+
+    for author in authors:
+        orcid = normalize_orcid(author.get("id") or "")
+        name = fold_name(_author_label(author))
+        orcid_key = f"orcid:{orcid}" if orcid else None
+        name_key = f"name:{name}" if name else None
+
+        target = index.get(orcid_key) if orcid_key else None
+        if target is None and name_key is not None:
+            same_name = index.get(name_key)
+            if same_name is not None:
+                other = normalize_orcid(merged[same_name].get("id") or "")
+                if orcid is None or other is None:
+                    target = same_name
+                else:
+                    # same name but different people
+                    index[name_key] = None
+                    log.info(f"Different ORCID iDs for '{_author_label(author)}'")
+        if target is None:
+            merged.append(dict(author))
+            target = len(merged) - 1
+        else:
+            log.info(f"Merging duplicated author: {_author_label(author)}")
+            merge(target, author)
+        for key in (orcid_key, name_key):
+            if key is not None and key not in index:
+                index[key] = target
+
+    return merged, conflicts
+
+
+def _merge_duplicated_authors(
+    authors: list[dict[str, str | None]],
+) -> list[dict[str, str | None]]:
+    authors, conflicts = merge_authors(rm_empty_authors(authors))
+    if conflicts:
+        log.warning(
+            "Conflicting values for duplicated authors, the first ones are kept:\n"
+            + "\n".join(f"- {x}" for x in conflicts)
+        )
+    return authors
 
 
 def update_authors(
-    ds_desc: dict[str, Any], skip_prompt: bool = False, authors_file: Path | None = None
+    ds_desc: dict[str, Any],
+    skip_prompt: bool = False,
+    authors_file: Path | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
 ) -> list[dict[str, str | None]]:
     """Update authors."""
     authors: list[dict[str, str | None]] = []
@@ -149,10 +479,17 @@ def update_authors(
         desc_authors = [
             x for x in ds_desc["Authors"] if x not in (None, "") or not x.isspace()
         ]
-        authors.extend(parse_author(author) for author in desc_authors)
+        authors.extend(resolve_authors(desc_authors, max_workers=max_workers))
 
     if skip_prompt:
-        return rm_empty_authors(authors)
+        return _merge_duplicated_authors(authors)
+
+    from rich.prompt import Prompt
+
+    # read once for all the authors added below
+    roster = None
+    if authors_file is not None and authors_file.exists():
+        roster = load_roster(authors_file)
 
     add_authors = "yes"
 
@@ -168,46 +505,21 @@ def update_authors(
         if add_authors != "yes":
             break
 
-        author: Any = None
-        if authors_file is not None:
-            nb_authors = display_new_authors(authors_file)
-            choices = [str(i) for i in range(1, nb_authors + 1)]
-            choices.append("0")
-            author_idx = Prompt.ask(
-                prompt_format(
-                    "Select author to add. (0 --> add an author not listed above)"
-                ),
-                choices=choices,
-            )
-            if author_idx == "0":
-                author = manually_add_author()
-                authors.append(parse_author(author))
-            else:
-                author = choose_from_new_authors(authors_file, int(author_idx) - 1)
-                authors.append(author)
-
+        selected = None
+        if roster is not None:
+            selected = select_from_roster(roster)
+        if selected is not None:
+            authors.append(selected)
         else:
-            author = manually_add_author()
-            authors.append(parse_author(author))
-
-    return rm_empty_authors(authors)
-
-
-def choose_from_new_authors(authors_file: Path, author_idx: int) -> dict[str, str | None]:
-    """Choose author from new authors file."""
-    tmp = pd.read_csv(authors_file, sep="\t")
-    author = tmp.iloc[author_idx]
-    author_info: dict[str, str | None] = {
-        "firstname": author["first_name"],
-        "lastname": author["last_name"],
-        "affiliation": author["affiliation"],
-        "id": f"ORCID:{author['ORCID']}",
-    }
-    return author_info
+            authors.append(parse_author(manually_add_author()))
+
+    return _merge_duplicated_authors(authors)
 
 
 def manually_add_author() -> str:
     """Manually add author."""
+    from rich.prompt import Prompt
+
     author = Prompt.ask(
         prompt_format(
             """Please enter a new author
@@ -231,13 +543,17 @@ def authors_for_desc(authors: list[dict[str, str | None]]) -> list[str]:
 def authors_for_citation(
     authors: list[dict[str, str | None]],
 ) -> list[dict[str, str | None]]:
-    """Return authors formatted for citation.cff."""
+    """Return authors formatted for citation.cff.
+
+    Empty names are left out: they are not valid CFF.
+    """
     tmp = []
     for x in authors:
-        this_author = {
-            "given-names": x.get("firstname", ""),
-            "family-names": x.get("lastname", ""),
-        }
+        this_author = {}
+        if x.get("firstname"):
+            this_author["given-names"] = x.get("firstname")
+        if x.get("lastname"):
+            this_author["family-names"] = x.get("lastname")
         if x.get("id"):
             orcid = x.get("id")
             this_author["orcid"] = f"https://orcid.org/{orcid.replace('ORCID:', '')}"  # type: ignore[union-attr]
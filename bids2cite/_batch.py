@@ -0,0 +1,180 @@
+"""Run bids2cite on many datasets at once."""
+
+from __future__ import annotations
+
+import csv
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from bids2cite._cache import configure_cache, get_cache
+from bids2cite._http import configure_http, http_settings
+from bids2cite._orcid_index import configure_orcid_index, get_orcid_index
+from bids2cite._utils import print_ordered_list
+from bids2cite.bids2cite import DEFAULT_N_JOBS, bids2cite
+
+log = logging.getLogger("bids2datacite")
+
+# folders never searched for datasets
+SKIPPED_FOLDERS = {"derivatives", "sourcedata", "code"}
+
+
+def find_datasets(source: str | Path) -> list[Path]:
+    """Return the roots of BIDS datasets listed or contained in source.
+
+    :param source: One of:
+
+        - a text file listing one dataset root per line
+          (empty lines and lines starting with '#' are ignored),
+        - a directory: the datasets it contains are discovered
+          (it can itself be a dataset root),
+        - a glob pattern matching dataset roots.
+    :type source: str | Path
+    """
+    source_path = Path(source)
+
+    if source_path.is_file():
+        with source_path.open(encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        return [
+            Path(line).expanduser().resolve()
+            for line in lines
+            if line and not line.startswith("#")
+        ]
+
+    if source_path.is_dir():
+        return _discover_datasets(source_path.resolve())
+
+    return sorted(
+        Path(x).resolve()
+        for x in glob.glob(str(source), recursive=True)  # noqa: PTH207
+        if Path(x).is_dir()
+    )
+
+
+def _discover_datasets(directory: Path) -> list[Path]:
+    """Find dataset roots in a directory, without looking inside datasets."""
+    if (directory / "dataset_description.json").exists():
+        return [directory]
+
+    datasets = []
+    for root, folders, _ in os.walk(directory):
+        root_path = Path(root)
+        kept_folders = []
+        for folder in sorted(folders):
+            if folder.startswith(".") or folder in SKIPPED_FOLDERS:
+                continue
+            if (root_path / folder / "dataset_description.json").exists():
+                datasets.append(root_path / folder)
+            else:
+                kept_folders.append(folder)
+        folders[:] = kept_folders
+    return datasets
+
+
+def _init_worker(
+    use_cache: bool,
+    cache_path: Path,
+    http_options: dict[str, Any],
+    orcid_index: Path | None,
+) -> None:
+    """Share the lookup cache, HTTP settings and ORCID index of the main process."""
+    configure_cache(enabled=use_cache, path=cache_path)
+    configure_http(**http_options)
+    configure_orcid_index(orcid_index)
+
+
+def _process_dataset(bids_dir: Path, options: dict[str, Any]) -> dict[str, Any]:
+    """Run bids2cite on a single dataset and report the outcome."""
+    from jsonschema import ValidationError
+
+    start = time.perf_counter()
+    result: dict[str, Any] = {"bids_dir": str(bids_dir), "status": "success", "error": ""}
+    try:
+        bids2cite(bids_dir=bids_dir, skip_prompt=True, **options)
+    except ValidationError as exc:
+        result["status"] = "failure"
+        result["error"] = f"Invalid CITATION.cff: {exc.message}"
+    except (Exception, SystemExit) as exc:
+        result["status"] = "failure"
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["duration"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def bids2cite_batch(
+    datasets: list[Path],
+    n_jobs: int = DEFAULT_N_JOBS,
+    summary_file: Path | None = None,
+    use_cache: bool = True,
+    **options: Any,
+) -> list[dict[str, Any]]:
+    """Run bids2cite without prompt on several datasets with a pool of processes.
+
+    All workers share the same on-disk lookup cache.
+    A dataset that fails does not stop the others.
+
+    :param datasets: Roots of the BIDS datasets.
+    :type datasets: list[Path]
+
+    :param n_jobs: Number of processes to use.
+    :type n_jobs: int, optional
+
+    :param summary_file: TSV file where to write the outcome for each dataset.
+    :type summary_file: Path | None, optional
+
+    :param use_cache: Use the cache of lookups.
+    :type use_cache: bool, optional
+
+    :param options: Other arguments passed to bids2cite (output_format, license...).
+
+    :return: Outcome for each dataset, in the same order as datasets.
+    """
+    log.info(f"processing {len(datasets)} datasets with {n_jobs} processes")
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, n_jobs),
+        initializer=_init_worker,
+        initargs=(
+            use_cache,
+            get_cache().path,
+            http_settings(),
+            index.path if (index := get_orcid_index()) is not None else None,
+        ),
+    ) as executor:
+        futures = [
+            executor.submit(_process_dataset, bids_dir, options) for bids_dir in datasets
+        ]
+        results = [future.result() for future in futures]
+
+    failures = [x for x in results if x["status"] == "failure"]
+    log.info(f"{len(results) - len(failures)} datasets processed successfully")
+    if failures:
+        print_ordered_list(
+            msg=f"{len(failures)} datasets failed:",
+            items=[f"{x['bids_dir']}: {x['error']}" for x in failures],
+        )
+
+    if summary_file is not None:
+        write_summary(results, summary_file)
+
+    return results
+
+
+def write_summary(results: list[dict[str, Any]], summary_file: Path) -> None:
+    """Write the outcome of a batch run to a TSV file."""
+    log.info(f"writing summary to {summary_file}")
+    summary_file.parent.mkdir(parents=True, exist_ok=True)
+    with summary_file.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(
+            f,
+            fieldnames=["bids_dir", "status", "duration", "error"],
+            delimiter="\t",
+            lineterminator="\n",
+        )
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,293 @@
+"""Persistent cache for the metadata looked up on ORCID, Crossref and PubMed."""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from bids2cite._profile import count
+
+log = logging.getLogger("bids2datacite")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DAY = 24 * 60 * 60
+
+# how long (in seconds) an entry is considered valid for each source
+DEFAULT_TTLS: dict[str, float] = {
+    "orcid": 30 * DAY,
+    "crossref": 180 * DAY,
+    "pubmed": 180 * DAY,
+}
+DEFAULT_MAX_TTL = max(DEFAULT_TTLS.values())
+
+DEFAULT_MAX_ENTRIES = 50_000
+
+CACHE_FILENAME = "metadata.sqlite"
+
+
+def default_cache_dir() -> Path:
+    """Return the directory where the cache is stored.
+
+    Can be overridden with the ``BIDS2CITE_CACHE_DIR`` environment variable.
+    """
+    if cache_dir := os.environ.get("BIDS2CITE_CACHE_DIR"):
+        return Path(cache_dir)
+
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+
+    return base / "bids2cite"
+
+
+def normalize_key(key: str) -> str:
+    """Normalize an identifier (ORCID, DOI, PMID) to use as cache key."""
+    return key.strip().lower()
+
+
+class MetadataCache:
+    """Size-bounded SQLite cache with per-source time to live and LRU eviction.
+
+    :param path: SQLite file of the cache, defaults to the user cache directory.
+    :type path: Path | None, optional
+
+    :param max_entries: Maximum number of entries to keep.
+                        The least recently used entries are evicted first.
+    :type max_entries: int, optional
+
+    :param ttls: Time to live in seconds for each source.
+    :type ttls: dict[str, float] | None, optional
+
+    :param enabled: When False, the cache never returns nor stores anything.
+    :type enabled: bool, optional
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttls: dict[str, float] | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.path = path or default_cache_dir() / CACHE_FILENAME
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (source, key)
+                )"""
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get(self, source: str, key: str) -> Any:
+        """Return the cached value or None if missing or expired."""
+        if not self.enabled:
+            return None
+        value = self._get(source, normalize_key(key))
+        count(f"cache {'miss' if value is None else 'hit'}: {source}")
+        return value
+
+    def _get(self, source: str, key: str) -> Any:
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, created FROM entries WHERE source = ? AND key = ?",
+                    (source, key),
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created = row
+                if now - created > self.ttls.get(source, DEFAULT_MAX_TTL):
+                    connection.execute(
+                        "DELETE FROM entries WHERE source = ? AND key = ?", (source, key)
+                    )
+                    return None
+                connection.execute(
+                    "UPDATE entries SET accessed = ? WHERE source = ? AND key = ?",
+                    (now, source, key),
+                )
+        except sqlite3.Error as exc:
+            log.debug(f"Could not read from cache {self.path}: {exc}")
+            return None
+
+        log.debug(f"cache hit for {source}:{key}")
+        return json.loads(value)
+
+    def set(self, source: str, key: str, value: Any) -> None:
+        """Store a JSON serializable value in the cache."""
+        if not self.enabled:
+            return
+        key = normalize_key(key)
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    """INSERT OR REPLACE INTO entries
+                    (source, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)""",
+                    (source, key, json.dumps(value), now, now),
+                )
+                self._evict(connection)
+        except sqlite3.Error as exc:
+            log.debug(f"Could not write to cache {self.path}: {exc}")
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Remove the least recently used entries above the maximum size."""
+        (n_entries,) = connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if n_entries <= self.max_entries:
+            return
+        connection.execute(
+            """DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM entries ORDER BY accessed ASC LIMIT ?
+            )""",
+            (n_entries - self.max_entries,),
+        )
+
+    def clear(self) -> int:
+        """Remove all entries from the cache and return how many were removed."""
+        if not self.path.exists():
+            return 0
+        with self._lock:
+            connection = self._connect()
+            n_entries = connection.execute("DELETE FROM entries").rowcount
+            connection.execute("VACUUM")
+        return int(n_entries)
+
+    def info(self) -> dict[str, Any]:
+        """Return the location, size and number of entries per source of the cache."""
+        entries: dict[str, int] = {}
+        if self.path.exists():
+            with self._lock:
+                entries = dict(
+                    self._connect()
+                    .execute("SELECT source, COUNT(*) FROM entries GROUP BY source")
+                    .fetchall()
+                )
+        return {
+            "path": str(self.path),
+            "size": self.path.stat().st_size if self.path.exists() else 0,
+            "max_entries": self.max_entries,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_CACHE: MetadataCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+# set in the blocks where lookups must not use the cache (see cache_disabled):
+# code run in other threads must be given a copy of the context (see _deadline.submit)
+_DISABLED: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "bids2cite_cache_disabled", default=False
+)
+_DISABLED_CACHE = MetadataCache(enabled=False)
+
+
+@contextlib.contextmanager
+def cache_disabled(disabled: bool = True) -> Iterator[None]:
+    """Neither read from nor write to the cache in this block.
+
+    Unlike configure_cache(enabled=False), the cache is used again after the block.
+    """
+    token = _DISABLED.set(disabled or _DISABLED.get())
+    try:
+        yield
+    finally:
+        _DISABLED.reset(token)
+
+
+def get_cache() -> MetadataCache:
+    """Return the cache shared by all lookups of this process."""
+    global _CACHE
+    if _DISABLED.get():
+        return _DISABLED_CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = MetadataCache()
+        return _CACHE
+
+
+def configure_cache(
+    enabled: bool = True,
+    path: Path | None = None,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> MetadataCache:
+    """Replace the cache shared by all lookups of this process."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.close()
+        _CACHE = MetadataCache(path=path, max_entries=max_entries, enabled=enabled)
+        return _CACHE
+
+
+@atexit.register
+def _close_cache() -> None:
+    if _CACHE is not None:
+        _CACHE.close()
+
+
+def cached(source: str) -> Callable[[F], F]:
+    """Cache the result of a lookup function keyed on its first argument.
+
+    Empty results (failed lookups) are not cached.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(identifier: str, *args: Any, **kwargs: Any) -> Any:
+            cache = get_cache()
+            if (value := cache.get(source, identifier)) is not None:
+                return value
+            value = func(identifier, *args, **kwargs)
+            if value:
+                cache.set(source, identifier, value)
+            return value
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
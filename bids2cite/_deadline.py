@@ -0,0 +1,87 @@
+"""Time allowed for the lookups of a run and entries they could not enrich.
+
+Both are stored in context variables:
+code run in other threads must be given a copy of the context (see submit).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import re
+import time
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, TypeVar
+
+log = logging.getLogger("bids2datacite")
+
+T = TypeVar("T")
+
+# time.monotonic() after which no more lookup is sent
+_DEADLINE: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "bids2cite_deadline", default=None
+)
+
+_NOT_ENRICHED: contextvars.ContextVar[list[str] | None] = contextvars.ContextVar(
+    "bids2cite_not_enriched", default=None
+)
+
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "min": 60, "h": 3600}
+
+
+def duration(value: str) -> float:
+    """Convert a duration like '30', '30s', '1.5m' or '1h' to seconds."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*(s|m|min|h)?\s*", value.lower())
+    if match is None:
+        raise ValueError(f"Invalid duration: '{value}'")
+    return float(match[1]) * _DURATION_UNITS[match[2] or ""]
+
+
+@contextlib.contextmanager
+def lookup_deadline(seconds: float | None) -> Iterator[None]:
+    """Stop sending lookups once seconds have elapsed in this block.
+
+    Lookups sent after that fail like when a service cannot be reached.
+    None means no limit.
+    """
+    token = _DEADLINE.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_lookup_time() -> float | None:
+    """Return the seconds left for lookups or None if there is no limit."""
+    if (deadline := _DEADLINE.get()) is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextlib.contextmanager
+def collect_not_enriched() -> Iterator[list[str]]:
+    """Give the list of the entries that could not be enriched in this block.
+
+    They are also added to the list of the enclosing block, if any.
+    """
+    entries: list[str] = []
+    token = _NOT_ENRICHED.set(entries)
+    try:
+        yield entries
+    finally:
+        _NOT_ENRICHED.reset(token)
+        if (parent := _NOT_ENRICHED.get()) is not None:
+            parent.extend(entries)
+
+
+def not_enriched(entry: str) -> None:
+    """Report an author or reference kept as is because its lookup failed."""
+    if (entries := _NOT_ENRICHED.get()) is not None:
+        entries.append(entry.strip())
+
+
+def submit(executor: Executor, func: Callable[..., T], *args: Any) -> Future[T]:
+    """Submit a function to an executor with a copy of the current context."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
@@ -0,0 +1,335 @@
+"""HTTP client shared by all the lookups (ORCID, Crossref, PubMed, licenses)."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from bids2cite._archive import HttpArchive, request_key
+from bids2cite._deadline import remaining_lookup_time
+from bids2cite._profile import span
+from bids2cite._version import __version__
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    import requests
+    from urllib3.connectionpool import ConnectionPool
+    from urllib3.response import BaseHTTPResponse
+    from urllib3.util.retry import Retry
+
+log = logging.getLogger("bids2datacite")
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# never wait more than this (in seconds) between two retries
+MAX_BACKOFF = 30
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# number of connections kept alive per host
+POOL_MAXSIZE = 16
+
+USER_AGENT = f"bids2cite/{__version__} (https://github.com/Remi-Gau/bids2cite)"
+
+_SETTINGS: dict[str, Any] = {
+    "connect_timeout": DEFAULT_CONNECT_TIMEOUT,
+    "read_timeout": DEFAULT_READ_TIMEOUT,
+    "retries": DEFAULT_RETRIES,
+    "backoff_factor": DEFAULT_BACKOFF_FACTOR,
+    "endpoints": {},
+    "record": None,
+    "replay": None,
+    "mailto": None,
+}
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+# responses being recorded or replayed (see configure_http)
+_ARCHIVE: HttpArchive | None = None
+
+
+def _retry_strategy() -> Retry:
+    """Retry on connection errors, 429 and 5xx with exponential backoff.
+
+    The Retry-After header of 429 and 503 responses is honored.
+    Within lookup_deadline, a retry that would have to wait past the deadline
+    is not sent: the last response is returned (or the last error raised) instead.
+    """
+    from urllib3.exceptions import MaxRetryError, ResponseError
+    from urllib3.util.retry import Retry
+
+    class DeadlineRetry(Retry):
+        # retries are decided in the thread (and context) sending the request
+        def increment(
+            self,
+            method: str | None = None,
+            url: str | None = None,
+            response: BaseHTTPResponse | None = None,
+            error: Exception | None = None,
+            _pool: ConnectionPool | None = None,
+            _stacktrace: TracebackType | None = None,
+        ) -> DeadlineRetry:
+            retry = super().increment(method, url, response, error, _pool, _stacktrace)
+            if (remaining := remaining_lookup_time()) is None:
+                return retry
+            wait = None
+            if response is not None and retry.respect_retry_after_header:
+                wait = retry.get_retry_after(response)
+            if wait is None:
+                wait = retry.get_backoff_time()
+            if wait >= remaining:
+                log.debug(f"no time left for lookups to retry {url} in {wait:.1f} s")
+                raise MaxRetryError(
+                    _pool,  # type: ignore[arg-type]
+                    url,
+                    error or ResponseError("no time left for lookups"),
+                )
+            return retry
+
+    return DeadlineRetry(
+        total=_SETTINGS["retries"],
+        backoff_factor=_SETTINGS["backoff_factor"],
+        backoff_max=MAX_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _new_session() -> requests.Session:
+    # requests is only imported when the first lookup is made
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_MAXSIZE,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=_retry_strategy(),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = user_agent()
+    return session
+
+
+def user_agent() -> str:
+    """Return the User-Agent of the requests, with the contact email if any."""
+    if mailto := _SETTINGS["mailto"]:
+        return f"{USER_AGENT} (mailto:{mailto})"
+    return USER_AGENT
+
+
+def get_session() -> requests.Session:
+    """Return the session shared by all the lookups of this process."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = _new_session()
+        return _SESSION
+
+
+def configure_http(
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    endpoints: dict[str, str] | None = None,
+    *,
+    record: Path | str | None = None,
+    replay: Path | str | None = None,
+    mailto: str | None = None,
+) -> None:
+    """Change the timeouts and retry strategy of the shared session.
+
+    :param connect_timeout: Seconds to wait for a connection to be established.
+    :type connect_timeout: float, optional
+
+    :param read_timeout: Seconds to wait for the server to send data.
+    :type read_timeout: float, optional
+
+    :param retries: Maximum number of retries for a request.
+    :type retries: int, optional
+
+    :param backoff_factor: Exponential backoff factor between retries.
+    :type backoff_factor: float, optional
+
+    :param endpoints: Base URLs to send requests to instead of the public services,
+                      for example {"https://api.crossref.org": "http://localhost:8000"}
+                      to use a mirror or a local stand-in server.
+    :type endpoints: dict[str, str] | None, optional
+
+    :param record: Archive file where to record all the responses
+                   (see save_http_archive).
+                   Responses are added to the archive if it already exists.
+    :type record: Path | str | None, optional
+
+    :param replay: Archive file from which the responses are served:
+                   no request is sent and requests that were not recorded
+                   fail like when a service cannot be reached.
+    :type replay: Path | str | None, optional
+
+    :param mailto: Contact email sent with the requests,
+                   Crossref then answers from its "polite" pool
+                   that has higher rate limits.
+    :type mailto: str | None, optional
+    """
+    global _SESSION, _ARCHIVE
+    if record is not None and replay is not None:
+        raise ValueError("Cannot record and replay HTTP responses at the same time.")
+
+    archive = None
+    if replay is not None:
+        archive = HttpArchive.load(Path(replay))
+    elif record is not None:
+        record = Path(record)
+        archive = HttpArchive.load(record) if record.exists() else HttpArchive(record)
+
+    with _SESSION_LOCK:
+        _SETTINGS.update(
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries=retries,
+            backoff_factor=backoff_factor,
+            endpoints=dict(endpoints or {}),
+            record=record,
+            replay=replay,
+            mailto=mailto,
+        )
+        _ARCHIVE = archive
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+def save_http_archive() -> None:
+    """Save the responses recorded since configure_http was called with record."""
+    if _ARCHIVE is not None and _SETTINGS["record"] is not None:
+        _ARCHIVE.save()
+
+
+def http_settings() -> dict[str, Any]:
+    """Return the current timeouts and retry strategy (see configure_http)."""
+    return dict(_SETTINGS)
+
+
+def _redirect(url: str) -> str:
+    """Apply the endpoint overrides (see configure_http) to a URL."""
+    endpoints: dict[str, str] = _SETTINGS["endpoints"]
+    for base_url, new_base_url in endpoints.items():
+        if url.startswith(base_url):
+            return new_base_url + url[len(base_url) :]
+    return url
+
+
+def http_get(
+    url: str,
+    params: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    stream: bool = False,
+) -> requests.Response:
+    """Send a GET request with the shared session.
+
+    With stream, the content is only downloaded when read
+    (for example with response.iter_content) and the response must be closed.
+
+    When replaying (see configure_http), the recorded response is returned instead.
+    Within lookup_deadline, the timeouts are shortened to the time left.
+
+    Raises requests.RequestException if the request could not be completed
+    or if no time is left for lookups.
+    """
+    timeout = (_SETTINGS["connect_timeout"], _SETTINGS["read_timeout"])
+    if (remaining := remaining_lookup_time()) is not None:
+        if remaining <= 0:
+            import requests
+
+            raise requests.Timeout(f"no time left for lookups, {url} not requested")
+        timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+
+    archive = _ARCHIVE
+    with span(urlsplit(url).netloc, "http", url=url) as event:
+        if archive is not None and _SETTINGS["replay"] is not None:
+            response = archive.response(request_key("GET", url, params))
+            if event is not None:
+                event.update(status=response.status_code, bytes=len(response.content))
+            return response
+
+        response = get_session().get(
+            _redirect(url),
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            stream=stream,
+        )
+        if event is not None:
+            retries = getattr(response.raw, "retries", None)
+            event.update(
+                status=response.status_code,
+                retries=len(retries.history) if retries is not None else 0,
+            )
+            # reading the content of a streamed response would download all of it
+            if not stream:
+                event["bytes"] = len(response.content)
+        if archive is not None and _SETTINGS["record"] is not None:
+            archive.add(request_key("GET", url, params), response)
+        return response
+
+
+class TokenBucket:
+    """Limit the rate of the requests sent to a service from all threads.
+
+    Up to capacity requests can be sent at once,
+    then one more every 1 / rate seconds.
+
+    :param rate: Requests allowed per second.
+    :type rate: float
+
+    :param capacity: Requests allowed in a burst.
+    :type capacity: float, optional
+    """
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long to wait before it is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent.
+
+        Raises requests.Timeout if it cannot be sent before the lookup deadline.
+        """
+        wait = self._reserve()
+        if wait <= 0:
+            return
+        if (remaining := remaining_lookup_time()) is not None and wait > remaining:
+            with self._lock:
+                # the token is given back
+                self._tokens += 1
+            import requests
+
+            raise requests.Timeout("no time left for lookups before the rate limit")
+        time.sleep(wait)
@@ -0,0 +1,173 @@
+"""Read parts of a JSON document while it is downloaded.
+
+Only the values that are needed are decoded, the others are skipped,
+and reading can stop before the end of the document.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+_DECODER = json.JSONDecoder()
+
+_WHITESPACE = " \t\r\n"
+
+# characters that matter when skipping a value, outside and inside strings
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
+
+# what may be left of a number cut at the end of a chunk
+_NUMBER_END = re.compile(r"[0-9.eE+-]*")
+
+
+class JsonStream:
+    """Pull parser reading a JSON document from chunks of bytes.
+
+    Containers are walked with iter_keys and iter_elements:
+    the value of each key or element must be consumed
+    (with value, skip, iter_keys or iter_elements) before moving to the next one.
+
+    >>> stream = JsonStream([b'{"a": [1, 2], "b": ', b'{"c": 3}}'])
+    >>> for key in stream.iter_keys():
+    ...     if key == "b":
+    ...         print(stream.value())
+    ...     else:
+    ...         stream.skip()
+    {'c': 3}
+
+    :param chunks: Content of the document, for example Response.iter_content().
+    :type chunks: Iterable[bytes]
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        """Add the next chunk to the buffer, return False at the end of the document."""
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = b""
+        self.bytes_read += len(chunk)
+        self._buffer = self._buffer[self._pos :] + self._decoder.decode(
+            chunk, final=self._eof
+        )
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Return the next character that is not whitespace."""
+        while True:
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, characters: str) -> str:
+        character = self._peek()
+        if character not in characters:
+            raise ValueError(
+                f"Expected one of '{characters}' but found '{character}' in JSON document"
+            )
+        self._pos += 1
+        return character
+
+    def peek(self) -> str:
+        """Return the first character of the next value ('{' for an object...)."""
+        return self._peek()
+
+    def value(self) -> Any:
+        """Decode the next value."""
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # the value may continue in the next chunk
+                if not self._fill():
+                    raise
+                continue
+            number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if (
+                number
+                and _NUMBER_END.fullmatch(self._buffer, end) is not None
+                and self._fill()
+            ):
+                # the number may continue in the next chunk
+                continue
+            self._pos = end
+            return value
+
+    def skip(self) -> None:
+        """Move past the next value without decoding (nor fully validating) it."""
+        if self._peek() not in '"[{':
+            self.value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _STRING_END if in_string else _STRUCTURE
+            match = pattern.search(self._buffer, self._pos)
+            if match is None or (in_string and match.end() == len(self._buffer)):
+                # keep a trailing backslash with the character it escapes
+                self._pos = match.start() if match is not None else len(self._buffer)
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON document")
+                continue
+            character = match.group()
+            self._pos = match.end()
+            if in_string:
+                if character == "\\":
+                    self._pos += 1
+                else:
+                    in_string = False
+            elif character == '"':
+                in_string = True
+                continue
+            elif character in "[{":
+                depth += 1
+                continue
+            else:
+                depth -= 1
+            if depth == 0 and not in_string:
+                return
+
+    def iter_keys(self) -> Iterator[str]:
+        """Iterate over the keys of the next object."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def iter_elements(self) -> Iterator[None]:
+        """Iterate over the elements of the next array."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            if self._expect(",]") == "]":
+                return
@@ -2,76 +2,320 @@
 
 from __future__ import annotations
 
+import base64
+import functools
+import gzip
+import heapq
+import json
 import logging
+import re
+import struct
+import zlib
+from importlib.resources import files
 from pathlib import Path
 from typing import Any
 
-import requests
 from rich import print
-from rich.prompt import Prompt
 
+from bids2cite._http import http_get
 from bids2cite._utils import VALID_RESPONSE, print_ordered_list, prompt_format
 
 log = logging.getLogger("bids2datacite")
 
 
-def supported_licenses() -> dict[str, dict[str, str | list[str | None]]]:
-    """Return a list of supported licenses."""
+SPDX_LIST_URL = "https://spdx.org/licenses/"
+
+# licenses offered in the prompt and whose text is bundled with bids2cite
+COMMON_LICENSES = [
+    "CC0-1.0",
+    "CC-BY-4.0",
+    "CC-BY-SA-4.0",
+    "CC-BY-NC-4.0",
+    "CC-BY-NC-SA-4.0",
+    "CC-BY-ND-4.0",
+    "CC-BY-NC-ND-4.0",
+    "PDDL-1.0",
+    "ODC-By-1.0",
+    "ODbL-1.0",
+]
+
+# words dropped from license names to also match their short forms:
+# 'Creative Commons Attribution 4.0 International' -> 'Attribution 4.0'
+ALIAS_PREFIXES = ("creativecommons", "opendatacommons")
+# license texts are compared as sets of overlapping sequences of SHINGLE_SIZE words,
+# summarized by the SKETCH_SIZE smallest hashes of those sequences (bottom-k MinHash)
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 64
+
+# minimum estimated similarity to consider that a text is a given license
+LICENSE_MATCH_THRESHOLD = 0.5
+
+ALIAS_SUFFIXES = (
+    "license",
+    "public",
+    "international",
+    "universal",
+    "unported",
+    "generic",
+)
+
+
+@functools.cache
+def supported_licenses() -> dict[str, dict[str, Any]]:
+    """Return the licenses of the SPDX license list indexed by SPDX identifier.
+
+    The registry is bundled with bids2cite (built from the SPDX license list
+    and the ScanCode LicenseDB) and only loaded once per process.
+    The returned dictionary must not be modified.
+    """
+    resource = files("bids2cite") / "data" / "spdx_licenses.json.gz"
+    registry = json.loads(gzip.decompress(resource.read_bytes()))
+    licenses: dict[str, dict[str, Any]] = {x["name"]: x for x in registry["licenses"]}
+    licenses["None"] = {"name": "", "values": [None, ""], "url": ""}
+    return licenses
+
+
+def normalize_license_alias(value: str) -> str:
+    """Normalize a license identifier, name or URL for lookups.
+
+    Case, punctuation and spacing are ignored for identifiers and names,
+    scheme, 'www.' and 'legalcode' pages are ignored for URLs.
+    """
+    value = value.strip().lower()
+    if "://" in value or value.startswith("www."):
+        value = re.sub(r"^[a-z]+://", "", value)
+        value = re.sub(r"^www\.", "", value)
+        return re.sub(r"(/legalcode(\.[a-z]+)?|\.html?|\.php|\.txt)?/*$", "", value)
+    value = value.replace("&", " and ").replace("licence", "license")
+    return re.sub(r"[^a-z0-9+]", "", value)
+
+
+def _versionless_forms(alias: str) -> set[str]:
+    """Return the forms of a normalized license alias without version.
+
+    'ccbysa40' -> 'ccbysa', 'opendatacommonsopendatabaselicensev10' -> 'opendatabase'...
+    """
+    forms = {alias, *_short_forms(alias)}
+    versionless = {re.sub(r"v?[0-9]+$", "", x) for x in forms}
+    versionless |= {y for x in versionless for y in _short_forms(x)}
+    return {x for x in versionless if x and x not in forms}
+
+
+def _short_forms(alias: str) -> list[str]:
+    """Return shorter forms of a normalized license name."""
+    short_forms = []
+    for prefix in ("", *ALIAS_PREFIXES):
+        if not alias.startswith(prefix):
+            continue
+        short = alias[len(prefix) :]
+        while True:
+            short_forms.append(short)
+            suffix = next((x for x in ALIAS_SUFFIXES if short.endswith(x)), None)
+            if suffix is None:
+                break
+            short = short[: -len(suffix)]
+    return [x for x in short_forms if x and x != alias]
+
+
+@functools.cache
+def license_index() -> dict[str, str]:
+    """Map normalized license aliases (identifiers, names, URLs) to SPDX identifiers.
+
+    Built once per process. When an alias is shared by several licenses,
+    identifiers win over names and URLs, which win over shortened names,
+    which win over the names without version of COMMON_LICENSES,
+    and current SPDX identifiers win over deprecated ones.
+    """
+    licenses = [
+        x
+        for x in sorted(
+            supported_licenses().values(), key=lambda x: x.get("deprecated", False)
+        )
+        if x["name"]
+    ]
+
+    index: dict[str, str] = {}
+    for x in licenses:
+        index.setdefault(normalize_license_alias(x["name"]), x["name"])
+    for x in licenses:
+        for value in x["values"]:
+            index.setdefault(normalize_license_alias(value), x["name"])
+    for x in licenses:
+        for value in x["values"]:
+            if "://" in value:
+                continue
+            for short_form in _short_forms(normalize_license_alias(value)):
+                index.setdefault(short_form, x["name"])
+    for versionless_form, name in _versionless_index().items():
+        index.setdefault(versionless_form, name)
+    return index
+
+
+def _versionless_index() -> dict[str, str]:
+    """Map the names without version of COMMON_LICENSES to their SPDX identifiers.
+
+    Only one version of these licenses is current: 'CC-BY-SA' is CC-BY-SA-4.0.
+    Names shared by several licenses are left out.
+    """
+    versionless: dict[str, set[str]] = {}
+    for name in COMMON_LICENSES:
+        for value in supported_licenses()[name]["values"]:
+            if "://" in value:
+                continue
+            for versionless_form in _versionless_forms(normalize_license_alias(value)):
+                versionless.setdefault(versionless_form, set()).add(name)
+    # 'attribution' could be CC-BY-4.0 or ODC-By-1.0
+    return {alias: names.pop() for alias, names in versionless.items() if len(names) == 1}
+
+
+def find_license(value: str | None) -> dict[str, Any] | None:
+    """Return the license matching an identifier, name or URL, if any."""
+    if not value or not (alias := normalize_license_alias(value)):
+        return None
+    if (name := license_index().get(alias)) is None:
+        return None
+    return supported_licenses()[name]
+
+
+def license_sketch(text: str) -> frozenset[int]:
+    """Return the fingerprint of a license text.
+
+    The text is lower-cased and reduced to its words,
+    each sequence of SHINGLE_SIZE words is hashed
+    and the SKETCH_SIZE smallest hashes are kept.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("licence", "license"))
+    shingles = {
+        zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode())
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+    return frozenset(heapq.nsmallest(SKETCH_SIZE, shingles))
+
+
+def sketch_similarity(sketch_1: frozenset[int], sketch_2: frozenset[int]) -> float:
+    """Estimate the Jaccard similarity of two texts from their fingerprints."""
+    union = heapq.nsmallest(SKETCH_SIZE, sketch_1 | sketch_2)
+    if not union:
+        return 0.0
+    shared = sketch_1 & sketch_2
+    return sum(1 for x in union if x in shared) / len(union)
+
+
+@functools.cache
+def license_fingerprints() -> dict[str, frozenset[int]]:
+    """Return the precomputed fingerprints of the texts of known licenses.
+
+    Loaded once per process.
+    """
+    resource = files("bids2cite") / "data" / "license_fingerprints.json.gz"
+    fingerprints = json.loads(gzip.decompress(resource.read_bytes()))
+    # each fingerprint is stored as base64 encoded little-endian uint32
     return {
-        "CC0-1.0": {
-            "name": "CC0-1.0",
-            "values": ["cc0", "cc0-1.0", "creative commons zero"],
-            "url": "https://creativecommons.org/publicdomain/zero/1.0/",
-            "api_url": "https://api.github.com/licenses/cc0-1.0",
-        },
-        "CC-BY-NC-SA-4.0": {
-            "name": "CC-BY-NC-SA-4.0",
-            "values": [
-                "cc-by-nc-sa-4.0",
-                "attribution-noncommercial-sharealike 4.0",
-            ],
-            "url": "https://creativecommons.org/licenses/by-nc-sa/4.0/",
-        },
-        "PDDL-1.0": {
-            "name": "PDDL-1.0",
-            "values": ["pddl-1.0", "pddl", "public domain dedication and license 1.0"],
-            "url": "https://opendatacommons.org/licenses/pddl/1-0/",
-            "api_url": "https://opendatacommons.org/licenses/pddl/pddl-10.txt",
-        },
-        "None": {"name": "", "values": [None, ""], "url": ""},
+        name: frozenset(struct.unpack(f"<{len(packed) // 4}I", packed))
+        for name, encoded in fingerprints["licenses"].items()
+        if (packed := base64.b64decode(encoded))
     }
 
 
+def match_license_text(text: str) -> tuple[str, float] | None:
+    """Identify a license from its text.
+
+    :return: SPDX identifier of the most similar known license
+             and the estimated similarity (between 0 and 1),
+             or None if no license is similar enough.
+    """
+    sketch = license_sketch(text)
+
+    # the similarity can only be high if the fingerprints share enough hashes
+    min_shared = LICENSE_MATCH_THRESHOLD * min(len(sketch), SKETCH_SIZE)
+
+    best_name, best_score = "", 0.0
+    for name, fingerprint in license_fingerprints().items():
+        if len(sketch & fingerprint) < min_shared:
+            continue
+        if (score := sketch_similarity(sketch, fingerprint)) > best_score:
+            best_name, best_score = name, score
+
+    if best_score < LICENSE_MATCH_THRESHOLD:
+        return None
+    return best_name, best_score
+
+
+def find_license_file(directory: Path) -> Path | None:
+    """Return the LICENSE file of a directory (LICENSE, LICENSE.txt...), if any."""
+    return next((x for x in sorted(directory.glob("LICENSE*")) if x.is_file()), None)
+
+
+def identify_license_from_file(license_file: Path) -> tuple[str, float] | None:
+    """Identify a license from the content of a LICENSE file."""
+    try:
+        text = license_file.read_text(encoding="utf-8", errors="replace")
+    except OSError as exc:
+        log.warning(f"Could not read {license_file}: {exc}")
+        return None
+    return match_license_text(text)
+
+
+@functools.cache
+def bundled_license_text(license_type: str) -> str | None:
+    """Return the text of a license shipped with bids2cite or None if not bundled."""
+    resource = files("bids2cite") / "data" / "licenses" / f"{license_type}.txt.gz"
+    if not resource.is_file():
+        return None
+    return gzip.decompress(resource.read_bytes()).decode("utf-8")
+
+
+def download_license_text(url: str) -> str | None:
+    """Download the text of a license."""
+    import requests
+
+    try:
+        response = http_get(url)
+    except requests.RequestException as exc:
+        log.warning(f"Could not get license from {url}: {exc}")
+        return None
+
+    if response.status_code != VALID_RESPONSE:
+        log.warning(f"Could not get license from {url}")
+        return None
+
+    try:
+        return str(response.json()["body"])
+    except Exception:
+        return response.content.decode("utf-8")
+
+
 def add_license_file(license_type: str, output_dir: Path) -> None:
-    """Add a license file to the dataset directory."""
-    licenses = supported_licenses()
+    """Add a license file to the dataset directory.
 
-    if license_type not in (licenses_choices := list(licenses.keys())):
-        log.warning(f"License {license_type} not recognized.")
-        print_ordered_list(msg="Supported licenses are:", items=licenses_choices)
+    Use the license text bundled with bids2cite
+    and only try to download it if it is not available.
+    """
+    licenses = supported_licenses()
 
-        return
+    if license_type not in licenses:
+        log.warning(
+            f"License {license_type} not recognized. "
+            f"Supported licenses are listed at {SPDX_LIST_URL}"
+        )
+        print_ordered_list(msg="Common licenses are:", items=COMMON_LICENSES)
 
-    url = licenses[license_type].get("api_url", "")
-    if url in [None, ""]:
-        log.warning(f"No available template for license {license_type}")
         return
 
-    response = requests.get(url)  # type: ignore[arg-type]
+    if (license_content := bundled_license_text(license_type)) is None:
+        url = licenses[license_type].get("api_url", "")
+        if url in [None, ""]:
+            log.warning(f"No available template for license {license_type}")
+            return
 
-    if response.status_code == VALID_RESPONSE:
-        license_file = output_dir / "LICENSE"
-        license_file.parent.mkdir(parents=True, exist_ok=True)
-        log.info(f"creating {license_file}")
-        try:
-            license_content = response.json()["body"]
-        except Exception:
-            license_content = response.content.decode("utf-8")
+        if (license_content := download_license_text(url)) is None:
+            return
 
-        with license_file.open("w", encoding="utf-8") as f:
-            f.write(license_content)
-    else:
-        log.warning(f"Could not get license from {url}")
+    license_file = output_dir / "LICENSE"
+    license_file.parent.mkdir(parents=True, exist_ok=True)
+    log.info(f"creating {license_file}")
+    with license_file.open("w", encoding="utf-8") as f:
+        f.write(license_content)
 
 
 def update_license(
@@ -86,6 +330,20 @@ def update_license(
 
     name, url = identify_license(ds_desc)
 
+    # use the content of the dataset LICENSE file
+    # when the License field is missing or not recognized
+    if (
+        (name == "" or find_license(name) is None)
+        and (license_file := find_license_file(bids_dir))
+        and (match := identify_license_from_file(license_file))
+    ):
+        name, similarity = match
+        url = supported_licenses()[name].get("url", "")
+        log.warning(
+            f"License '{name}' identified from {license_file} "
+            f"(similarity: {similarity:.2f})."
+        )
+
     license_file_present = "LICENSE" in [x.name for x in bids_dir.glob("LICENSE*")]
     if force or not license_file_present:
         add_license_file(name, output_dir)
@@ -113,14 +371,9 @@ def identify_license(ds_desc: dict[str, Any]) -> tuple[str, str]:
     name = ds_desc.get("License", "")
     url = ""
 
-    licenses = supported_licenses()
-    licenses_choices = list(licenses.keys())
-
-    for key in licenses_choices:
-        if name.lower() in licenses[key]["values"]:
-            name = licenses[key]["name"]
-            url = licenses[key].get("url", "")  # type: ignore[assignment]
-            break
+    if license := find_license(name):
+        name = license["name"]
+        url = license.get("url", "")
 
     if name not in [""]:
         log.debug(f"License {name} found.")
@@ -138,6 +391,8 @@ def manually_add_license(
     skip_prompt: bool = False,
 ) -> tuple[str, str]:
     """Prompt user for what license to add."""
+    from rich.prompt import Prompt
+
     add_license = Prompt.ask(
         prompt_format("Do you want to add a license?"),
         default="yes",
@@ -146,7 +401,7 @@ def manually_add_license(
     print()
 
     if add_license == "yes":
-        licenses = list(supported_licenses().keys())
+        licenses = COMMON_LICENSES
         choices = [str(i + 1) for i, _ in enumerate(licenses)]
 
         print_ordered_list(msg="Possible licences:", items=licenses)
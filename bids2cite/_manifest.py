@@ -0,0 +1,190 @@
+"""Keep track of the inputs of a run to only redo what changed on the next one."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from bids2cite._deadline import collect_not_enriched
+from bids2cite._profile import span
+from bids2cite._version import __version__
+
+log = logging.getLogger("bids2datacite")
+
+# stored in the output directory
+MANIFEST_FILENAME = ".bids2cite_manifest.json"
+
+
+def file_digest(path: Path | None) -> str | None:
+    """Return the SHA-256 of the content of a file or None if it does not exist."""
+    if path is None or not path.is_file():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def value_digest(value: Any) -> str:
+    """Return the SHA-256 of a JSON serializable value."""
+    content = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def license_files_digest(directory: Path) -> dict[str, str | None]:
+    """Return the SHA-256 of each LICENSE file of a directory."""
+    return {
+        x.name: file_digest(x) for x in sorted(directory.glob("LICENSE*")) if x.is_file()
+    }
+
+
+class Manifest:
+    """Content hashes of the inputs, stage results and outputs of the last run.
+
+    A stage (authors, references, license lookup) is only run again
+    if its inputs changed or if the files it created were modified.
+    The manifest is discarded when bids2cite is updated.
+    """
+
+    def __init__(self, output_dir: Path, reset: bool = False) -> None:
+        """Load the manifest of an output directory.
+
+        :param output_dir: Output directory of bids2cite.
+        :type output_dir: Path
+
+        :param reset: Ignore the content of the existing manifest.
+        :type reset: bool, optional
+        """
+        self.output_dir = output_dir
+        self.path = output_dir / MANIFEST_FILENAME
+        self._lock = threading.Lock()
+        self.previous = {} if reset else self._load()
+        self.inputs: str | None = None
+        self.stages: dict[str, dict[str, Any]] = {}
+        self.outputs: dict[str, str | None] = {}
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(content, dict) or content.get("version") != __version__:
+            return {}
+        return content
+
+    def _unchanged(self, outputs: dict[str, str | None]) -> bool:
+        """Check that files created by a previous run were not modified since."""
+        return all(
+            file_digest(self.output_dir / name) == digest
+            for name, digest in outputs.items()
+        )
+
+    def is_up_to_date(self, inputs: dict[str, Any]) -> bool:
+        """Tell if the last run had the same inputs and its outputs are untouched."""
+        self.inputs = value_digest(inputs)
+        return (
+            self.previous.get("inputs") == self.inputs
+            and bool(self.previous.get("outputs"))
+            and all(_complete(x) for x in self.previous.get("stages", {}).values())
+            and self._unchanged(self.previous["outputs"])
+        )
+
+    def run_stage(
+        self,
+        name: str,
+        inputs: Any,
+        func: Callable[[], Any],
+        outputs: tuple[str, ...] = (),
+    ) -> Any:
+        """Return the result of the last run of a stage if its inputs did not change.
+
+        Otherwise run the stage and record its result.
+        A stage where some entries could not be enriched (lookup failed or time out)
+        is always run again.
+
+        :param name: Name of the stage.
+        :type name: str
+
+        :param inputs: Everything the result of the stage depends on
+                       (must be JSON serializable).
+        :type inputs: Any
+
+        :param func: Function running the stage, its result must be JSON serializable.
+        :type func: Callable[[], Any]
+
+        :param outputs: Names of the files the stage may create in the output directory.
+        :type outputs: tuple[str, ...], optional
+        """
+        digest = value_digest(inputs)
+        previous = self.previous.get("stages", {}).get(name, {})
+        reused = (
+            previous.get("inputs") == digest
+            and _complete(previous)
+            and self._unchanged(previous.get("outputs", {}))
+        )
+        with span(name, reused=reused), collect_not_enriched() as not_enriched:
+            if reused:
+                log.info(f"{name}: inputs unchanged since last run")
+                result = previous["result"]
+            else:
+                result = func()
+        created = {
+            x: output_digest
+            for x in outputs
+            if (output_digest := file_digest(self.output_dir / x)) is not None
+        }
+        with self._lock:
+            self.stages[name] = {
+                "inputs": digest,
+                "result": result,
+                "outputs": created,
+                "not_enriched": not_enriched,
+            }
+        return result
+
+    def record_output(self, path: Path) -> None:
+        """Record the content of a file created in the output directory."""
+        with self._lock:
+            self.outputs[path.name] = file_digest(path)
+
+    def save(self) -> None:
+        """Write the manifest if its content changed."""
+        for stage in self.stages.values():
+            for name, digest in stage["outputs"].items():
+                self.outputs.setdefault(name, digest)
+        content = {
+            "version": __version__,
+            "inputs": self.inputs,
+            "stages": self.stages,
+            "outputs": dict(sorted(self.outputs.items())),
+        }
+        write_if_changed(self.path, json.dumps(content, indent=4, sort_keys=True))
+
+
+def _complete(stage: dict[str, Any]) -> bool:
+    return not stage.get("not_enriched")
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write a text file unless it already has this content.
+
+    The content is written to a temporary file that then replaces the file,
+    so that a partially written file is never left behind.
+
+    :return: True if the file was written.
+    """
+    if path.is_file() and path.read_text(encoding="utf-8") == content:
+        log.debug(f"{path} unchanged")
+        return False
+    log.info(f"updating {path}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_file.open("w", encoding="utf-8") as f:
+            f.write(content)
+        tmp_file.replace(path)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+    return True
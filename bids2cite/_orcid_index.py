@@ -0,0 +1,315 @@
+"""Local index of ORCID records to look up authors without network.
+
+ORCID publishes every year a file with all the public records
+(https://info.orcid.org/documentation/integration-guide/working-with-bulk-data/):
+its summaries archive (``ORCID_<year>_<month>_summaries.tar.gz``)
+contains one XML file per record.
+import_public_data_file reads this archive as a stream
+and keeps only what bids2cite uses (names and current employment)
+in a SQLite file where each ORCID iD is looked up by its primary key.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import sqlite3
+import sys
+import tarfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from argparse import ArgumentParser
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from bids2cite._profile import count
+
+log = logging.getLogger("bids2datacite")
+
+# number of records written at once while importing
+IMPORT_BATCH_SIZE = 10_000
+
+# records read between two progress messages while importing
+PROGRESS_INTERVAL = 1_000_000
+
+
+def _local_name(tag: str) -> str:
+    """Return the name of an XML element without its namespace."""
+    return tag.rpartition("}")[2]
+
+
+def _find(element: ET.Element | None, *path: str) -> ET.Element | None:
+    """Return the first descendant matching a path of names (without namespaces)."""
+    for name in path:
+        if element is None:
+            return None
+        element = next((x for x in element if _local_name(x.tag) == name), None)
+    return element
+
+
+def _text(element: ET.Element | None) -> str | None:
+    if element is None or element.text is None or not element.text.strip():
+        return None
+    return element.text.strip()
+
+
+def parse_record_summary(content: bytes) -> dict[str, str | None] | None:
+    """Read the names and current (or latest) employment of an XML record summary.
+
+    :return: The ORCID iD, first name, last name and affiliation
+             or None for files that are not records with a name
+             (deactivated or locked records...).
+    """
+    root = ET.fromstring(content)
+    if _local_name(root.tag) != "record":
+        return None
+
+    orcid = _text(_find(root, "orcid-identifier", "path"))
+    name = _find(root, "person", "name")
+    if orcid is None or name is None:
+        return None
+    firstname = _text(_find(name, "given-names"))
+    lastname = _text(_find(name, "family-name"))
+    if firstname is None and lastname is None:
+        return None
+
+    # the most recent employment comes first, but a current one
+    # (without end date) is preferred, see _authors.affiliation_from_orcid
+    employments = _find(root, "activities-summary", "employments")
+    employers = [
+        employment
+        for group in (employments if employments is not None else [])
+        for employment in group
+        if _local_name(employment.tag) == "employment-summary"
+    ]
+    current = [x for x in employers if _find(x, "end-date") is None]
+    affiliation = None
+    if employer := (current or employers):
+        affiliation = _text(_find(employer[0], "organization", "name"))
+
+    return {
+        "orcid": orcid,
+        "firstname": firstname,
+        "lastname": lastname,
+        "affiliation": affiliation,
+    }
+
+
+def _read_archive(source: Path) -> Iterator[dict[str, str | None]]:
+    """Yield the records of a summaries archive, reading it once from start to end."""
+    # "r|*": stream (compressed or not) that is never seeked nor fully loaded
+    with tarfile.open(source, mode="r|*") as archive:
+        while (member := archive.next()) is not None:
+            # the archive keeps all the members read so far unless told otherwise
+            archive.members.clear()  # type: ignore[attr-defined]
+            if not member.isfile() or not member.name.endswith(".xml"):
+                continue
+            if (f := archive.extractfile(member)) is None:
+                continue
+            try:
+                record = parse_record_summary(f.read())
+            except ET.ParseError as exc:
+                log.warning(f"Skipping {member.name}: {exc}")
+                continue
+            if record is not None:
+                yield record
+
+
+class OrcidIndex:
+    """Names and current employment of ORCID records, stored in SQLite.
+
+    :param path: SQLite file of the index.
+    :type path: Path
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS records (
+                    orcid TEXT PRIMARY KEY,
+                    firstname TEXT,
+                    lastname TEXT,
+                    affiliation TEXT
+                ) WITHOUT ROWID"""
+            )
+            self._connection = connection
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            (n_records,) = (
+                self._connect().execute("SELECT COUNT(*) FROM records").fetchone()
+            )
+        return int(n_records)
+
+    def get(self, orcid: str) -> dict[str, str | None] | None:
+        """Return the author info of a valid ORCID iD or None if it is not indexed."""
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT firstname, lastname, affiliation FROM records "
+                        "WHERE orcid = ?",
+                        (orcid.upper(),),
+                    )
+                    .fetchone()
+                )
+        except sqlite3.Error as exc:
+            log.debug(f"Could not read from ORCID index {self.path}: {exc}")
+            return None
+        count(f"orcid index {'miss' if row is None else 'hit'}")
+        if row is None:
+            return None
+        firstname, lastname, affiliation = row
+        if firstname is None:
+            # a single name is a first name, like for authors without ORCID
+            firstname, lastname = lastname, None
+        return {
+            "firstname": firstname,
+            "lastname": lastname or "",
+            "affiliation": affiliation,
+            "id": f"ORCID:{orcid.upper()}",
+        }
+
+    def add(self, records: Iterator[dict[str, str | None]]) -> int:
+        """Add (or replace) records and return how many were added."""
+        n_records = 0
+        start = time.monotonic()
+        with self._lock:
+            connection = self._connect()
+            # faster, but an interrupted import leaves an index to import again
+            connection.execute("PRAGMA journal_mode=OFF")
+            connection.execute("PRAGMA synchronous=OFF")
+            batch: list[tuple[str | None, ...]] = []
+            for record in records:
+                batch.append(
+                    (
+                        record["orcid"],
+                        record["firstname"],
+                        record["lastname"],
+                        record["affiliation"],
+                    )
+                )
+                n_records += 1
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self._insert(connection, batch)
+                    batch = []
+                if n_records % PROGRESS_INTERVAL == 0:
+                    log.info(
+                        f"{n_records} ORCID records imported "
+                        f"in {time.monotonic() - start:.0f} s"
+                    )
+            self._insert(connection, batch)
+        return n_records
+
+    @staticmethod
+    def _insert(
+        connection: sqlite3.Connection, batch: list[tuple[str | None, ...]]
+    ) -> None:
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)", batch
+            )
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def import_public_data_file(source: Path, index_path: Path) -> int:
+    """Add the records of an ORCID summaries archive to an index.
+
+    :param source: Summaries archive of the ORCID public data file
+                   (``.tar.gz`` or any other tar archive).
+    :type source: Path
+
+    :param index_path: SQLite file of the index, created if needed.
+    :type index_path: Path
+
+    :return: Number of records imported.
+    """
+    index = OrcidIndex(index_path)
+    try:
+        n_records = index.add(_read_archive(Path(source)))
+    finally:
+        index.close()
+    log.info(f"{n_records} ORCID records imported from {source} to {index_path}")
+    return n_records
+
+
+_INDEX: OrcidIndex | None = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_orcid_index() -> OrcidIndex | None:
+    """Return the index used to look up ORCID iDs, if any."""
+    return _INDEX
+
+
+def configure_orcid_index(path: Path | None = None) -> OrcidIndex | None:
+    """Look up ORCID iDs in an index before querying ORCID (None: do not).
+
+    Raises FileNotFoundError if the index does not exist.
+    """
+    global _INDEX
+    if path is not None and not Path(path).is_file():
+        raise FileNotFoundError(f"ORCID index not found: {path}")
+    with _INDEX_LOCK:
+        if _INDEX is not None:
+            _INDEX.close()
+        _INDEX = None if path is None else OrcidIndex(Path(path))
+        return _INDEX
+
+
+@atexit.register
+def _close_index() -> None:
+    if _INDEX is not None:
+        _INDEX.close()
+
+
+def _cli(argv: Any = sys.argv) -> None:
+    """Execute the index import script for CLI."""
+    from rich_argparse import RichHelpFormatter
+
+    from bids2cite._utils import bids2cite_log
+
+    parser = ArgumentParser(
+        description="""Import the ORCID public data file in an index to look up
+        authors without network (see the --orcid-index option of bids2cite).""",
+        formatter_class=RichHelpFormatter,
+    )
+    parser.add_argument(
+        "source",
+        help="Summaries archive of the ORCID public data file "
+        "(ORCID_<year>_<month>_summaries.tar.gz).",
+    )
+    parser.add_argument(
+        "index", help="SQLite file of the index (records are added if it exists)."
+    )
+    args = parser.parse_args(argv[1:])
+
+    log = bids2cite_log(name="bids2datacite")
+    log.setLevel("INFO")
+
+    try:
+        import_public_data_file(Path(args.source), Path(args.index))
+    except (OSError, tarfile.TarError) as exc:
+        log.error(exc)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,152 @@
+"""Record where the time goes: stages, requests and cache use.
+
+Profiling is disabled by default and then costs a single check per span.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Profiler:
+    """Collect timed spans and counters.
+
+    Spans are stored as Chrome trace 'complete' events
+    (see https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU).
+    """
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.counters: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter_ns()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._start) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def write_trace(self, trace_file: Path) -> None:
+        """Write the events to a JSON file that can be opened in Perfetto or Chrome."""
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        content = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": dict(self.counters)},
+        }
+        with trace_file.open("w", encoding="utf-8") as f:
+            json.dump(content, f, default=str)
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Aggregate the spans by category and name."""
+        rows: dict[tuple[str, str], dict[str, Any]] = {}
+        for event in self.events:
+            key = (event["cat"], event["name"])
+            row = rows.setdefault(
+                key,
+                {
+                    "category": event["cat"],
+                    "name": event["name"],
+                    "count": 0,
+                    "duration": 0.0,
+                    "bytes": 0,
+                    "retries": 0,
+                },
+            )
+            row["count"] += 1
+            row["duration"] += event["dur"] / 1e6
+            row["bytes"] += event["args"].get("bytes", 0)
+            row["retries"] += event["args"].get("retries", 0)
+        return list(rows.values())
+
+    def print_summary(self) -> None:
+        """Print a table of the time spent in each stage and service."""
+        from rich import print
+        from rich.table import Table
+
+        table = Table(title="bids2cite profile")
+        for column in ["category", "name", "count", "time (s)", "kB", "retries"]:
+            table.add_column(
+                column, justify="left" if column in ["category", "name"] else "right"
+            )
+        for row in self.summary():
+            table.add_row(
+                row["category"],
+                row["name"],
+                str(row["count"]),
+                f"{row['duration']:.3f}",
+                f"{row['bytes'] / 1024:.1f}" if row["bytes"] else "",
+                str(row["retries"]) if row["retries"] else "",
+            )
+        print(table)
+        if self.counters:
+            print(", ".join(f"{k}: {v}" for k, v in sorted(self.counters.items())))
+
+
+_PROFILER: Profiler | None = None
+
+
+def enable_profiling() -> Profiler:
+    """Start recording spans and counters in this process."""
+    global _PROFILER
+    _PROFILER = Profiler()
+    return _PROFILER
+
+
+def disable_profiling() -> Profiler | None:
+    """Stop recording and return what was recorded."""
+    global _PROFILER
+    profiler, _PROFILER = _PROFILER, None
+    return profiler
+
+
+def get_profiler() -> Profiler | None:
+    return _PROFILER
+
+
+def span(
+    name: str, category: str = "stage", **args: Any
+) -> contextlib.AbstractContextManager[dict[str, Any] | None]:
+    """Time a block of code.
+
+    The context manager gives a dictionary in which details can be added
+    (bytes, retries...), or None when profiling is disabled.
+    """
+    if _PROFILER is None:
+        return _NULL_SPAN
+    return _PROFILER.span(name, category, **args)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increment a counter (cache hits...) when profiling is enabled."""
+    if _PROFILER is not None:
+        _PROFILER.count(name, value)
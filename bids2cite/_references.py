@@ -3,19 +3,52 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
+from urllib.parse import quote
 
-import crossref_commons.retrieval
-import requests
 from rich import print
-from rich.prompt import Prompt
 
+from bids2cite._authors import DEFAULT_MAX_WORKERS
+from bids2cite._cache import cached, get_cache
+from bids2cite._deadline import not_enriched, submit
+from bids2cite._http import TokenBucket, http_get, http_settings
+from bids2cite._json_stream import JsonStream
 from bids2cite._utils import VALID_RESPONSE, print_ordered_list, prompt_format
 
 log = logging.getLogger("bids2datacite")
 
 MAX_N_AUTHORS = 3
 
+CROSSREF_WORKS_URL = "https://api.crossref.org/works"
+
+# fields of the works used to build a reference
+CROSSREF_FIELDS = ("DOI", "title", "short-container-title", "created", "author")
+
+# bytes read at once from the answers of Crossref
+CROSSREF_CHUNK_SIZE = 16 * 1024
+
+# requests per second and concurrent requests allowed by Crossref
+# for single work requests (/works/{doi}, see get_reference_info_from_doi)
+# in its public pool and in its polite pool (requests with a mailto),
+# list queries (/works?filter=...) have lower limits
+# https://www.crossref.org/documentation/retrieve-metadata/rest-api/access-and-authentication/
+CROSSREF_LIMITS = {"public": (5, 1), "polite": (10, 3)}
+
+_CROSSREF_BUCKETS: dict[str, TokenBucket] = {}
+_CROSSREF_BUCKETS_LOCK = threading.Lock()
+
+PUBMED_ESUMMARY_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+
+# number of PMIDs sent in a single request to esummary
+PUBMED_BATCH_SIZE = 200
+
+# NCBI allows 3 requests per second without API key
+PUBMED_REQUEST_INTERVAL = 1 / 3
+
 
 def get_reference_id(reference: str) -> str:
     """Find the reference DOI or PMID."""
@@ -35,26 +68,51 @@ def get_reference_id(reference: str) -> str:
         doi = reference.split("doi.org/")[1]
         ref_id = f"doi:{doi}"
 
-    if ref_id == "":
-        log.warning(f"No PMID or DOI found in:\n{reference}")
-
     ref_id = ref_id.strip()
 
     return ref_id
 
 
-def get_reference_details(reference: str) -> dict[str, str]:
-    """Get reference details."""
+def get_reference_details(
+    reference: str,
+    pubmed_info: dict[str, dict[str, Any] | None] | None = None,
+    doi_info: dict[str, dict[str, Any] | None] | None = None,
+) -> dict[str, str]:
+    """Get reference details.
+
+    :param reference: Reference as listed in the dataset description.
+    :type reference: str
+
+    :param pubmed_info: Already fetched PubMed info indexed by PMID
+                        (see get_references_info_from_pmids).
+    :type pubmed_info: dict[str, dict[str, Any] | None] | None, optional
+
+    :param doi_info: Already fetched Crossref info indexed by DOI
+                     (see get_references_info_from_dois).
+    :type doi_info: dict[str, dict[str, Any] | None] | None, optional
+    """
     info = None
 
     ref_id = get_reference_id(reference)
-    if ref_id.startswith("pmid"):
-        info = get_reference_info_from_pmid(ref_id.split("pmid:")[1])
+    if ref_id == "":
+        log.warning(f"No PMID or DOI found in:\n{reference}")
+    elif ref_id.startswith("pmid"):
+        pmid = ref_id.split("pmid:")[1]
+        if pubmed_info is not None and pmid in pubmed_info:
+            info = pubmed_info[pmid]
+        else:
+            info = get_reference_info_from_pmid(pmid)
     elif ref_id.startswith("doi"):
-        info = get_reference_info_from_doi(ref_id.split("doi:")[1])
+        doi = ref_id.split("doi:")[1]
+        if doi_info is not None and doi in doi_info:
+            info = doi_info[doi]
+        else:
+            info = get_reference_info_from_doi(doi)
 
     this_reference = {"citation": reference, "id": ref_id, "reftype": "IsSupplementTo"}
 
+    if info is None and ref_id != "":
+        not_enriched(reference)
     if info is not None:
         this_reference["citation"] = (
             f"""{", ".join(info["authors"])}; {info["title"]}; {info["journal"]}; {info["year"]}; {ref_id}"""  # noqa
@@ -64,22 +122,36 @@ def get_reference_details(reference: str) -> dict[str, str]:
 
 
 def update_references(
-    ds_desc: dict[str, Any], skip_prompt: bool = False
+    ds_desc: dict[str, Any],
+    skip_prompt: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
 ) -> list[dict[str, str]]:
-    """Update references based on dataset description."""
+    """Update references based on dataset description.
+
+    :param max_workers: Maximum number of parallel requests used to look up DOIs.
+    :type max_workers: int, optional
+    """
     log.info("update references")
 
     references = []
 
     if "ReferencesAndLinks" in ds_desc:
+        ref_ids = [get_reference_id(x) for x in ds_desc["ReferencesAndLinks"]]
+        pmids = [x.split("pmid:")[1] for x in ref_ids if x.startswith("pmid")]
+        pubmed_info = get_references_info_from_pmids(pmids)
+        dois = [x.split("doi:")[1] for x in ref_ids if x.startswith("doi")]
+        doi_info = get_references_info_from_dois(dois, max_workers=max_workers)
+
         for reference in ds_desc["ReferencesAndLinks"]:
-            this_reference = get_reference_details(reference)
+            this_reference = get_reference_details(reference, pubmed_info, doi_info)
 
             references.append(this_reference)
 
     if skip_prompt:
         return references
 
+    from rich.prompt import Prompt
+
     items = [x["citation"] for x in references]
     print_ordered_list(msg="Current references:", items=items)
 
@@ -110,68 +182,274 @@ def update_references(
     return references
 
 
+def crossref_pool() -> str:
+    """Return the Crossref pool the requests are sent to (see CROSSREF_LIMITS)."""
+    return "polite" if http_settings()["mailto"] else "public"
+
+
+def crossref_limits() -> tuple[float, int] | None:
+    """Return the requests per second and concurrent requests allowed by Crossref.
+
+    None if the requests are not sent to Crossref (replayed or sent to a mirror).
+    """
+    settings = http_settings()
+    if settings["replay"] is not None or any(
+        CROSSREF_WORKS_URL.startswith(x) for x in settings["endpoints"]
+    ):
+        return None
+    return CROSSREF_LIMITS[crossref_pool()]
+
+
+def _crossref_rate_limit() -> None:
+    """Wait until a request can be sent to Crossref."""
+    if (limits := crossref_limits()) is None:
+        return
+    pool = crossref_pool()
+    with _CROSSREF_BUCKETS_LOCK:
+        if (bucket := _CROSSREF_BUCKETS.get(pool)) is None:
+            bucket = _CROSSREF_BUCKETS[pool] = TokenBucket(limits[0])
+    bucket.acquire()
+
+
+def get_references_info_from_dois(
+    dois: list[str], max_workers: int = DEFAULT_MAX_WORKERS
+) -> dict[str, dict[str, Any] | None]:
+    """Get reference info for several DOIs with parallel requests.
+
+    The number of parallel requests is also limited by what Crossref allows
+    (see CROSSREF_LIMITS).
+
+    :return: Reference info indexed by DOI, in the same order as dois
+             (None if no reference was found).
+    """
+    dois = list(dict.fromkeys(dois))
+    n_workers = min(max_workers, len(dois))
+    if (limits := crossref_limits()) is not None:
+        n_workers = min(n_workers, limits[1])
+    if n_workers <= 1:
+        return {doi: get_reference_info_from_doi(doi) for doi in dois}
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = {
+            doi: submit(executor, get_reference_info_from_doi, doi) for doi in dois
+        }
+        return {doi: future.result() for doi, future in futures.items()}
+
+
+@cached("crossref")
 def get_reference_info_from_doi(doi: str) -> dict[str, Any] | None:
-    """Get reference info from DOI."""
+    """Get reference info from DOI.
+
+    The DOI is part of the path (a filter would split DOIs containing commas).
+    The download stops once the fields that are used are read,
+    so the authors after the first MAX_N_AUTHORS + 2 and the references
+    of the work are usually not downloaded.
+    Requests are spaced to stay within the rate limit of Crossref.
+    """
+    import requests
+
     try:
-        content = crossref_commons.retrieval.get_publication_as_json(doi)
-    except Exception:
+        _crossref_rate_limit()
+        response = http_get(f"{CROSSREF_WORKS_URL}/{quote(doi)}", stream=True)
+    except requests.RequestException as exc:
+        log.warning(f"Could not get a reference for doi:{doi}: {exc}")
+        return None
+
+    with response:
+        if response.status_code != VALID_RESPONSE:
+            log.warning(f"Could not get a reference for doi:{doi}")
+            return None
+        try:
+            content = read_crossref_work(
+                response.iter_content(CROSSREF_CHUNK_SIZE), MAX_N_AUTHORS + 2
+            )
+        except (requests.RequestException, ValueError, KeyError, IndexError) as exc:
+            log.warning(f"Could not get a reference for doi:{doi}: {exc}")
+            return None
+
+    if content is None:
         log.warning(f"Could not get a reference for doi:{doi}")
         return None
 
+    # any field can be missing: the citation then only lacks that part
     authors = []
-    for i, author in enumerate(content["author"]):
-        authors.append(f"{author['given']}, {author['family']}")
+    for i, author in enumerate(content.get("author", [])):
+        authors.append(crossref_author_name(author))
         if i > MAX_N_AUTHORS:
             authors.append("et al.")
             break
 
+    date_parts = content.get("created", {}).get("date-parts") or [[""]]
     return {
-        "title": content["title"][0],
-        "journal": content["short-container-title"][0],
-        "year": content["created"]["date-parts"][0][0],
+        "title": (content.get("title") or [""])[0],
+        "journal": (content.get("short-container-title") or [""])[0],
+        "year": date_parts[0][0] if date_parts[0] else "",
         "authors": authors,
-        "doi": content["DOI"],
+        "doi": content.get("DOI", doi),
     }
 
 
+def crossref_author_name(author: dict[str, str]) -> str:
+    """Return 'given, family' for a person or the name of an organization.
+
+    Consortia and other organizations only have a name.
+    """
+    if "given" in author and "family" in author:
+        return f"{author['given']}, {author['family']}"
+    return author.get("name") or author.get("family") or author.get("given", "")
+
+
+def read_crossref_work(
+    chunks: Iterable[bytes], max_authors: int
+) -> dict[str, Any] | None:
+    """Read the work of a Crossref answer while it is downloaded.
+
+    Reading stops as soon as all the CROSSREF_FIELDS are found,
+    keeping only the first max_authors authors.
+
+    :param chunks: Content of the answer of the works API for a DOI.
+    :type chunks: Iterable[bytes]
+
+    :return: Fields of the work or None if the answer contains no work.
+    """
+    stream = JsonStream(chunks)
+    for key in stream.iter_keys():
+        if key != "message":
+            stream.skip()
+            continue
+        if stream.peek() != "{":
+            stream.skip()
+            return None
+        work = _read_work(stream, max_authors)
+        log.debug(f"read {stream.bytes_read} bytes from Crossref")
+        return work
+    return None
+
+
+def _read_work(stream: JsonStream, max_authors: int) -> dict[str, Any]:
+    work: dict[str, Any] = {"author": []}
+    found: set[str] = set()
+    for key in stream.iter_keys():
+        if key == "author":
+            elements = stream.iter_elements()
+            for _ in elements:
+                work["author"].append(stream.value())
+                if len(work["author"]) == max_authors:
+                    break
+            found.add(key)
+            if found == set(CROSSREF_FIELDS):
+                return work
+            for _ in elements:
+                stream.skip()
+            continue
+        if key in CROSSREF_FIELDS:
+            work[key] = stream.value()
+            found.add(key)
+        else:
+            stream.skip()
+        if found == set(CROSSREF_FIELDS):
+            return work
+    return work
+
+
+def reference_info_from_pubmed_summary(summary: dict[str, Any]) -> dict[str, Any]:
+    """Extract reference info from a PubMed document summary."""
+    authors = []
+    for i, author in enumerate(summary["authors"]):
+        authors.append(f"{author['name']}")
+        if i > MAX_N_AUTHORS:
+            authors.append("et al.")
+            break
+
+    doi = None
+    for x in summary["articleids"]:
+        if x["idtype"] == "doi":
+            doi = x["value"]
+
+    return {
+        "title": summary["title"],
+        "journal": summary["fulljournalname"],
+        "year": summary["pubdate"].split(" ")[0],
+        "authors": authors,
+        "doi": doi,
+    }
+
+
+@cached("pubmed")
 def get_reference_info_from_pmid(pmid: str) -> None | dict[str, Any]:
     """Get reference info from PubMed."""
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-    url = f"{base_url}?db=pubmed&id={pmid}&retmode=json"
+    import requests
 
-    response = requests.get(url)
+    url = f"{PUBMED_ESUMMARY_URL}?db=pubmed&id={pmid}&retmode=json"
+
+    try:
+        response = http_get(url)
+    except requests.RequestException as exc:
+        log.warning(f"Could not query PubMed for pmid:{pmid}: {exc}")
+        return None
 
     if response.status_code == VALID_RESPONSE:
         content = response.json()["result"]
-        if pmid in content:
-            content = content[pmid]
-        else:
-            log.warning(f"No reference matching pmid:{pmid} at url {url}")
-            return None
+        if pmid in content and "error" not in content[pmid]:
+            return reference_info_from_pubmed_summary(content[pmid])
 
-        authors = []
-        for i, author in enumerate(content["authors"]):
-            authors.append(f"{author['name']}")
-            if i > MAX_N_AUTHORS:
-                authors.append("et al.")
-                break
-
-        for x in content["articleids"]:
-            if x["idtype"] == "doi":
-                doi = x["value"]
-
-        return {
-            "title": content["title"],
-            "journal": content["fulljournalname"],
-            "year": content["pubdate"].split(" ")[0],
-            "authors": authors,
-            "doi": doi,
-        }
+        log.warning(f"No reference matching pmid:{pmid} at url {url}")
+        return None
     else:
         log.warning(f"No reference matching pmid:{pmid}")
         return None
 
 
+def get_references_info_from_pmids(
+    pmids: list[str],
+) -> dict[str, dict[str, Any] | None]:
+    """Get reference info for several PMIDs using as few requests as possible.
+
+    PMIDs already in the cache are not requested again,
+    the others are sent by batches of PUBMED_BATCH_SIZE to esummary.
+
+    :return: Reference info indexed by PMID (None if no reference was found).
+    """
+    import requests
+
+    cache = get_cache()
+
+    info: dict[str, dict[str, Any] | None] = {}
+    missing = []
+    for pmid in dict.fromkeys(pmids):
+        if (cached_info := cache.get("pubmed", pmid)) is not None:
+            info[pmid] = cached_info
+        else:
+            missing.append(pmid)
+
+    for i in range(0, len(missing), PUBMED_BATCH_SIZE):
+        if i > 0:
+            time.sleep(PUBMED_REQUEST_INTERVAL)
+
+        batch = missing[i : i + PUBMED_BATCH_SIZE]
+        log.debug(f"requesting {len(batch)} PMIDs from PubMed")
+        content = {}
+        try:
+            response = http_get(
+                PUBMED_ESUMMARY_URL,
+                params={"db": "pubmed", "id": ",".join(batch), "retmode": "json"},
+            )
+            if response.status_code == VALID_RESPONSE:
+                content = response.json().get("result", {})
+        except requests.RequestException as exc:
+            log.warning(f"Could not query PubMed: {exc}")
+
+        for pmid in batch:
+            if pmid in content and "error" not in content[pmid]:
+                info[pmid] = reference_info_from_pubmed_summary(content[pmid])
+                cache.set("pubmed", pmid, info[pmid])
+            else:
+                log.warning(f"No reference matching pmid:{pmid}")
+                info[pmid] = None
+
+    return info
+
+
 def references_for_datacite(references: list[dict[str, str]]) -> list[str]:
     """Return authors formatted for datacite files."""
     return [
@@ -0,0 +1,378 @@
+"""Serve bids2cite over HTTP to avoid starting a new process for each dataset.
+
+The server keeps the lookup cache, the HTTP connections and the license
+registry of its process warm, so a request only takes the time of the lookups
+that are not in the cache.
+
+Endpoints:
+
+- ``GET /health``: ``{"status": "ok", "version": ...}``
+- ``POST /bids2cite`` with a JSON body containing either ``bids_dir``
+  (path of a dataset the server can access, outputs are written in it)
+  or ``dataset_description`` (content of a dataset_description.json,
+  outputs are only returned), and optionally ``output_format``, ``description``,
+  ``keywords``, ``license``, ``max_lookup_time`` and ``force``.
+  The answer contains the content of the output files
+  and the entries that could not be looked up.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from bids2cite._authors import DEFAULT_MAX_WORKERS
+from bids2cite._cache import get_cache
+from bids2cite._deadline import collect_not_enriched
+from bids2cite._http import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRIES,
+    configure_http,
+    get_session,
+)
+from bids2cite._license import license_fingerprints, license_index
+from bids2cite._orcid_index import configure_orcid_index
+from bids2cite._utils import bids2cite_log, default_log_level, log_levels
+from bids2cite._version import __version__
+from bids2cite._writers import WRITERS, load_writers, parse_output_formats
+from bids2cite.bids2cite import DEFAULT_N_JOBS, bids2cite
+
+log = logging.getLogger("bids2datacite")
+
+DEFAULT_PORT = 8765
+
+# largest request body accepted (in bytes)
+MAX_BODY_SIZE = 10 * 2**20
+
+# options of bids2cite() that can be passed in a request
+REQUEST_OPTIONS = {
+    "output_format": (str, list),
+    "description": (str,),
+    "keywords": (list,),
+    "license": (str,),
+    "max_lookup_time": (int, float),
+    "force": (bool,),
+}
+
+
+class RequestError(Exception):
+    """Invalid request, answered with a 400 status."""
+
+
+def warm_up() -> None:
+    """Load everything that is otherwise loaded by the first run."""
+    get_cache()
+    get_session()
+    license_index()
+    license_fingerprints()
+    load_writers()
+
+
+class Bids2citeService:
+    """Run bids2cite for the requests received by the server.
+
+    :param max_workers: Maximum number of parallel requests used to look up authors.
+    :type max_workers: int
+
+    :param n_jobs: Number of requests processed at the same time,
+                   the others wait for their turn.
+    :type n_jobs: int
+    """
+
+    def __init__(self, max_workers: int, n_jobs: int = DEFAULT_N_JOBS) -> None:
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max(1, n_jobs))
+        self._locks: dict[Path, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _dataset_lock(self, bids_dir: Path) -> threading.Lock:
+        """Return the lock preventing two runs on the same dataset at the same time."""
+        with self._locks_lock:
+            return self._locks.setdefault(bids_dir, threading.Lock())
+
+    def run(self, content: dict[str, Any]) -> dict[str, Any]:
+        """Run bids2cite for the content of a request.
+
+        Raises RequestError if the request is not valid.
+        """
+        if not isinstance(content, dict):
+            raise RequestError("The request must be a JSON object.")
+        options = _parse_options(content)
+
+        with self._slots:
+            if "dataset_description" in content:
+                ds_desc = content["dataset_description"]
+                if not isinstance(ds_desc, dict) or "Name" not in ds_desc:
+                    raise RequestError(
+                        "'dataset_description' must be an object with a 'Name'."
+                    )
+                with tempfile.TemporaryDirectory(prefix="bids2cite_") as tmp:
+                    bids_dir = Path(tmp)
+                    with (bids_dir / "dataset_description.json").open(
+                        "w", encoding="utf-8"
+                    ) as f:
+                        json.dump(ds_desc, f)
+                    return self._run(bids_dir, options)
+
+            if not isinstance(content.get("bids_dir"), str):
+                raise RequestError(
+                    "Either 'bids_dir' or 'dataset_description' is required."
+                )
+            bids_dir = Path(content["bids_dir"]).expanduser().resolve()
+            if not (bids_dir / "dataset_description.json").is_file():
+                raise RequestError(f"dataset_description.json not found in {bids_dir}")
+            with self._dataset_lock(bids_dir):
+                result = self._run(bids_dir, options)
+            result["output_dir"] = str(bids_dir / "derivatives" / "bids2cite")
+            return result
+
+    def _run(self, bids_dir: Path, options: dict[str, Any]) -> dict[str, Any]:
+        with collect_not_enriched() as not_enriched:
+            bids2cite(
+                bids_dir=bids_dir,
+                skip_prompt=True,
+                max_workers=self.max_workers,
+                **options,
+            )
+        output_dir = bids_dir / "derivatives" / "bids2cite"
+        filenames = [
+            "dataset_description.json",
+            *(
+                WRITERS[x].filename
+                for x in parse_output_formats(options["output_format"])
+            ),
+        ]
+        return {
+            "status": "success",
+            "files": {
+                name: (output_dir / name).read_text(encoding="utf-8")
+                for name in filenames
+                if (output_dir / name).is_file()
+            },
+            "not_enriched": not_enriched,
+        }
+
+
+def _parse_options(content: dict[str, Any]) -> dict[str, Any]:
+    """Return the options of bids2cite() found in a request."""
+    options: dict[str, Any] = {"output_format": "datacite"}
+    for name, types in REQUEST_OPTIONS.items():
+        if (value := content.get(name)) is None:
+            continue
+        if not isinstance(value, types) or (
+            isinstance(value, bool) and bool not in types
+        ):
+            raise RequestError(f"Invalid value for '{name}': {value!r}")
+        options[name] = value
+    try:
+        parse_output_formats(options["output_format"])
+    except ValueError as exc:
+        raise RequestError(str(exc)) from exc
+    return options
+
+
+def _handler(service: Bids2citeService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = f"bids2cite/{__version__}"
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "version": __version__})
+            else:
+                self._send(404, {"status": "failure", "error": "Not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/bids2cite":
+                self._send(404, {"status": "failure", "error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                if length > MAX_BODY_SIZE:
+                    raise RequestError("The request is too large.")
+                try:
+                    content = json.loads(self.rfile.read(length) or b"null")
+                except ValueError as exc:
+                    raise RequestError(f"Invalid JSON: {exc}") from exc
+                result = service.run(content)
+            except RequestError as exc:
+                self._send(400, {"status": "failure", "error": str(exc)})
+            except Exception as exc:
+                log.exception("bids2cite failed")
+                self._send(
+                    500, {"status": "failure", "error": f"{type(exc).__name__}: {exc}"}
+                )
+            else:
+                self._send(200, result)
+
+        def _send(self, status: int, content: dict[str, Any]) -> None:
+            body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            log.info(f"{self.address_string()} - {format % args}")
+
+    return Handler
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class ThreadingUnixHTTPServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+    ):
+        """HTTP server listening on a Unix socket."""
+
+        daemon_threads = True
+
+        def get_request(self) -> tuple[socket.socket, Any]:
+            # BaseHTTPRequestHandler expects an address, Unix socket clients have none
+            request, _ = super().get_request()
+            return request, ("local", 0)
+
+
+def make_server(
+    service: Bids2citeService,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    unix_socket: Path | None = None,
+) -> socketserver.BaseServer:
+    """Create a server (not started) answering requests with service.
+
+    :param unix_socket: Listen on this Unix socket instead of host and port.
+    :type unix_socket: Path | None, optional
+    """
+    handler = _handler(service)
+    if unix_socket is None:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        return server
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError("Unix sockets are not supported on this platform.")
+    if unix_socket.is_socket():
+        unix_socket.unlink()
+    return ThreadingUnixHTTPServer(str(unix_socket), handler)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    unix_socket: Path | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    n_jobs: int = DEFAULT_N_JOBS,
+) -> None:
+    """Answer requests until interrupted."""
+    warm_up()
+    server = make_server(Bids2citeService(max_workers, n_jobs), host, port, unix_socket)
+    address = unix_socket if unix_socket is not None else f"http://{host}:{port}"
+    log.warning(f"bids2cite {__version__} listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if unix_socket is not None:
+            unix_socket.unlink(missing_ok=True)
+
+
+def _cli(argv: Any = sys.argv) -> None:
+    """Execute the server script for CLI."""
+    from rich_argparse import RichHelpFormatter
+
+    parser = ArgumentParser(
+        description="Serve bids2cite over HTTP.", formatter_class=RichHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="Port to listen on."
+    )
+    parser.add_argument(
+        "--unix-socket", default=None, help="Listen on this Unix socket instead."
+    )
+    parser.add_argument(
+        "--max-workers",
+        help="Maximum number of parallel requests used to look up authors and DOIs.",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+    )
+    parser.add_argument(
+        "--n-jobs",
+        help="Number of datasets processed at the same time.",
+        type=int,
+        default=DEFAULT_N_JOBS,
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        help="Seconds to wait for a connection to ORCID, Crossref, PubMed...",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+    )
+    parser.add_argument(
+        "--read-timeout",
+        help="Seconds to wait for an answer from ORCID, Crossref, PubMed...",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+    )
+    parser.add_argument(
+        "--retries",
+        help="How many times a failed or throttled request is retried.",
+        type=int,
+        default=DEFAULT_RETRIES,
+    )
+    parser.add_argument(
+        "--mailto",
+        help="Contact email sent with the lookups (faster Crossref lookups).",
+        default=None,
+    )
+    parser.add_argument(
+        "--orcid-index",
+        help="Index of the ORCID public data file where authors are looked up first.",
+        default=None,
+    )
+    parser.add_argument(
+        "--verbose", "-v", dest="log_level", action="append_const", const=-1
+    )
+    args = parser.parse_args(argv[1:])
+
+    log = bids2cite_log(name="bids2datacite")
+    log_level = log_levels().index(default_log_level())
+    for adjustment in args.log_level or ():
+        log_level = min(len(log_levels()) - 1, max(log_level + adjustment, 0))
+    log.setLevel(log_levels()[log_level])
+
+    configure_http(
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        retries=args.retries,
+        mailto=args.mailto,
+    )
+    try:
+        configure_orcid_index(Path(args.orcid_index) if args.orcid_index else None)
+    except FileNotFoundError as exc:
+        log.error(exc)
+        sys.exit(1)
+    serve(
+        host=args.host,
+        port=args.port,
+        unix_socket=Path(args.unix_socket) if args.unix_socket else None,
+        max_workers=args.max_workers,
+        n_jobs=args.n_jobs,
+    )
+
+
+if __name__ == "__main__":
+    _cli()
@@ -6,8 +6,6 @@ import logging
 from typing import Any
 
 from rich import print
-from rich.logging import RichHandler
-from rich.traceback import install
 
 FORMAT = "bids2datacite - %(asctime)s - %(levelname)s - %(message)s"
 
@@ -36,6 +34,9 @@ def bids2cite_log(name: str | None = None) -> logging.Logger:
     :return: _description_
     :rtype: _type_
     """
+    from rich.logging import RichHandler
+    from rich.traceback import install
+
     # let rich print the traceback
     install(show_locals=True)
 
@@ -0,0 +1,358 @@
+"""Write the resolved metadata of a dataset in the different output formats."""
+
+from __future__ import annotations
+
+import functools
+import io
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from importlib.resources import files
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from bids2cite._authors import authors_for_citation
+from bids2cite._profile import span
+from bids2cite._references import references_for_citation
+
+if TYPE_CHECKING:
+    import ruamel.yaml
+
+log = logging.getLogger("bids2datacite")
+
+CFF_VERSION = "1.2.0"
+
+
+@dataclass
+class Metadata:
+    """Metadata of a dataset once authors, references and license are resolved.
+
+    Shared by all the writers: producing an extra format does not require
+    any new lookup.
+    """
+
+    name: str
+    description: str = ""
+    keywords: list[str] = field(default_factory=list)
+    authors: list[dict[str, str | None]] = field(default_factory=list)
+    references: list[dict[str, str]] = field(default_factory=list)
+    funding: list[str] = field(default_factory=list)
+    license_name: str = ""
+    license_url: str = ""
+    doi: str = ""
+
+
+@dataclass(frozen=True)
+class Writer:
+    """Output format."""
+
+    name: str
+    filename: str
+    # should raise an exception if the metadata cannot be rendered in a valid file
+    render: Callable[[Metadata], str]
+
+
+WRITERS: dict[str, Writer] = {}
+
+
+def register_writer(
+    name: str, filename: str
+) -> Callable[[Callable[[Metadata], str]], Callable[[Metadata], str]]:
+    """Register a function rendering the content of an output file.
+
+    :param name: Name of the format to pass to --output-format.
+    :type name: str
+
+    :param filename: Name of the file created in the output directory.
+    :type filename: str
+    """
+
+    def decorator(render: Callable[[Metadata], str]) -> Callable[[Metadata], str]:
+        WRITERS[name] = Writer(name=name, filename=filename, render=render)
+        return render
+
+    return decorator
+
+
+def parse_output_formats(output_format: str | list[str]) -> list[str]:
+    """Return the list of formats from 'datacite,citation' or 'all'.
+
+    Raises ValueError for unknown formats.
+    """
+    if isinstance(output_format, str):
+        output_format = output_format.split(",")
+    formats = [x.strip().lower() for x in output_format if x.strip()]
+    if "all" in formats:
+        return list(WRITERS)
+    if unknown := [x for x in formats if x not in WRITERS]:
+        raise ValueError(
+            f"Format(s) {', '.join(repr(x) for x in unknown)} not supported. "
+            f"Supported formats are: {', '.join(WRITERS)} and 'all'."
+        )
+    if not formats:
+        raise ValueError("No output format given.")
+    return list(dict.fromkeys(formats))
+
+
+def write_outputs(
+    metadata: Metadata,
+    output_dir: Path,
+    formats: list[str],
+    write: Callable[[Path, str], Any],
+) -> list[Path]:
+    """Write the metadata in each of the requested formats.
+
+    The content of all the files is rendered (and validated) before any is written.
+
+    :param write: Function writing the content of a file.
+    :type write: Callable[[Path, str], Any]
+
+    :return: Files written.
+    """
+    contents = {}
+    for name in formats:
+        with span(f"render {name}", "output"):
+            contents[output_dir / WRITERS[name].filename] = WRITERS[name].render(metadata)
+    for output_file, content in contents.items():
+        with span(f"write {output_file.name}", "output"):
+            write(output_file, content)
+    return list(contents)
+
+
+@functools.cache
+def _yaml() -> ruamel.yaml.YAML:
+    import ruamel.yaml
+
+    yaml = ruamel.yaml.YAML()
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    return yaml
+
+
+def _dump_yaml(content: dict[str, Any]) -> str:
+    """Return the content of a YAML file."""
+    stream = io.StringIO()
+    _yaml().dump(content, stream)
+    return stream.getvalue()
+
+
+def _dump_json(content: Any) -> str:
+    return json.dumps(content, indent=4, ensure_ascii=False) + "\n"
+
+
+def _orcid_url(author: dict[str, str | None]) -> str:
+    """Return the ORCID URL of an author or an empty string."""
+    if not (orcid := author.get("id")):
+        return ""
+    return f"https://orcid.org/{orcid.replace('ORCID:', '')}"
+
+
+def _dois(references: list[dict[str, str]]) -> list[str]:
+    return [x["value"] for x in references_for_citation(references)]
+
+
+@functools.cache
+def citation_validator() -> Any:
+    """Return the validator of the CITATION.cff schema.
+
+    The schema shipped with cffconvert is only loaded and compiled once per process.
+    """
+    import jsonschema
+
+    schema_file = files("cffconvert") / "schemas" / CFF_VERSION / "schema.json"
+    schema = json.loads(schema_file.read_text(encoding="utf-8"))
+    validator_class = jsonschema.validators.validator_for(schema)
+    return validator_class(schema, format_checker=jsonschema.FormatChecker())
+
+
+def load_writers() -> None:
+    """Load the YAML serializer and the CITATION.cff schema used by the writers.
+
+    They are otherwise loaded by the first outputs that are written.
+    """
+    _yaml()
+    citation_validator()
+
+
+def validate_citation(citation: dict[str, Any]) -> None:
+    """Check the content of a CITATION.cff file against the CFF schema.
+
+    Raises jsonschema.ValidationError if it is not valid.
+    """
+    citation_validator().validate(citation)
+
+
+@register_writer("datacite", "datacite.yml")
+def render_datacite(metadata: Metadata) -> str:
+    """Render a datacite.yml file for GIN."""
+    datacite: dict[str, Any] = {
+        "authors": metadata.authors,
+        "title": metadata.name,
+        "description": metadata.description,
+        "keywords": metadata.keywords,
+        "license": {"name": metadata.license_name, "url": metadata.license_url},
+        "resourcetype": "Dataset",
+        "references": metadata.references,
+        "templateversion": 1.2,
+        "funding": metadata.funding,
+    }
+    return _dump_yaml(datacite)
+
+
+@register_writer("citation", "CITATION.cff")
+def render_citation(metadata: Metadata) -> str:
+    """Render a CITATION.cff file.
+
+    The content is validated before being rendered.
+    """
+    citation: dict[str, Any] = {
+        "authors": authors_for_citation(metadata.authors),
+        "title": metadata.name,
+        "message": metadata.description or "TODO",
+    }
+    # empty license and identifiers are not valid
+    if metadata.license_name:
+        citation["license"] = metadata.license_name
+    citation["type"] = "dataset"
+    if identifiers := references_for_citation(metadata.references):
+        citation["identifiers"] = identifiers
+    citation["cff-version"] = CFF_VERSION
+    if metadata.keywords:
+        citation["keywords"] = metadata.keywords
+    with span("validate citation", "output"):
+        validate_citation(citation)
+    return _dump_yaml(citation)
+
+
+@register_writer("zenodo", ".zenodo.json")
+def render_zenodo(metadata: Metadata) -> str:
+    """Render a .zenodo.json file used by the Zenodo GitHub integration."""
+    creators = []
+    for author in metadata.authors:
+        creator = {
+            "name": f"{author.get('lastname') or ''}, {author.get('firstname') or ''}"
+        }
+        if orcid := author.get("id"):
+            creator["orcid"] = orcid.replace("ORCID:", "")
+        if affiliation := author.get("affiliation"):
+            creator["affiliation"] = affiliation
+        creators.append(creator)
+
+    zenodo: dict[str, Any] = {
+        "title": metadata.name,
+        "upload_type": "dataset",
+        "description": metadata.description or metadata.name,
+        "creators": creators,
+    }
+    if metadata.keywords:
+        zenodo["keywords"] = metadata.keywords
+    if metadata.license_name:
+        zenodo["license"] = metadata.license_name.lower()
+    if dois := _dois(metadata.references):
+        zenodo["related_identifiers"] = [
+            {"identifier": doi, "relation": "isSupplementTo", "scheme": "doi"}
+            for doi in dois
+        ]
+    if metadata.doi:
+        zenodo["doi"] = metadata.doi
+    return _dump_json(zenodo)
+
+
+def _bibtex_escape(value: str) -> str:
+    return re.sub(r"([&%$#_{}])", r"\\\1", value)
+
+
+@register_writer("bibtex", "dataset.bib")
+def render_bibtex(metadata: Metadata) -> str:
+    """Render a BibTeX entry for the dataset."""
+    authors = [
+        f"{x.get('lastname') or ''}, {x.get('firstname') or ''}".strip(", ")
+        for x in metadata.authors
+    ]
+    first_author = re.sub(r"\W", "", (metadata.authors or [{}])[0].get("lastname") or "")
+    title_words = re.findall(r"\w+", metadata.name)
+    key = "_".join([first_author, *title_words[:3]]).strip("_").lower() or "dataset"
+
+    fields = {
+        "title": metadata.name,
+        "author": " and ".join(authors),
+        "doi": metadata.doi,
+        "keywords": ", ".join(metadata.keywords),
+        "abstract": metadata.description,
+        "note": f"License: {metadata.license_name}" if metadata.license_name else "",
+    }
+    lines = [f"@misc{{{key},"]
+    lines.extend(
+        f"  {name} = {{{_bibtex_escape(value)}}},"
+        for name, value in fields.items()
+        if value
+    )
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+@register_writer("csl-json", "dataset.csl.json")
+def render_csl_json(metadata: Metadata) -> str:
+    """Render a CSL-JSON item for the dataset (used by Zotero, Pandoc...)."""
+    item: dict[str, Any] = {
+        "id": metadata.doi or metadata.name,
+        "type": "dataset",
+        "title": metadata.name,
+        "author": [
+            {"family": x.get("lastname") or "", "given": x.get("firstname") or ""}
+            for x in metadata.authors
+        ],
+    }
+    if metadata.description:
+        item["abstract"] = metadata.description
+    if metadata.keywords:
+        item["keyword"] = ", ".join(metadata.keywords)
+    if metadata.doi:
+        item["DOI"] = metadata.doi
+    return _dump_json([item])
+
+
+@register_writer("codemeta", "codemeta.json")
+def render_codemeta(metadata: Metadata) -> str:
+    """Render a codemeta.json file."""
+    authors = []
+    for x in metadata.authors:
+        author: dict[str, Any] = {
+            "@type": "Person",
+            "givenName": x.get("firstname") or "",
+            "familyName": x.get("lastname") or "",
+        }
+        if orcid := _orcid_url(x):
+            author["@id"] = orcid
+        if affiliation := x.get("affiliation"):
+            author["affiliation"] = {"@type": "Organization", "name": affiliation}
+        authors.append(author)
+
+    codemeta: dict[str, Any] = {
+        "@context": "https://w3id.org/codemeta/3.0",
+        "@type": "Dataset",
+        "name": metadata.name,
+        "description": metadata.description,
+        "author": authors,
+    }
+    if metadata.keywords:
+        codemeta["keywords"] = metadata.keywords
+    if metadata.license_url:
+        codemeta["license"] = metadata.license_url
+    elif metadata.license_name:
+        codemeta["license"] = f"https://spdx.org/licenses/{metadata.license_name}"
+    if metadata.doi:
+        codemeta["identifier"] = f"https://doi.org/{metadata.doi}"
+    if metadata.funding:
+        codemeta["funding"] = metadata.funding
+    publications = []
+    for reference in metadata.references:
+        if not reference.get("citation", "").strip():
+            continue
+        publication = {"@type": "ScholarlyArticle", "name": reference["citation"]}
+        if (ref_id := reference.get("id", "")).startswith("doi:"):
+            publication["identifier"] = f"https://doi.org/{ref_id[len('doi:') :]}"
+        publications.append(publication)
+    if publications:
+        codemeta["referencePublication"] = publications
+    return _dump_json(codemeta)
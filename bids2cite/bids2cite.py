@@ -8,22 +8,51 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import re
 import sys
-from argparse import ArgumentParser, HelpFormatter
+from argparse import Action, ArgumentParser, HelpFormatter, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Any
 
-import ruamel.yaml
-from cffconvert.cli.create_citation import create_citation
-from cffconvert.cli.validate_or_write_output import validate_or_write_output
 from rich import print
-from rich.prompt import Prompt
-from rich_argparse import RichHelpFormatter
 
-from bids2cite._authors import authors_for_citation, authors_for_desc, update_authors
-from bids2cite._license import supported_licenses, update_license
+from bids2cite._authors import (
+    DEFAULT_MAX_WORKERS,
+    authors_for_desc,
+    update_authors,
+)
+from bids2cite._cache import cache_disabled, get_cache
+from bids2cite._deadline import (
+    collect_not_enriched,
+    duration,
+    lookup_deadline,
+    submit,
+)
+from bids2cite._http import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRIES,
+    configure_http,
+    save_http_archive,
+)
+from bids2cite._license import (
+    COMMON_LICENSES,
+    SPDX_LIST_URL,
+    find_license,
+    update_license,
+)
+from bids2cite._manifest import (
+    Manifest,
+    file_digest,
+    license_files_digest,
+    write_if_changed,
+)
+from bids2cite._orcid_index import configure_orcid_index
+from bids2cite._profile import disable_profiling, enable_profiling, span
 from bids2cite._references import (
-    references_for_citation,
     references_for_datacite,
     update_references,
 )
@@ -35,9 +64,9 @@ from bids2cite._utils import (
     prompt_format,
 )
 from bids2cite._version import __version__
+from bids2cite._writers import WRITERS, Metadata, parse_output_formats, write_outputs
 
-yaml = ruamel.yaml.YAML()
-yaml.indent(mapping=2, sequence=4, offset=2)
+DEFAULT_N_JOBS = min(4, os.cpu_count() or 1)
 
 log = logging.getLogger("bids2datacite")
 
@@ -63,6 +92,8 @@ def _update_description(description: str | None = None, skip_prompt: bool = Fals
     if description not in [None, ""]:
         description = description
     elif not skip_prompt:
+        from rich.prompt import Prompt
+
         description = Prompt.ask(
             prompt_format("\nPlease enter a description for the dataset")
         )
@@ -82,6 +113,8 @@ def _update_keywords(
         keywords = []
 
     if not skip_prompt:
+        from rich.prompt import Prompt
+
         add_keyword = "yes"
         while add_keyword == "yes":
             print_ordered_list(msg="Current keywords:", items=keywords)
@@ -116,6 +149,8 @@ def _update_funding(ds_desc: dict[str, Any], skip_prompt: bool = False) -> list[
     if skip_prompt:
         return funding
 
+    from rich.prompt import Prompt
+
     add_funding = "yes"
     while add_funding == "yes":
         print_ordered_list(msg="Current fundings:", items=funding)
@@ -135,14 +170,58 @@ def _update_funding(ds_desc: dict[str, Any], skip_prompt: bool = False) -> list[
     return funding
 
 
+def _resolve_concurrently(
+    bids_dir: Path,
+    output_dir: Path,
+    ds_desc: dict[str, Any],
+    authors_file: Path | None,
+    *,
+    max_workers: int,
+    manifest: Manifest,
+) -> tuple[list[dict[str, str | None]], list[dict[str, str]], tuple[str, str]]:
+    """Update authors, references and license at the same time, without prompt.
+
+    Each relies on different services (ORCID, Crossref / PubMed, licenses),
+    so they are looked up concurrently.
+    Stages whose inputs did not change since the last run are not run again.
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        authors = submit(
+            executor,
+            manifest.run_stage,
+            "authors",
+            [ds_desc.get("Authors"), file_digest(authors_file)],
+            partial(update_authors, ds_desc, True, authors_file, max_workers=max_workers),
+        )
+        references = submit(
+            executor,
+            manifest.run_stage,
+            "references",
+            ds_desc.get("ReferencesAndLinks"),
+            partial(update_references, ds_desc, True, max_workers=max_workers),
+        )
+        license_info = submit(
+            executor,
+            manifest.run_stage,
+            "license",
+            [ds_desc.get("License"), license_files_digest(bids_dir)],
+            partial(update_license, bids_dir, output_dir, ds_desc, True),
+            ("LICENSE",),
+        )
+
+        return authors.result(), references.result(), tuple(license_info.result())
+
+
 def _cli(argv: Any = sys.argv) -> None:
     """Execute the main script for CLI."""
-    log = bids2cite_log(name="bids2datacite")
+    from rich_argparse import RichHelpFormatter
 
     parser = _common_parser(formatter_class=RichHelpFormatter)
 
     args = parser.parse_args(argv[1:])
 
+    log = bids2cite_log(name="bids2datacite")
+
     # https://stackoverflow.com/a/53293042/14223310
     log_level = log_levels().index(default_log_level())
     # For each "-v" flag, adjust the logging verbosity accordingly
@@ -152,6 +231,8 @@ def _cli(argv: Any = sys.argv) -> None:
     log_level_name = log_levels()[log_level]
     log.setLevel(log_level_name)
 
+    _configure_http(args)
+
     tmp = args.keywords.split(",") if args.keywords else []
     keywords = [x.strip() for x in tmp]
 
@@ -161,72 +242,241 @@ def _cli(argv: Any = sys.argv) -> None:
         if not authors_file.exists():
             authors_file = None
 
-    licenses = supported_licenses()
-    licenses_choices = list(licenses.keys())
-    if args.license and args.license not in licenses_choices:
+    if args.license and find_license(args.license) is None:
         log.error(
             f"""License '{args.license}' not supported.
-        Supported types are {licenses_choices}"""
+        Supported licenses are listed at {SPDX_LIST_URL}"""
         )
         sys.exit(1)
 
-    if args.output_format not in ["datacite", "citation"]:
-        log.error(
-            f"""Format '{args.output_format}' not supported.
-        Supported types are 'datacite' and 'citation'"""
+    try:
+        parse_output_formats(args.output_format)
+    except ValueError as exc:
+        log.error(exc)
+        sys.exit(1)
+
+    options: dict[str, Any] = {
+        "output_format": args.output_format,
+        "description": args.description,
+        "keywords": keywords,
+        "license": args.license,
+        "authors_file": authors_file,
+        "max_workers": args.max_workers,
+        # all the lookups are recorded / replayed, none comes from the cache
+        "use_cache": not (args.no_cache or args.record or args.replay),
+        "force": args.force or bool(args.record),
+        "max_lookup_time": args.max_lookup_time,
+    }
+
+    if args.batch:
+        _run_batch(args, options)
+        return
+
+    _run_single(args, options, debug=log_level_name == "DEBUG")
+
+
+def _configure_http(args: Namespace) -> None:
+    """Set the timeouts, retries, record / replay mode and ORCID index of the lookups."""
+    if args.batch and args.record:
+        # each worker process would record its own responses
+        log.warning("--record is not supported with --batch.")
+        args.record = None
+
+    try:
+        configure_http(
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+            retries=args.retries,
+            record=args.record,
+            replay=args.replay,
+            mailto=args.mailto,
         )
+        configure_orcid_index(Path(args.orcid_index) if args.orcid_index else None)
+    except (FileNotFoundError, ValueError) as exc:
+        log.error(exc)
         sys.exit(1)
 
-    bids2cite(
-        bids_dir=Path(args.bids_dir).resolve(),
-        output_format=args.output_format,
-        description=args.description,
-        keywords=keywords,
-        license=args.license,
-        skip_prompt=args.skip_prompt,
-        authors_file=authors_file,
+
+def _run_single(args: Namespace, options: dict[str, Any], debug: bool) -> None:
+    """Run bids2cite on the dataset passed as bids_dir argument."""
+    # the profile summary is shown with -vv
+    if args.profile or debug:
+        enable_profiling()
+
+    from jsonschema import ValidationError
+
+    try:
+        bids2cite(
+            bids_dir=Path(args.bids_dir).resolve(),
+            skip_prompt=args.skip_prompt,
+            **options,
+        )
+    except FileNotFoundError as exc:
+        log.error(exc)
+        sys.exit(1)
+    except ValidationError as exc:
+        log.error(f"Invalid CITATION.cff: {exc.message}")
+        sys.exit(1)
+    finally:
+        save_http_archive()
+        if (profiler := disable_profiling()) is not None:
+            if debug:
+                profiler.print_summary()
+            if args.profile:
+                log.info(f"writing profile to {args.profile}")
+                profiler.write_trace(Path(args.profile))
+
+
+def _run_batch(args: Namespace, options: dict[str, Any]) -> None:
+    """Run bids2cite on all the datasets found from the bids_dir argument."""
+    from bids2cite._batch import bids2cite_batch, find_datasets
+
+    if args.profile:
+        log.warning("--profile is not supported with --batch.")
+
+    datasets = find_datasets(args.bids_dir)
+    if not datasets:
+        log.error(f"No dataset found in '{args.bids_dir}'")
+        sys.exit(1)
+    results = bids2cite_batch(
+        datasets=datasets,
+        n_jobs=args.n_jobs,
+        summary_file=Path(args.summary) if args.summary else None,
+        **options,
     )
+    if any(x["status"] == "failure" for x in results):
+        sys.exit(1)
 
 
 def bids2cite(
     bids_dir: Path,
-    output_format: str,
+    output_format: str | list[str],
     description: str | None = None,
     keywords: list[str] | None = None,
     license: str | None = None,
     skip_prompt: bool = False,
     authors_file: Path | None = None,
-) -> None:  # sourcery skip: merge-dict-assign
-    """Create a datacite.yml file for a BIDS dataset."""
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    use_cache: bool = True,
+    force: bool = False,
+    max_lookup_time: float | None = None,
+) -> None:
+    """Create a datacite.yml file for a BIDS dataset.
+
+    output_format can be a list or a comma separated string of formats
+    ('datacite', 'citation', 'zenodo', 'bibtex', 'csl-json', 'codemeta' or 'all'):
+    all files are written from the same lookups.
+
+    Without prompt, nothing is done if the inputs (dataset_description.json,
+    authors file, LICENSE files and options) did not change since the last run
+    and only the lookups affected by a change are run again,
+    unless force is True.
+
+    Without prompt, lookups are not sent anymore after max_lookup_time seconds:
+    the remaining authors and references are kept as they are in
+    dataset_description.json and listed in a warning.
+
+    With use_cache False, the cache of lookups is only left aside for this call
+    and all the lookups are run again, as with force.
+    """
+    with cache_disabled(not use_cache):
+        _bids2cite(
+            bids_dir=bids_dir,
+            formats=parse_output_formats(output_format),
+            description=description,
+            keywords=keywords,
+            license=license,
+            skip_prompt=skip_prompt,
+            authors_file=authors_file,
+            max_workers=max_workers,
+            # the lookups saved with the outputs would be reused otherwise
+            force=force or not use_cache,
+            max_lookup_time=max_lookup_time,
+        )
+
+
+def _bids2cite(  # sourcery skip: merge-dict-assign
+    *,
+    bids_dir: Path,
+    formats: list[str],
+    description: str | None,
+    keywords: list[str] | None,
+    license: str | None,
+    skip_prompt: bool,
+    authors_file: Path | None,
+    max_workers: int,
+    force: bool,
+    max_lookup_time: float | None,
+) -> None:
     log = bids2cite_log(name="bids2datacite")
 
     log.info(f"bids_dir: {bids_dir}")
 
-    output_dir = bids_dir / "derivatives" / "bids2cite"
-    output_dir.mkdir(exist_ok=True, parents=True)
-
     ds_descr_file = bids_dir / "dataset_description.json"
 
     if not ds_descr_file.exists():
-        log.error(f"dataset_description.json not found in {bids_dir}")
-        sys.exit(1)
+        raise FileNotFoundError(f"dataset_description.json not found in {bids_dir}")
 
-    with ds_descr_file.open() as f:
-        ds_desc: dict[str, Any] = json.load(f)
+    output_dir = bids_dir / "derivatives" / "bids2cite"
 
-    description = _update_description(description, skip_prompt)
+    with span("inputs"):
+        manifest = Manifest(output_dir, reset=force)
+        if skip_prompt and manifest.is_up_to_date(
+            {
+                "dataset_description": file_digest(ds_descr_file),
+                "authors_file": file_digest(authors_file),
+                "license_files": license_files_digest(bids_dir),
+                "options": [formats, description, keywords, license],
+            }
+        ):
+            log.info(f"{output_dir} is up to date")
+            return
 
-    authors = update_authors(ds_desc, skip_prompt, authors_file)
+        output_dir.mkdir(exist_ok=True, parents=True)
 
-    references = update_references(ds_desc, skip_prompt)
+        with ds_descr_file.open() as f:
+            ds_desc: dict[str, Any] = json.load(f)
 
-    funding = _update_funding(ds_desc, skip_prompt)
+    description = _update_description(description, skip_prompt)
 
     if license is not None:
         ds_desc["License"] = license
-    (license_name, license_url) = update_license(
-        bids_dir, output_dir, ds_desc, skip_prompt
-    )
+
+    if max_lookup_time is not None and not skip_prompt:
+        log.warning("The time allowed for lookups only applies without prompt.")
+
+    if skip_prompt:
+        with lookup_deadline(max_lookup_time), collect_not_enriched() as not_enriched:
+            (authors, references, (license_name, license_url)) = _resolve_concurrently(
+                bids_dir,
+                output_dir,
+                ds_desc,
+                authors_file,
+                max_workers=max_workers,
+                manifest=manifest,
+            )
+        if not_enriched:
+            log.warning(
+                "Could not look up the following entries, they are kept as is:\n"
+                + "\n".join(f"- {x}" for x in not_enriched)
+            )
+        funding = _update_funding(ds_desc, skip_prompt)
+
+    else:
+        with span("authors"):
+            authors = update_authors(
+                ds_desc, skip_prompt, authors_file, max_workers=max_workers
+            )
+
+        with span("references"):
+            references = update_references(ds_desc, skip_prompt, max_workers=max_workers)
+
+        funding = _update_funding(ds_desc, skip_prompt)
+
+        with span("license"):
+            (license_name, license_url) = update_license(
+                bids_dir, output_dir, ds_desc, skip_prompt
+            )
 
     keywords = _update_keywords(keywords, skip_prompt)
 
@@ -240,67 +490,59 @@ def bids2cite(
     ds_desc["License"] = license_name
 
     output_file = output_dir / "dataset_description.json"
-    log.info(f"updating {output_file}")
-    with output_file.open("w", encoding="utf-8") as f:
-        json.dump(ds_desc, f, indent=4)
-
-    """datacite.yml"""
-    if output_format == "datacite":
-        datacite: dict[str, Any] = {
-            "authors": [],
-            "title": ds_desc["Name"],
-            "description": "",
-            "keywords": [],
-            "license": {"name": "", "url": ""},
-            "resourcetype": "Dataset",
-            "references": [],
-            "templateversion": 1.2,
-            "funding": [],
-        }
-
-        datacite["description"] = description
-        datacite["authors"] = authors
-        datacite["references"] = references
-        datacite["funding"] = funding
-        datacite["license"]["name"] = license_name
-        datacite["license"]["url"] = license_url
-        datacite["keywords"] = keywords
-
-        datacite_file = output_dir / "datacite.yml"
-        log.info(f"creating {datacite_file}")
-        with datacite_file.open("w", encoding="utf-8") as f:
-            yaml.dump(datacite, f)
-
-    """CITATION.cff"""
-    if output_format == "citation":
-        citation: dict[str, Any] = {
-            "authors": [],
-            "title": ds_desc["Name"],
-            "message": "",
-            "license": "",
-            "type": "dataset",
-            "identifiers": [],
-            "cff-version": "1.2.0",
-        }
-
-        if keywords not in [None, []]:
-            citation["keywords"] = keywords
-        citation["license"] = license_name
-        citation["authors"] = authors_for_citation(authors)
-        citation["message"] = description
-        if description == "":
-            citation["message"] = "TODO"
-        citation["identifiers"] = references_for_citation(references)
-
-        citation_file = output_dir / "CITATION.cff"
-        log.info(f"creating {citation_file}")
-        with citation_file.open("w", encoding="utf-8") as f:
-            yaml.dump(citation, f)
-
-        citation = create_citation(infile=citation_file, url=None)
-        validate_or_write_output(
-            outfile=None, outputformat=None, validate_only=True, citation=citation
+    with span(f"write {output_file.name}", "output"):
+        write_if_changed(output_file, json.dumps(ds_desc, indent=4))
+        manifest.record_output(output_file)
+
+    def write_output(output_file: Path, content: str) -> None:
+        write_if_changed(output_file, content)
+        manifest.record_output(output_file)
+
+    metadata = Metadata(
+        name=ds_desc["Name"],
+        description=description,
+        keywords=keywords,
+        authors=authors,
+        references=references,
+        funding=funding,
+        license_name=license_name,
+        license_url=license_url,
+        doi=_dataset_doi(ds_desc),
+    )
+    write_outputs(metadata, output_dir, formats, write=write_output)
+
+    if skip_prompt:
+        manifest.save()
+
+
+def _dataset_doi(ds_desc: dict[str, Any]) -> str:
+    """Return the DOI of the dataset without 'doi:' or URL prefix."""
+    doi = str(ds_desc.get("DatasetDOI") or "").strip()
+    return re.sub(r"^(doi:|https?://(dx\.)?doi\.org/)", "", doi, flags=re.IGNORECASE)
+
+
+class _ClearCacheAction(Action):
+    """Remove all entries from the lookup cache and exit."""
+
+    def __call__(self, parser: ArgumentParser, *_: Any, **__: Any) -> None:
+        n_entries = get_cache().clear()
+        print(f"Removed {n_entries} entries from {get_cache().path}")
+        parser.exit()
+
+
+class _CacheInfoAction(Action):
+    """Print information about the lookup cache and exit."""
+
+    def __call__(self, parser: ArgumentParser, *_: Any, **__: Any) -> None:
+        info = get_cache().info()
+        print(f"cache: {info['path']}")
+        print(f"size: {info['size'] / 1024:.1f} kB")
+        print(f"max entries: {info['max_entries']}")
+        print_ordered_list(
+            msg="Entries per source:",
+            items=[f"{source}: {n}" for source, n in info["entries"].items()],
         )
+        parser.exit()
 
 
 def _common_parser(
@@ -320,13 +562,16 @@ def _common_parser(
         "bids_dir",
         help="""
         The directory with the input dataset formatted according to the BIDS standard.
+        With --batch: a text file listing dataset directories (one per line),
+        a directory containing datasets or a glob pattern.
         """,
     )
     parser.add_argument(
         "-o",
         "--output-format",
-        help="""Choose the output format between 'citation' for CITATION.cff
-        and 'datacite' for datacite.yml.""",
+        help=f"""Output formats separated by commas, or 'all'.
+        Possible formats: {", ".join(WRITERS)}
+        ('citation' for CITATION.cff and 'datacite' for datacite.yml).""",
         default="datacite",
     )
     parser.add_argument(
@@ -338,12 +583,11 @@ def _common_parser(
         help="List of key words separated by commas to add to the citation file.",
         default="",
     )
-    licenses = supported_licenses()
-    licenses_choices = list(licenses.keys())
     parser.add_argument(
         "-l",
         "--license",
-        help=f"License to add to choose from: {licenses_choices}",
+        help=f"""License to add: SPDX identifier, name or URL of the license.
+        For example: {", ".join(COMMON_LICENSES[:3])}.""",
         default=None,
     )
     parser.add_argument(
@@ -352,12 +596,117 @@ def _common_parser(
         help="If you do not want to use the prompt interface.",
         action="store_true",
     )
+    parser.add_argument(
+        "--force",
+        help="""Redo all the lookups and rewrite the outputs
+        even if the inputs did not change since the last run.""",
+        action="store_true",
+    )
     parser.add_argument(
         "--authors-file",
         help=""".tsv file containing list of potential new authors with the columns:
                 first_name, last_name, ORCID (optional), affiliation (optional)""",
         default="",
     )
+    parser.add_argument(
+        "--max-workers",
+        help="Maximum number of parallel requests used to look up authors and DOIs.",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+    )
+    parser.add_argument(
+        "--max-lookup-time",
+        help="""Maximum time spent looking up authors and references
+        (for example: 30s, 2m), after which the remaining ones are kept as they are.
+        Only applies with --skip-prompt or --batch.""",
+        type=duration,
+        default=None,
+    )
+    parser.add_argument(
+        "--batch",
+        help="""Process several datasets without prompt (see bids_dir).
+        A dataset that fails does not stop the others.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        help="Number of datasets processed in parallel with --batch.",
+        type=int,
+        default=DEFAULT_N_JOBS,
+    )
+    parser.add_argument(
+        "--summary",
+        help="TSV file where to write the outcome of each dataset with --batch.",
+        default=None,
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        help="Seconds to wait for a connection to ORCID, Crossref, PubMed...",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+    )
+    parser.add_argument(
+        "--read-timeout",
+        help="Seconds to wait for an answer from ORCID, Crossref, PubMed...",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+    )
+    parser.add_argument(
+        "--retries",
+        help="How many times a failed or throttled request is retried.",
+        type=int,
+        default=DEFAULT_RETRIES,
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="""Do not use the cache of ORCID, Crossref and PubMed lookups:
+        all the lookups are run again, as with --force.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        help="Remove all entries from the cache of lookups and exit.",
+        action=_ClearCacheAction,
+        nargs=0,
+    )
+    parser.add_argument(
+        "--cache-info",
+        help="Show the location and content of the cache of lookups and exit.",
+        action=_CacheInfoAction,
+        nargs=0,
+    )
+    parser.add_argument(
+        "--mailto",
+        help="""Contact email sent with the lookups: Crossref answers requests
+        with an email faster (more requests per second and in parallel).""",
+        default=None,
+    )
+    parser.add_argument(
+        "--orcid-index",
+        help="""Index of the ORCID public data file (made with bids2cite-orcid-index)
+        where authors are looked up before querying ORCID:
+        authors can be found without network.""",
+        default=None,
+    )
+    parser.add_argument(
+        "--record",
+        help="""File where to save all the answers of ORCID, Crossref, PubMed...
+        to replay the run later with --replay ('.json' or compressed '.json.gz').""",
+        default=None,
+    )
+    parser.add_argument(
+        "--replay",
+        help="""File of answers saved with --record to use instead of the network:
+        the run is reproduced without any connection.""",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        help="""JSON file where to save a timeline of the run
+        (stages, requests, cache use) that can be opened in https://ui.perfetto.dev.
+        A summary is shown with -vv.""",
+        default=None,
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import json
 import shutil
 from pathlib import Path
 
 import pytest
 
+from bids2cite._cache import configure_cache
+from bids2cite._http import configure_http
+
 
 @pytest.fixture
 def root_test_dir() -> Path:
@@ -22,3 +26,72 @@ def bids_dir(root_test_dir, tmp_path) -> Path:
 @pytest.fixture
 def license_file(bids_dir) -> Path:
     return bids_dir / "derivatives" / "bids2cite" / "LICENSE"
+
+
+@pytest.fixture(autouse=True)
+def lookup_cache(tmp_path):
+    # never read from or write to the cache of the user running the tests
+    cache = configure_cache(path=tmp_path / "cache" / "metadata.sqlite")
+    yield cache
+    cache.close()
+
+
+# identifiers of the synthetic responses in tests/data/http_archive.json:
+# ORCID does not issue iDs starting with 0000-0000, 10.5555 is the test DOI prefix
+# of Crossref and PubMed has not reached this PMID
+SYNTHETIC_ORCID = "0000-0000-0000-001X"
+SYNTHETIC_ORCID_ENDED = "0000-0000-0000-0028"
+SYNTHETIC_DOI = "10.5555/bids2cite.example"
+SYNTHETIC_PMID = "99999999"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--network",
+        action="store_true",
+        help="Also run the tests that query the real ORCID, Crossref and PubMed.",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--network"):
+        return
+    skip_network = pytest.mark.skip(reason="queries the real services, use --network")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip_network)
+
+
+@pytest.fixture
+def http_archive(request, root_test_dir):
+    """Answer the lookups from the responses in tests/data/http_archive.json.
+
+    These responses are synthetic: they were written by hand
+    in the format of each service and only contain the fields bids2cite reads.
+    They are about fake identifiers (see SYNTHETIC_ORCID...),
+    lookups of any other identifier fail like when a service cannot be reached.
+    Tests marked network query the real services instead.
+    """
+    archive = root_test_dir / "data" / "http_archive.json"
+    if request.node.get_closest_marker("network") is not None:
+        yield None
+        return
+    configure_http(replay=archive)
+    yield archive
+    configure_http()
+
+
+@pytest.fixture
+def synthetic_bids_dir(bids_dir) -> Path:
+    """BIDS dataset whose authors and references are in the synthetic archive."""
+    ds_descr_file = bids_dir / "dataset_description.json"
+    ds_desc = json.loads(ds_descr_file.read_text())
+    ds_desc["Authors"] = ["", " ", "Paul Broca", f"Jane Doe, ORCID:{SYNTHETIC_ORCID}"]
+    ds_desc["ReferencesAndLinks"] = [
+        "",
+        " ",
+        f"pmid:{SYNTHETIC_PMID}",
+        f"doi:{SYNTHETIC_DOI}",
+    ]
+    ds_descr_file.write_text(json.dumps(ds_desc, indent=4))
+    return bids_dir
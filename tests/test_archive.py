@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from bids2cite._archive import HttpArchive, request_key
+from bids2cite._http import configure_http, http_get, save_http_archive
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = f'{{"path": "{self.path}"}}'.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JsonHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_http():
+    yield
+    configure_http()
+
+
+def test_request_key():
+    assert (
+        request_key("get", "https://foo.org/bar?b=2&a=1", params={"c": 3, "d": None})
+        == request_key("GET", "https://foo.org/bar", params={"c": "3", "a": 1, "b": 2})
+        == "GET https://foo.org/bar?a=1&b=2&c=3"
+    )
+
+
+@pytest.mark.parametrize("filename", ["archive.json", "archive.json.gz"])
+def test_record_and_replay(server, tmp_path, filename):
+    archive = tmp_path / filename
+
+    configure_http(record=archive)
+    recorded = http_get(f"{server}/foo", params={"id": "1"})
+    save_http_archive()
+
+    # the server is not queried anymore
+    configure_http(replay=archive, endpoints={server: "http://127.0.0.1:1"})
+    replayed = http_get(f"{server}/foo", params={"id": "1"})
+
+    assert replayed.status_code == recorded.status_code == 200
+    assert replayed.json() == recorded.json() == {"path": "/foo?id=1"}
+    assert replayed.headers["Content-Type"] == "application/json"
+
+    with pytest.raises(requests.ConnectionError, match="no response recorded"):
+        http_get(f"{server}/bar")
+
+
+def test_record_adds_to_archive(server, tmp_path):
+    archive = tmp_path / "archive.json"
+    for path in ["/foo", "/bar"]:
+        configure_http(record=archive)
+        http_get(f"{server}{path}")
+        save_http_archive()
+
+    assert len(HttpArchive.load(archive)) == 2
+
+
+def test_record_with_endpoints(server, tmp_path):
+    archive = tmp_path / "archive.json"
+    configure_http(record=archive, endpoints={"https://api.crossref.org": server})
+    http_get("https://api.crossref.org/works/foo")
+    save_http_archive()
+
+    # requests are recorded with the public URL
+    assert list(HttpArchive.load(archive).entries) == [
+        "GET https://api.crossref.org/works/foo"
+    ]
+
+
+def test_binary_response(tmp_path):
+    archive = HttpArchive(tmp_path / "archive.json")
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"\xff\xfe"
+    archive.add("GET https://foo.org", response)
+    archive.save()
+
+    assert HttpArchive.load(archive.path).response("GET https://foo.org").content == (
+        b"\xff\xfe"
+    )
+
+
+def test_configure_http_record_and_replay(tmp_path):
+    with pytest.raises(ValueError, match="at the same time"):
+        configure_http(record=tmp_path / "a.json", replay=tmp_path / "b.json")
+
+
+def test_replay_invalid_archive(tmp_path):
+    archive = tmp_path / "archive.json"
+    archive.write_text('{"foo": 1}')
+    with pytest.raises(ValueError, match="not an HTTP archive"):
+        configure_http(replay=archive)
+    with pytest.raises(FileNotFoundError):
+        configure_http(replay=tmp_path / "missing.json")
@@ -1,31 +1,160 @@
 from __future__ import annotations
 
+import logging
+import time
+
 import pytest
 
 from bids2cite._authors import (
-    choose_from_new_authors,
-    display_new_authors,
+    AuthorsRoster,
+    _load_roster,
+    affiliation_from_orcid,
     get_author_info_from_orcid,
+    merge_authors,
+    normalize_orcid,
+    orcid_check_digit,
     parse_author,
+    read_authors_file,
+    resolve_authors,
+    select_from_roster,
+    update_authors,
 )
+from bids2cite._deadline import collect_not_enriched, lookup_deadline
+from tests.conftest import SYNTHETIC_ORCID, SYNTHETIC_ORCID_ENDED
 
+# lookups are answered from tests/data/http_archive.json
+pytestmark = pytest.mark.usefixtures("http_archive")
 
-def test_display_new_authors(root_test_dir):
-    authors_file = root_test_dir.parent / "inputs" / "authors.tsv"
-    display_new_authors(authors_file)
 
+def test_read_authors_file(tmp_path):
+    authors_file = tmp_path / "authors.tsv"
+    authors_file.write_text("first_name\tlast_name\tORCID\nJane\tDoe\t\n")
+    assert read_authors_file(authors_file) == [
+        {"first_name": "Jane", "last_name": "Doe", "affiliation": None, "ORCID": None}
+    ]
 
-def test_choose_from_new_authors(root_test_dir):
-    authors_file = root_test_dir.parent / "inputs" / "authors.tsv"
-    author_info = choose_from_new_authors(authors_file, author_idx=1)
-    assert author_info == {
-        "affiliation": "UCLouvain",
-        "firstname": "Mohamed",
-        "id": "ORCID:0000-0002-1866-8645",
-        "lastname": "Rezk",
+
+@pytest.fixture
+def roster():
+    names = [("Rémi", "Gau"), ("Mohamed", "Rezk"), ("Jane", "Doe"), ("John", "Doe")]
+    rows = [
+        {"first_name": first, "last_name": last, "affiliation": None, "ORCID": None}
+        for first, last in names
+    ]
+    rows[0]["ORCID"] = "0000-0002-1535-9767"
+    return AuthorsRoster(rows)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("https://orcid.org/0000000215359767", [0]),
+        ("0000-0002-1866-8645", []),
+        ("remi", [0]),
+        ("Gau Rémi", [0]),
+        ("doe", [2, 3]),
+        ("jane d", [2]),
+        ("Reszk", [1]),
+        ("xyz", []),
+    ],
+)
+def test_roster_search(roster, query, expected):
+    assert roster.search(query) == expected
+
+
+def test_select_from_roster(monkeypatch, roster):
+    answers = iter(["n", "p", "doe", "2", "n", "1"])
+    monkeypatch.setattr("rich.prompt.Prompt.ask", lambda *args, **kwargs: next(answers))
+
+    author = select_from_roster(roster, page_size=1)
+
+    assert author == {
+        "firstname": "John",
+        "lastname": "Doe",
+        "affiliation": None,
+        "id": None,
     }
 
 
+def test_update_authors_reads_roster_once(monkeypatch, root_test_dir):
+    authors_file = root_test_dir.parent / "inputs" / "authors.tsv"
+    calls = []
+    monkeypatch.setattr(
+        "bids2cite._authors.read_authors_file",
+        lambda path: calls.append(path) or read_authors_file(path),
+    )
+    answers = iter(["yes", "1", "yes", "Rezk", "1", "no"])
+    monkeypatch.setattr("rich.prompt.Prompt.ask", lambda *args, **kwargs: next(answers))
+    _load_roster.cache_clear()
+
+    authors = update_authors({}, authors_file=authors_file)
+
+    assert [x["lastname"] for x in authors] == ["Gau", "Rezk"]
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize(
+    "employments, expected",
+    [
+        ({"affiliation-group": []}, None),
+        (
+            {
+                "affiliation-group": [
+                    {
+                        "summaries": [
+                            {
+                                "employment-summary": {
+                                    "organization": {"name": "UCLouvain"}
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        "summaries": [
+                            {"employment-summary": {"organization": {"name": "Leipzig"}}}
+                        ]
+                    },
+                ]
+            },
+            "UCLouvain",
+        ),
+        (
+            {
+                "affiliation-group": [
+                    {
+                        "summaries": [
+                            {
+                                "employment-summary": {
+                                    "organization": {"name": "Leipzig"},
+                                    "end-date": {"year": {"value": "2021"}},
+                                }
+                            }
+                        ]
+                    },
+                    {
+                        "summaries": [
+                            {
+                                "employment-summary": {
+                                    "organization": {"name": "UCLouvain"},
+                                    "end-date": None,
+                                }
+                            }
+                        ]
+                    },
+                ]
+            },
+            "UCLouvain",
+        ),
+        # API v2
+        ({"employment-summary": [{"organization": {"name": "UCLouvain"}}]}, "UCLouvain"),
+    ],
+)
+def test_affiliation_from_orcid(employments, expected):
+    record = {"activities-summary": {"employments": employments}}
+    assert affiliation_from_orcid(record) == expected
+
+
+@pytest.mark.network
 def test_get_author_info_from_orcid():
     assert get_author_info_from_orcid("0000-0002-9120-8098") == {
         "affiliation": None,
@@ -35,10 +164,31 @@ def test_get_author_info_from_orcid():
     }
 
 
+def test_get_author_info_from_orcid_current_employment():
+    # the current employment is used, even after an ended one
+    assert get_author_info_from_orcid(SYNTHETIC_ORCID) == {
+        "affiliation": "Example University",
+        "firstname": "Jane",
+        "id": f"ORCID:{SYNTHETIC_ORCID}",
+        "lastname": "Doe",
+    }
+
+
+def test_get_author_info_from_orcid_ended_employments():
+    # only ended employments: the most recent one is used
+    assert get_author_info_from_orcid(SYNTHETIC_ORCID_ENDED) == {
+        "affiliation": "Example Hospital",
+        "firstname": "John",
+        "id": f"ORCID:{SYNTHETIC_ORCID_ENDED}",
+        "lastname": "Smith",
+    }
+
+
 def test_get_author_info_from_orcid_empty():
     assert get_author_info_from_orcid("8098") == {}
 
 
+@pytest.mark.network
 def test_parse_author_orcid():
     assert parse_author("0000-0002-9120-8098") == {
         "affiliation": None,
@@ -48,6 +198,24 @@ def test_parse_author_orcid():
     }
 
 
+def test_parse_author_synthetic_orcid():
+    assert parse_author(f"Jane Doe, {SYNTHETIC_ORCID}") == {
+        "affiliation": "Example University",
+        "firstname": "Jane",
+        "id": f"ORCID:{SYNTHETIC_ORCID}",
+        "lastname": "Doe",
+    }
+
+
+def test_parse_author_orcid_not_recorded():
+    # fails like when ORCID cannot be reached
+    with collect_not_enriched() as not_enriched:
+        author = parse_author("Melanie Ganz, 0000-0002-9120-8098")
+
+    assert author == {"firstname": "Melanie Ganz", "lastname": "0000-0002-9120-8098"}
+    assert not_enriched == ["Melanie Ganz, 0000-0002-9120-8098"]
+
+
 @pytest.mark.parametrize(
     "author,firstname,lastname",
     [
@@ -60,3 +228,127 @@ def test_parse_author_orcid():
 )
 def test_parse_author(author, firstname, lastname):
     assert parse_author(author) == {"firstname": firstname, "lastname": lastname}
+
+
+def test_resolve_authors_keeps_order(monkeypatch):
+    def fake_parse_author(author):
+        # make the first authors the slowest to resolve
+        time.sleep(0.01 * (5 - int(author)))
+        return {"firstname": author, "lastname": ""}
+
+    monkeypatch.setattr("bids2cite._authors.parse_author", fake_parse_author)
+
+    authors = resolve_authors([str(i) for i in range(5)], max_workers=5)
+
+    assert [x["firstname"] for x in authors] == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.parametrize(
+    "orcid,expected",
+    [
+        ("0000-0002-9120-8098", "0000-0002-9120-8098"),
+        (" 0000000291208098 ", "0000-0002-9120-8098"),
+        ("ORCID:0000-0002-9120-8098", "0000-0002-9120-8098"),
+        ("orcid: 0000-0002-9120-8098", "0000-0002-9120-8098"),
+        ("https://orcid.org/0000-0002-9120-8098", "0000-0002-9120-8098"),
+        ("Remi Gau, ORCID:0000-0002-1535-9767", "0000-0002-1535-9767"),
+        ("0000-0002-1694-233x", "0000-0002-1694-233X"),
+        ("0000-0002-9120-8097", None),
+        ("0000-0002-9120-80989", None),
+        ("8098", None),
+        ("Jane Doe", None),
+    ],
+)
+def test_normalize_orcid(orcid, expected):
+    assert normalize_orcid(orcid) == expected
+
+
+def test_orcid_check_digit():
+    assert orcid_check_digit("000000021694233") == "X"
+    assert orcid_check_digit("000000029120809") == "8"
+
+
+@pytest.mark.parametrize(
+    "author",
+    ["Jane Doe", "ORCID:0000-0002-9120-8097", "Jane Doe, orcid.org/foo"],
+)
+def test_parse_author_no_request_without_valid_orcid(monkeypatch, author):
+    def fail(*args, **kwargs):
+        raise AssertionError("ORCID should not be queried")
+
+    monkeypatch.setattr("bids2cite._authors.http_get", fail)
+
+    assert parse_author(author)["firstname"] is not None
+
+
+def test_parse_author_no_time_left():
+    with lookup_deadline(0), collect_not_enriched() as not_enriched:
+        author = parse_author("Melanie Ganz, 0000-0002-9120-8098")
+
+    assert author == {"firstname": "Melanie Ganz", "lastname": "0000-0002-9120-8098"}
+    assert not_enriched == ["Melanie Ganz, 0000-0002-9120-8098"]
+
+
+def test_merge_authors():
+    authors = [
+        {"firstname": "Remi", "lastname": "Gau"},
+        {"firstname": "Jane", "lastname": "Doe", "id": "ORCID:0000-0002-1866-8645"},
+        {
+            "firstname": "Rémi",
+            "lastname": "GAU",
+            "affiliation": "UCLouvain",
+            "id": "ORCID:0000-0002-1535-9767",
+        },
+        {"firstname": "J.", "lastname": "Doe", "id": "ORCID:0000-0002-1866-8645"},
+        {"firstname": "John", "lastname": "Smith"},
+    ]
+
+    merged, conflicts = merge_authors(authors)
+
+    assert merged == [
+        {
+            "firstname": "Remi",
+            "lastname": "Gau",
+            "affiliation": "UCLouvain",
+            "id": "ORCID:0000-0002-1535-9767",
+        },
+        {"firstname": "Jane", "lastname": "Doe", "id": "ORCID:0000-0002-1866-8645"},
+        {"firstname": "John", "lastname": "Smith"},
+    ]
+    assert conflicts == ["Jane Doe: kept firstname 'Jane' over 'J.'"]
+
+
+def test_merge_authors_same_name_different_orcid():
+    authors = [
+        {"firstname": "Jane", "lastname": "Doe", "id": "ORCID:0000-0002-1866-8645"},
+        {"firstname": "Jane", "lastname": "Doe", "id": "ORCID:0000-0002-1535-9767"},
+    ]
+    assert merge_authors(authors) == (authors, [])
+
+
+def test_merge_authors_many():
+    authors = [
+        {"firstname": f"First{i % 2000}", "lastname": f"Last{i % 2000}"}
+        for i in range(10000)
+    ]
+    start = time.perf_counter()
+    merged, _ = merge_authors(authors)
+    assert len(merged) == 2000
+    # generous limit: comparing all pairs takes minutes
+    assert time.perf_counter() - start < 2
+
+
+def test_update_authors_merges_duplicates(caplog):
+    ds_desc = {
+        "Authors": [
+            "Jane Doe",
+            f"Jane Doe, ORCID:{SYNTHETIC_ORCID}",
+            "JANE  DOE",
+        ]
+    }
+    with caplog.at_level(logging.INFO, logger="bids2datacite"):
+        authors = update_authors(ds_desc, skip_prompt=True, max_workers=1)
+
+    assert len(authors) == 1
+    assert authors[0]["id"] == f"ORCID:{SYNTHETIC_ORCID}"
+    assert "Merging duplicated author" in caplog.text
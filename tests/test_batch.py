@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import jsonschema
+import pytest
+
+from bids2cite._batch import _process_dataset, bids2cite_batch, find_datasets
+
+
+def make_dataset(path: Path, name: str = "foo") -> Path:
+    path.mkdir(parents=True)
+    with (path / "dataset_description.json").open("w") as f:
+        json.dump({"Name": name, "Authors": ["Jane Doe"], "License": "CC0-1.0"}, f)
+    return path
+
+
+@pytest.fixture
+def archive(tmp_path) -> Path:
+    archive = tmp_path / "archive"
+    make_dataset(archive / "ds001")
+    make_dataset(archive / "lab" / "ds002")
+    # datasets nested in a dataset are not processed on their own
+    make_dataset(archive / "ds001" / "derivatives" / "fmriprep")
+    (archive / "not_a_dataset").mkdir()
+    return archive
+
+
+def test_find_datasets_directory(archive):
+    assert find_datasets(archive) == [archive / "ds001", archive / "lab" / "ds002"]
+
+
+def test_find_datasets_dataset(archive):
+    assert find_datasets(archive / "ds001") == [archive / "ds001"]
+
+
+def test_find_datasets_glob(archive):
+    assert find_datasets(f"{archive}/ds*") == [archive / "ds001"]
+
+
+def test_find_datasets_file(archive, tmp_path):
+    list_file = tmp_path / "datasets.txt"
+    list_file.write_text(f"# my datasets\n{archive / 'ds001'}\n\n{archive / 'lab/ds002'}\n")
+
+    assert find_datasets(list_file) == [archive / "ds001", archive / "lab" / "ds002"]
+
+
+def test_bids2cite_batch(archive, tmp_path):
+    datasets = [archive / "ds001", archive / "not_a_dataset", archive / "lab" / "ds002"]
+    summary_file = tmp_path / "summary.tsv"
+
+    results = bids2cite_batch(
+        datasets, n_jobs=2, summary_file=summary_file, output_format="datacite"
+    )
+
+    assert [x["status"] for x in results] == ["success", "failure", "success"]
+    assert "FileNotFoundError" in results[1]["error"]
+    assert (archive / "ds001" / "derivatives" / "bids2cite" / "datacite.yml").exists()
+    assert (archive / "lab" / "ds002" / "derivatives" / "bids2cite" / "LICENSE").exists()
+
+    summary = summary_file.read_text().splitlines()
+    assert summary[0] == "bids_dir\tstatus\tduration\terror"
+    assert len(summary) == 4
+
+
+def test_process_dataset_invalid_citation(archive, monkeypatch):
+    def fake_bids2cite(**kwargs):
+        raise jsonschema.ValidationError("[] should be non-empty")
+
+    monkeypatch.setattr("bids2cite._batch.bids2cite", fake_bids2cite)
+
+    result = _process_dataset(archive / "ds001", {})
+
+    assert result["status"] == "failure"
+    assert result["error"] == "Invalid CITATION.cff: [] should be non-empty"
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks.datasets import make_dataset, synthetic_orcid
+from benchmarks.run import run_benchmarks
+from benchmarks.stubs import PUBLIC_URLS, StubServer
+from bids2cite._authors import get_author_info_from_orcid, is_valid_orcid
+from bids2cite._http import configure_http, http_get
+
+
+@pytest.fixture(autouse=True)
+def reset_http():
+    yield
+    configure_http()
+
+
+def test_synthetic_orcid():
+    assert all(is_valid_orcid(synthetic_orcid(i)) for i in range(100))
+
+
+def test_make_dataset(tmp_path):
+    bids_dir = make_dataset(tmp_path / "ds", n_authors=3, n_references=4)
+    ds_desc = json.loads((bids_dir / "dataset_description.json").read_text())
+    assert len(ds_desc["Authors"]) == 3
+    assert len(ds_desc["ReferencesAndLinks"]) == 4
+
+
+def test_stub_server_errors():
+    server = StubServer("crossref", error_rate=1).start()
+    try:
+        configure_http(retries=0)
+        assert http_get(f"{server.url}/works/10.5555/foo").status_code == 503
+        assert server.requests == {"total": 1, "errors": 1}
+    finally:
+        server.stop()
+
+
+def test_orcid_sections_only():
+    orcids = [synthetic_orcid(i * 37) for i in range(3)]
+    server = StubServer("orcid").start()
+    try:
+        configure_http(endpoints={PUBLIC_URLS["orcid"]: server.url})
+        for orcid in orcids:
+            assert get_author_info_from_orcid(orcid)["affiliation"]
+    finally:
+        server.stop()
+
+    # the full record, with all the works, is never requested
+    assert server.paths == {
+        f"/v3.0/{orcid}/{section}": 1
+        for orcid in orcids
+        for section in ("person", "employments")
+    }
+
+
+def test_run_benchmarks():
+    records = run_benchmarks(sizes=[2])
+    results = {x["stage"]: x for x in records}
+
+    assert set(results) == {"authors", "references", "license", "outputs", "bids2cite"}
+    # the person and employments sections of each author
+    assert results["authors"]["requests"]["orcid"] == 4
+    assert results["references"]["requests"] == {
+        "orcid": 0,
+        "crossref": 1,
+        "ncbi": 1,
+        "github": 0,
+    }
+    assert results["license"]["requests"]["github"] == 1
+    assert results["bids2cite"]["requests"] == {
+        "orcid": 4,
+        "crossref": 1,
+        "ncbi": 1,
+        "github": 1,
+    }
+    assert all(x["peak_memory"] > 0 for x in records)
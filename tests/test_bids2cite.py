@@ -1,11 +1,18 @@
 from __future__ import annotations
 
 import json
+import logging
+import subprocess
+import sys
+import threading
 from pathlib import Path
 
 import pytest
 
-from bids2cite.bids2cite import _update_bidsignore, bids2cite
+from bids2cite._cache import get_cache
+from bids2cite._http import configure_http
+from bids2cite.bids2cite import _cli, _update_bidsignore, bids2cite
+from tests.conftest import SYNTHETIC_ORCID
 
 
 @pytest.fixture
@@ -46,10 +53,16 @@ def test_update_bidsignore_2(bids_dir, bidsignore) -> None:
 
 
 def test_bids2cite_datacite(
-    bids_dir, license_file, bidsignore, datacite, citation, dataset_description
+    http_archive,
+    synthetic_bids_dir,
+    license_file,
+    bidsignore,
+    datacite,
+    citation,
+    dataset_description,
 ) -> None:
     bids2cite(
-        bids_dir=bids_dir,
+        bids_dir=synthetic_bids_dir,
         output_format="datacite",
         description="add something",
         keywords=["foo", "bar"],
@@ -78,7 +91,8 @@ def test_bids2cite_datacite(
 
 
 def test_bids2cite_citation(
-    bids_dir,
+    http_archive,
+    synthetic_bids_dir,
     license_file,
     bidsignore,
     dataset_description,
@@ -86,7 +100,7 @@ def test_bids2cite_citation(
     citation,
 ) -> None:
     bids2cite(
-        bids_dir=bids_dir,
+        bids_dir=synthetic_bids_dir,
         output_format="citation",
         description="add something",
         keywords=["foo", "bar"],
@@ -99,3 +113,238 @@ def test_bids2cite_citation(
     assert dataset_description.exists()
     assert not datacite.exists()
     assert citation.exists()
+
+
+def test_bids2cite_resolves_concurrently(monkeypatch, bids_dir, dataset_description):
+    # each phase waits for the 2 others: this only passes if they run at the same time
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_update_authors(*args, **kwargs):
+        barrier.wait()
+        return [{"firstname": "Jane", "lastname": "Doe"}]
+
+    def fake_update_references(*args, **kwargs):
+        barrier.wait()
+        return [{"citation": "foo", "id": "doi:foo", "reftype": "IsSupplementTo"}]
+
+    def fake_update_license(*args, **kwargs):
+        barrier.wait()
+        return ("CC0-1.0", "https://creativecommons.org/publicdomain/zero/1.0/")
+
+    monkeypatch.setattr("bids2cite.bids2cite.update_authors", fake_update_authors)
+    monkeypatch.setattr("bids2cite.bids2cite.update_references", fake_update_references)
+    monkeypatch.setattr("bids2cite.bids2cite.update_license", fake_update_license)
+
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    with dataset_description.open("r") as f:
+        content = json.load(f)
+
+    assert content["Authors"] == ["Jane Doe"]
+    assert content["ReferencesAndLinks"] == ["foo"]
+    assert content["License"] == "CC0-1.0"
+
+
+@pytest.fixture
+def fake_lookups(monkeypatch):
+    """Replace the lookups by fakes counting how many times they are run."""
+    calls = {"authors": 0, "references": 0, "license": 0}
+
+    def fake_update_authors(ds_desc, *args, **kwargs):
+        calls["authors"] += 1
+        return [{"firstname": x, "lastname": ""} for x in ds_desc["Authors"]]
+
+    def fake_update_references(*args, **kwargs):
+        calls["references"] += 1
+        return []
+
+    def fake_update_license(*args, **kwargs):
+        calls["license"] += 1
+        return ("CC0-1.0", "")
+
+    monkeypatch.setattr("bids2cite.bids2cite.update_authors", fake_update_authors)
+    monkeypatch.setattr("bids2cite.bids2cite.update_references", fake_update_references)
+    monkeypatch.setattr("bids2cite.bids2cite.update_license", fake_update_license)
+    return calls
+
+
+def test_bids2cite_unchanged_inputs(bids_dir, datacite, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+    outputs = {x: x.stat().st_mtime_ns for x in datacite.parent.iterdir()}
+
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    assert fake_lookups == {"authors": 1, "references": 1, "license": 1}
+    assert {x: x.stat().st_mtime_ns for x in datacite.parent.iterdir()} == outputs
+
+
+def test_bids2cite_only_redo_changed_stages(bids_dir, datacite, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    ds_descr_file = bids_dir / "dataset_description.json"
+    ds_desc = json.loads(ds_descr_file.read_text())
+    ds_desc["Authors"].append("Jane Doe")
+    ds_descr_file.write_text(json.dumps(ds_desc))
+
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    assert fake_lookups == {"authors": 2, "references": 1, "license": 1}
+    assert "Jane Doe" in datacite.read_text()
+
+
+def test_bids2cite_modified_output(bids_dir, datacite, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+    content = datacite.read_text()
+    datacite.write_text("foo")
+
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    assert datacite.read_text() == content
+    assert fake_lookups == {"authors": 1, "references": 1, "license": 1}
+
+
+def test_bids2cite_no_cache_unchanged_inputs(bids_dir, datacite, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+
+    bids2cite(
+        bids_dir=bids_dir, output_format="datacite", skip_prompt=True, use_cache=False
+    )
+
+    assert fake_lookups == {"authors": 2, "references": 2, "license": 2}
+
+
+def test_bids2cite_no_cache_only_for_the_call(http_archive, synthetic_bids_dir):
+    bids2cite(
+        bids_dir=synthetic_bids_dir,
+        output_format="datacite",
+        skip_prompt=True,
+        max_workers=1,
+        use_cache=False,
+    )
+    assert get_cache().enabled
+    assert get_cache().info()["entries"] == {}
+
+    bids2cite(
+        bids_dir=synthetic_bids_dir,
+        output_format="datacite",
+        skip_prompt=True,
+        max_workers=1,
+        force=True,
+    )
+    assert get_cache().info()["entries"]["orcid"] > 0
+
+
+def test_bids2cite_force(bids_dir, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True)
+    bids2cite(bids_dir=bids_dir, output_format="datacite", skip_prompt=True, force=True)
+
+    assert fake_lookups == {"authors": 2, "references": 2, "license": 2}
+
+
+def test_bids2cite_several_formats(bids_dir, datacite, fake_lookups):
+    bids2cite(
+        bids_dir=bids_dir,
+        output_format="all",
+        skip_prompt=True,
+    )
+
+    assert fake_lookups == {"authors": 1, "references": 1, "license": 1}
+    output_dir = datacite.parent
+    for filename in [
+        "datacite.yml",
+        ".zenodo.json",
+        "dataset.bib",
+        "dataset.csl.json",
+        "codemeta.json",
+        "CITATION.cff",
+    ]:
+        assert (output_dir / filename).exists()
+
+
+def test_bids2cite_unknown_format(bids_dir):
+    with pytest.raises(ValueError, match="'foo'"):
+        bids2cite(bids_dir=bids_dir, output_format="datacite,foo", skip_prompt=True)
+
+
+def test_import_is_fast():
+    """Heavy dependencies must only be imported when they are needed."""
+    code = (
+        "import sys, time; start = time.perf_counter(); import bids2cite.bids2cite; "
+        "print(time.perf_counter() - start); print(','.join(sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    duration, modules = float(output[0]), set(output[1].split(","))
+
+    for module in [
+        "pandas",
+        "cffconvert",
+        "ruamel.yaml",
+        "requests",
+        "rich_argparse",
+        "rich.prompt",
+        "rich.traceback",
+    ]:
+        assert module not in modules
+    # generous limit: importing the heavy dependencies takes several times longer
+    assert duration < 0.3
+
+
+def test_cli_profile(bids_dir, tmp_path, fake_lookups):
+    trace_file = tmp_path / "profile.json"
+    try:
+        _cli(["bids2cite", str(bids_dir), "-s", "--profile", str(trace_file), "-vv"])
+    finally:
+        logging.getLogger("bids2datacite").setLevel("WARNING")
+
+    trace = json.loads(trace_file.read_text())
+    names = {x["name"] for x in trace["traceEvents"]}
+    assert {"inputs", "authors", "references", "license", "render datacite"} <= names
+
+
+def test_cli_replay(synthetic_bids_dir, root_test_dir, datacite):
+    archive = root_test_dir / "data" / "http_archive.json"
+    try:
+        _cli(["bids2cite", str(synthetic_bids_dir), "-s", "--replay", str(archive)])
+    finally:
+        configure_http()
+
+    # the author was found in the synthetic ORCID record
+    assert "affiliation: Example University\n" in datacite.read_text()
+
+
+def test_bids2cite_max_lookup_time(http_archive, synthetic_bids_dir, datacite, caplog):
+    bids2cite(
+        bids_dir=synthetic_bids_dir,
+        output_format="datacite",
+        skip_prompt=True,
+        max_lookup_time=0,
+    )
+
+    assert "Could not look up the following entries" in caplog.text
+    assert f"- Jane Doe, ORCID:{SYNTHETIC_ORCID}" in caplog.text
+    assert "affiliation: Example University\n" not in datacite.read_text()
+
+    # entries that were not looked up are looked up on the next run
+    bids2cite(bids_dir=synthetic_bids_dir, output_format="datacite", skip_prompt=True)
+
+    assert "affiliation: Example University\n" in datacite.read_text()
+
+
+def test_bids2cite_single_name_authors(bids_dir, citation, fake_lookups):
+    bids2cite(bids_dir=bids_dir, output_format="citation", skip_prompt=True)
+
+    assert "family-names" not in citation.read_text()
+
+
+def test_cli_invalid_citation(bids_dir, monkeypatch, caplog):
+    monkeypatch.setattr("bids2cite.bids2cite.update_authors", lambda *args, **kwargs: [])
+    monkeypatch.setattr(
+        "bids2cite.bids2cite.update_references", lambda *args, **kwargs: []
+    )
+
+    with pytest.raises(SystemExit):
+        _cli(["bids2cite", str(bids_dir), "-s", "--output-format", "citation"])
+
+    assert "Invalid CITATION.cff" in caplog.text
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bids2cite._cache import MetadataCache, cache_disabled, cached, get_cache
+from bids2cite._deadline import submit
+
+
+@pytest.fixture
+def cache(tmp_path) -> MetadataCache:
+    cache = MetadataCache(path=tmp_path / "metadata.sqlite", max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_cache_set_get(cache):
+    cache.set("orcid", " 0000-0002-9120-8098 ", {"firstname": "Melanie"})
+
+    assert cache.get("orcid", "0000-0002-9120-8098") == {"firstname": "Melanie"}
+    assert cache.get("crossref", "0000-0002-9120-8098") is None
+
+
+def test_cache_normalized_key(cache):
+    cache.set("crossref", "10.1016/J.NeuroImage.2019.116081", {"title": "foo"})
+
+    assert cache.get("crossref", "10.1016/j.neuroimage.2019.116081") == {"title": "foo"}
+
+
+def test_cache_ttl(cache):
+    cache.ttls["pubmed"] = -1
+    cache.set("pubmed", "33932337", {"title": "foo"})
+
+    assert cache.get("pubmed", "33932337") is None
+
+
+def test_cache_lru_eviction(cache):
+    cache.set("pubmed", "1", {"title": "1"})
+    cache.set("pubmed", "2", {"title": "2"})
+    cache.get("pubmed", "1")
+    cache.set("pubmed", "3", {"title": "3"})
+
+    assert cache.get("pubmed", "1") is not None
+    assert cache.get("pubmed", "2") is None
+    assert cache.get("pubmed", "3") is not None
+
+
+def test_cache_clear_and_info(cache):
+    cache.set("pubmed", "1", {"title": "1"})
+    cache.set("orcid", "1", {"firstname": "1"})
+
+    info = cache.info()
+    assert info["entries"] == {"orcid": 1, "pubmed": 1}
+    assert info["size"] > 0
+
+    assert cache.clear() == 2
+    assert cache.info()["entries"] == {}
+
+
+def test_cache_disabled(tmp_path):
+    cache = MetadataCache(path=tmp_path / "metadata.sqlite", enabled=False)
+    cache.set("pubmed", "1", {"title": "1"})
+
+    assert cache.get("pubmed", "1") is None
+    assert not cache.path.exists()
+
+
+def test_cached():
+    calls = []
+
+    @cached("pubmed")
+    def lookup(pmid):
+        calls.append(pmid)
+        return {"title": pmid} if pmid != "0" else None
+
+    assert lookup("1") == {"title": "1"}
+    assert lookup("1") == {"title": "1"}
+    assert lookup("0") is None
+    assert lookup("0") is None
+
+    assert calls == ["1", "0", "0"]
+    assert get_cache().info()["entries"] == {"pubmed": 1}
+
+
+def test_cache_disabled_block():
+    calls = []
+
+    @cached("pubmed")
+    def lookup(pmid):
+        calls.append(pmid)
+        return {"title": pmid}
+
+    with cache_disabled():
+        lookup("1")
+        # also in the threads given the context
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            submit(executor, lookup, "1").result()
+    assert get_cache().info()["entries"] == {}
+    lookup("1")
+    lookup("1")
+
+    assert calls == ["1", "1", "1"]
+    assert get_cache().info()["entries"] == {"pubmed": 1}
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bids2cite._deadline import (
+    collect_not_enriched,
+    duration,
+    lookup_deadline,
+    not_enriched,
+    remaining_lookup_time,
+    submit,
+)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("30", 30), ("30s", 30), (" 1.5m ", 90), ("2min", 120), ("1h", 3600)],
+)
+def test_duration(value, expected):
+    assert duration(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "-1s", "1d", "foo"])
+def test_duration_invalid(value):
+    with pytest.raises(ValueError, match="Invalid duration"):
+        duration(value)
+
+
+def test_lookup_deadline():
+    assert remaining_lookup_time() is None
+    with lookup_deadline(10):
+        assert 9 < remaining_lookup_time() <= 10
+        with lookup_deadline(None):
+            assert remaining_lookup_time() is None
+    assert remaining_lookup_time() is None
+
+
+def test_collect_not_enriched():
+    # nothing is collected outside of collect_not_enriched
+    not_enriched("foo")
+
+    with collect_not_enriched() as outer:
+        not_enriched(" bar ")
+        with collect_not_enriched() as inner:
+            not_enriched("baz")
+        assert inner == ["baz"]
+
+    assert outer == ["bar", "baz"]
+
+
+def test_submit_copies_context():
+    def work(entry):
+        not_enriched(entry)
+        return remaining_lookup_time()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with lookup_deadline(10), collect_not_enriched() as entries:
+            futures = [submit(executor, work, x) for x in ["foo", "bar"]]
+            remaining = [x.result() for x in futures]
+
+    assert all(x is not None and x > 0 for x in remaining)
+    assert sorted(entries) == ["bar", "foo"]
+
+
+def test_lookup_deadline_expires():
+    with lookup_deadline(0.01):
+        time.sleep(0.02)
+        assert remaining_lookup_time() < 0
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from bids2cite._deadline import lookup_deadline
+from bids2cite._http import TokenBucket, configure_http, get_session, http_get
+from bids2cite._profile import disable_profiling, enable_profiling
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answer 503 to the first request of each path, then 200."""
+
+    seen: set[str] = set()
+
+    def do_GET(self):
+        if self.path == "/slow":
+            # never answer in time
+            time.sleep(0.5)
+            return
+        if self.path == "/busy":
+            # asks to wait longer than the time allowed for lookups
+            self.send_response(429)
+            self.send_header("Retry-After", "60")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/flaky") and self.path not in self.seen:
+            self.seen.add(self.path)
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        body = self.headers["User-Agent"].encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_http():
+    yield
+    configure_http()
+
+
+def test_get_session_is_shared():
+    assert get_session() is get_session()
+
+
+def test_configure_http_resets_session():
+    session = get_session()
+    configure_http(retries=0)
+    assert get_session() is not session
+    assert get_session().get_adapter("https://").max_retries.total == 0
+
+
+def test_http_get(server):
+    response = http_get(f"{server}/foo")
+    assert response.status_code == 200
+    assert response.text.startswith("bids2cite/")
+
+
+def test_http_get_retries(server):
+    configure_http(backoff_factor=0)
+    assert http_get(f"{server}/flaky").status_code == 200
+
+
+def test_http_get_no_retry(server):
+    configure_http(retries=0)
+    assert http_get(f"{server}/flaky-no-retry").status_code == 503
+
+
+def test_http_get_timeout(server):
+    configure_http(read_timeout=0.1, retries=0)
+    with pytest.raises(requests.RequestException):
+        http_get(f"{server}/slow")
+
+
+def test_http_get_endpoints(server):
+    configure_http(endpoints={"https://api.crossref.org": server})
+    response = http_get("https://api.crossref.org/works/foo")
+    assert response.status_code == 200
+    assert response.url == f"{server}/works/foo"
+
+
+def test_http_get_profile(server):
+    configure_http(backoff_factor=0)
+    profiler = enable_profiling()
+    try:
+        http_get(f"{server}/flaky-profile")
+    finally:
+        disable_profiling()
+
+    (event,) = profiler.events
+    assert event["cat"] == "http"
+    assert event["args"]["status"] == 200
+    assert event["args"]["retries"] == 1
+    assert event["args"]["bytes"] > 0
+
+
+def test_http_get_no_time_left(server):
+    with lookup_deadline(0), pytest.raises(requests.Timeout, match="no time left"):
+        http_get(f"{server}/foo")
+
+
+def test_http_get_timeout_shortened(server):
+    configure_http(read_timeout=30, retries=0)
+    start = time.monotonic()
+    with lookup_deadline(0.1), pytest.raises(requests.RequestException):
+        http_get(f"{server}/slow")
+    assert time.monotonic() - start < 0.4
+
+
+def test_http_get_retry_after_past_deadline(server):
+    start = time.monotonic()
+    with lookup_deadline(1):
+        response = http_get(f"{server}/busy")
+    # the retry is not sent instead of waiting 60 s
+    assert response.status_code == 429
+    assert time.monotonic() - start < 1
+
+
+def test_http_get_retries_within_deadline(server):
+    configure_http(backoff_factor=0)
+    with lookup_deadline(1):
+        assert http_get(f"{server}/flaky-deadline").status_code == 200
+
+
+def test_http_get_backoff_past_deadline(server):
+    configure_http(backoff_factor=10)
+    start = time.monotonic()
+    with lookup_deadline(1), pytest.raises(requests.RequestException):
+        http_get("http://127.0.0.1:1/refused")
+    assert time.monotonic() - start < 1
+
+
+def test_http_get_mailto(server):
+    configure_http(mailto="jane@example.org")
+    assert http_get(f"{server}/foo").text.endswith("(mailto:jane@example.org)")
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=50)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # the first request is sent at once, then one every 20 ms
+    assert time.monotonic() - start >= 0.1
+
+
+def test_token_bucket_threads():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.1
+
+
+def test_token_bucket_no_time_left():
+    bucket = TokenBucket(rate=1)
+    bucket.acquire()
+    with lookup_deadline(0.5), pytest.raises(requests.Timeout, match="no time left"):
+        bucket.acquire()
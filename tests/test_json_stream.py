@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from bids2cite._json_stream import JsonStream
+
+DOCUMENT = {
+    "skipped": {"a": [1, {"b": ']}[{"\\\\'}], "c": "éè"},
+    "number": 123456.5,
+    "empty": [],
+    "literals": [True, False, None],
+    "nested": {"list": [{"x": 1}, {"x": 2}], "text": "café \U0001f600"},
+}
+
+
+def chunks(content, size):
+    data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_value(size):
+    assert JsonStream(chunks(DOCUMENT, size)).value() == DOCUMENT
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_iter_keys_and_skip(size):
+    stream = JsonStream(chunks(DOCUMENT, size))
+    content = {}
+    for key in stream.iter_keys():
+        if key in ["skipped", "literals"]:
+            stream.skip()
+        else:
+            content[key] = stream.value()
+
+    assert content == {
+        k: v for k, v in DOCUMENT.items() if k not in ["skipped", "literals"]
+    }
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_iter_elements(size):
+    stream = JsonStream(chunks([[1, 2], "a", {}, [], 3], size))
+    values = []
+    for i, _ in enumerate(stream.iter_elements()):
+        if i == 0:
+            values.append([x for x in stream.iter_elements() if not stream.skip()])
+        elif i == 3:
+            values.extend(list(stream.iter_elements()))
+        else:
+            values.append(stream.value())
+
+    assert values == [[None, None], "a", {}, 3]
+
+
+def test_stops_reading():
+    consumed = []
+
+    def generate():
+        yield b'{"first": 1, '
+        consumed.append(True)
+        yield b'"second": 2}'
+
+    stream = JsonStream(generate())
+    for key in stream.iter_keys():
+        assert key == "first"
+        assert stream.value() == 1
+        break
+
+    assert consumed == []
+
+
+@pytest.mark.parametrize("document", [b'{"a": [1, 2', b'"abc', b""])
+def test_truncated_document(document):
+    with pytest.raises(ValueError):
+        JsonStream([document]).skip()
+    with pytest.raises(ValueError):
+        JsonStream([document]).value()
+
+
+@pytest.mark.parametrize("document", [b"[1 2]", b'{"a" 1}', b"[1,]"])
+def test_invalid_document(document):
+    with pytest.raises(ValueError):
+        JsonStream([document]).value()
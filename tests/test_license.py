@@ -2,7 +2,19 @@ from __future__ import annotations
 
 import pytest
 
-from bids2cite._license import add_license_file, identify_license, update_license
+from bids2cite._license import (
+    COMMON_LICENSES,
+    add_license_file,
+    bundled_license_text,
+    find_license,
+    identify_license,
+    license_fingerprints,
+    license_index,
+    license_sketch,
+    match_license_text,
+    supported_licenses,
+    update_license,
+)
 
 
 def test_add_license_file(bids_dir, license_file):
@@ -18,6 +30,26 @@ def test_add_license_file(bids_dir, license_file):
     license_file.unlink(missing_ok=True)
 
 
+def test_add_license_file_offline(monkeypatch, bids_dir, license_file):
+    def fail(*args, **kwargs):
+        raise AssertionError("bundled licenses should not be downloaded")
+
+    monkeypatch.setattr("bids2cite._license.http_get", fail)
+
+    add_license_file("CC0-1.0", bids_dir / "derivatives" / "bids2cite")
+
+    assert "CC0 1.0 Universal" in license_file.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("license_type", COMMON_LICENSES)
+def test_bundled_license_text(license_type):
+    assert bundled_license_text(license_type)
+
+
+def test_bundled_license_text_missing():
+    assert bundled_license_text("foo") is None
+
+
 def test_update_license(bids_dir, license_file):
     output_dir = bids_dir / "derivatives" / "bids2cite"
 
@@ -38,6 +70,17 @@ def test_update_license(bids_dir, license_file):
     [
         ("CC0", "CC0-1.0"),
         ("CC-BY-NC-SA-4.0", "CC-BY-NC-SA-4.0"),
+        ("cc by-nc-sa 4.0", "CC-BY-NC-SA-4.0"),
+        ("Attribution-NonCommercial-ShareAlike 4.0", "CC-BY-NC-SA-4.0"),
+        ("Creative Commons Attribution 4.0", "CC-BY-4.0"),
+        ("Creative Commons Attribution 4.0 International", "CC-BY-4.0"),
+        ("https://creativecommons.org/licenses/by/4.0/legalcode", "CC-BY-4.0"),
+        ("http://www.creativecommons.org/licenses/by/4.0", "CC-BY-4.0"),
+        ("ODbL 1.0", "ODbL-1.0"),
+        ("Open Data Commons Public Domain Dedication & Licence 1.0", "PDDL-1.0"),
+        ("mit", "MIT"),
+        ("Apache License 2.0", "Apache-2.0"),
+        ("GPL-3.0", "GPL-3.0"),
         ("", ""),
         ("foo", "foo"),
     ],
@@ -48,3 +91,90 @@ def test_identify_license(input, expected):
     (name, _) = identify_license(ds_desc)
 
     assert name == expected
+
+
+def test_supported_licenses():
+    licenses = supported_licenses()
+
+    assert len(licenses) > 500
+    assert (
+        licenses["CC0-1.0"]["url"] == "https://creativecommons.org/publicdomain/zero/1.0/"
+    )
+    assert supported_licenses() is licenses
+
+
+def test_license_index():
+    index = license_index()
+
+    assert len(index) > len(supported_licenses())
+    assert all(name in supported_licenses() for name in index.values())
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("ODbL", "ODbL-1.0"),
+        ("Open Database License", "ODbL-1.0"),
+        ("ODC-By", "ODC-By-1.0"),
+        ("Open Data Commons Attribution License", "ODC-By-1.0"),
+        ("PDDL", "PDDL-1.0"),
+        ("CC-BY", "CC-BY-4.0"),
+        ("CC BY-SA", "CC-BY-SA-4.0"),
+        ("cc-by-nc-nd", "CC-BY-NC-ND-4.0"),
+        ("Creative Commons Attribution-ShareAlike", "CC-BY-SA-4.0"),
+        # an older version is not replaced by the current one
+        ("CC-BY-SA-3.0", "CC-BY-SA-3.0"),
+    ],
+)
+def test_find_license_without_version(value, expected):
+    assert find_license(value)["name"] == expected
+
+
+def test_find_license_without_version_ambiguous():
+    # Creative Commons or Open Data Commons Attribution
+    assert find_license("Attribution") is None
+
+
+def test_find_license_unknown():
+    assert find_license("foo") is None
+    assert find_license("") is None
+    assert find_license(None) is None
+
+
+@pytest.mark.parametrize("license_type", COMMON_LICENSES)
+def test_match_license_text(license_type):
+    (name, similarity) = match_license_text(bundled_license_text(license_type))
+
+    assert name == license_type
+    assert similarity > 0.9
+
+
+@pytest.mark.parametrize("license_type", ["CC-BY-4.0", "ODbL-1.0"])
+def test_license_fingerprints_match_license_sketch(license_type):
+    """The bundled fingerprints must be rebuilt if license_sketch changes.
+
+    See tools/build_license_data.py
+    """
+    fingerprint = license_fingerprints()[license_type]
+
+    assert fingerprint == license_sketch(bundled_license_text(license_type))
+
+
+def test_match_license_text_no_license():
+    assert match_license_text("") is None
+    assert match_license_text("This dataset contains fMRI data of 20 subjects.") is None
+
+
+@pytest.mark.parametrize("ds_license", ["", "Creative Commons BY something"])
+def test_update_license_from_license_file(bids_dir, ds_license):
+    output_dir = bids_dir / "derivatives" / "bids2cite"
+    with (bids_dir / "LICENSE.txt").open("w", encoding="utf-8") as f:
+        f.write("This dataset is made available under:\n\n")
+        f.write(bundled_license_text("ODbL-1.0"))
+
+    (license_name, license_url) = update_license(
+        bids_dir, output_dir, {"License": ds_license}, skip_prompt=True
+    )
+
+    assert license_name == "ODbL-1.0"
+    assert license_url == supported_licenses()["ODbL-1.0"]["url"]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from bids2cite._deadline import not_enriched
+from bids2cite._manifest import MANIFEST_FILENAME, Manifest, write_if_changed
+
+
+def test_run_stage(tmp_path):
+    manifest = Manifest(tmp_path)
+    assert manifest.run_stage("foo", [1], lambda: ["bar"]) == ["bar"]
+    manifest.is_up_to_date({})
+    manifest.save()
+
+    manifest = Manifest(tmp_path)
+    # the result of the last run is reused
+    assert manifest.run_stage("foo", [1], lambda: ["baz"]) == ["bar"]
+    assert manifest.run_stage("foo", [2], lambda: ["baz"]) == ["baz"]
+
+
+def test_run_stage_not_enriched(tmp_path):
+    def lookup():
+        not_enriched("Jane Doe, ORCID:0000-0002-9120-8098")
+        return ["Jane Doe"]
+
+    manifest = Manifest(tmp_path)
+    manifest.run_stage("authors", [1], lookup)
+    manifest.is_up_to_date({})
+    manifest.save()
+
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_up_to_date({})
+    assert manifest.run_stage("authors", [1], lambda: ["Doe, Jane"]) == ["Doe, Jane"]
+
+
+def test_run_stage_modified_output(tmp_path):
+    def create_file():
+        (tmp_path / "LICENSE").write_text("foo")
+        return 1
+
+    manifest = Manifest(tmp_path)
+    manifest.run_stage("license", [], create_file, ("LICENSE",))
+    manifest.save()
+
+    (tmp_path / "LICENSE").write_text("bar")
+
+    manifest = Manifest(tmp_path)
+    manifest.run_stage("license", [], create_file, ("LICENSE",))
+    assert (tmp_path / "LICENSE").read_text() == "foo"
+
+
+def test_is_up_to_date(tmp_path):
+    output = tmp_path / "foo.txt"
+    write_if_changed(output, "foo")
+
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_up_to_date({"bar": 1})
+    manifest.record_output(output)
+    manifest.save()
+
+    assert Manifest(tmp_path).is_up_to_date({"bar": 1})
+    assert not Manifest(tmp_path).is_up_to_date({"bar": 2})
+    assert not Manifest(tmp_path, reset=True).is_up_to_date({"bar": 1})
+
+    output.write_text("bar")
+    assert not Manifest(tmp_path).is_up_to_date({"bar": 1})
+
+
+def test_manifest_other_version(tmp_path):
+    (tmp_path / MANIFEST_FILENAME).write_text(json.dumps({"version": "0.0.0"}))
+    assert Manifest(tmp_path).previous == {}
+
+
+def test_write_if_changed(tmp_path):
+    output = tmp_path / "foo.txt"
+    assert write_if_changed(output, "foo")
+    assert not write_if_changed(output, "foo")
+    assert write_if_changed(output, "bar")
+
+
+def test_write_if_changed_is_atomic(tmp_path, monkeypatch):
+    output = tmp_path / "foo.txt"
+    write_if_changed(output, "foo")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("pathlib.Path.replace", fail)
+    with pytest.raises(OSError, match="disk full"):
+        write_if_changed(output, "bar")
+
+    assert output.read_text() == "foo"
+    assert list(tmp_path.iterdir()) == [output]
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import io
+import logging
+import tarfile
+
+import pytest
+
+from bids2cite._authors import get_author_info_from_orcid, parse_author, update_authors
+from bids2cite._orcid_index import (
+    _cli,
+    configure_orcid_index,
+    import_public_data_file,
+    parse_record_summary,
+)
+
+NAMESPACES = """xmlns:common="http://www.orcid.org/ns/common"
+    xmlns:record="http://www.orcid.org/ns/record"
+    xmlns:person="http://www.orcid.org/ns/person"
+    xmlns:personal-details="http://www.orcid.org/ns/personal-details"
+    xmlns:activities="http://www.orcid.org/ns/activities"
+    xmlns:employment="http://www.orcid.org/ns/employment"
+    xmlns:work="http://www.orcid.org/ns/work\""""
+
+
+def summary(
+    orcid: str,
+    given: str | None,
+    family: str | None,
+    employers: list[str],
+    ended: tuple[str, ...] = (),
+) -> str:
+    names = "".join(
+        f"<personal-details:{tag}>{name}</personal-details:{tag}>"
+        for tag, name in [("given-names", given), ("family-name", family)]
+        if name is not None
+    )
+    end_date = "<common:end-date><common:year>2020</common:year></common:end-date>"
+    groups = "".join(
+        f"""<activities:affiliation-group>
+            <employment:employment-summary put-code="1" visibility="public">
+                <common:role-title>Researcher</common:role-title>
+                {end_date if employer in ended else ""}
+                <common:organization>
+                    <common:name>{employer}</common:name>
+                </common:organization>
+            </employment:employment-summary>
+        </activities:affiliation-group>"""
+        for employer in employers
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<record:record path="/{orcid}" {NAMESPACES}>
+    <common:orcid-identifier>
+        <common:uri>https://orcid.org/{orcid}</common:uri>
+        <common:path>{orcid}</common:path>
+        <common:host>orcid.org</common:host>
+    </common:orcid-identifier>
+    <person:person path="/{orcid}/person">
+        <person:name visibility="public" path="{orcid}">{names}</person:name>
+    </person:person>
+    <activities:activities-summary path="/{orcid}/activities">
+        <activities:employments path="/{orcid}/employments">{groups}</activities:employments>
+        <activities:works path="/{orcid}/works"/>
+    </activities:activities-summary>
+</record:record>
+"""
+
+
+@pytest.fixture
+def summaries_archive(tmp_path):
+    files = {
+        "0000-0002-1535-9767.xml": summary(
+            "0000-0002-1535-9767", "Rémi", "Gau", ["UCLouvain", "Leipzig"]
+        ),
+        "0000-0002-9120-8098.xml": summary("0000-0002-9120-8098", "Melanie", "Ganz", []),
+        # deactivated records have no name
+        "0000-0002-1866-8645.xml": f"""<record:record {NAMESPACES}>
+            <common:orcid-identifier>
+                <common:path>0000-0002-1866-8645</common:path>
+            </common:orcid-identifier>
+        </record:record>""",
+        "broken.xml": "<record:record",
+        "README.txt": "not a record",
+    }
+    archive = tmp_path / "ORCID_2024_10_summaries.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            member = tarfile.TarInfo(f"ORCID_2024_10_summaries/767/{name}")
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+    return archive
+
+
+@pytest.fixture
+def orcid_index(tmp_path, summaries_archive):
+    index_path = tmp_path / "orcid.sqlite"
+    import_public_data_file(summaries_archive, index_path)
+    index = configure_orcid_index(index_path)
+    yield index
+    configure_orcid_index(None)
+
+
+def test_parse_record_summary():
+    content = summary("0000-0002-1535-9767", "Rémi", "Gau", ["UCLouvain", "Leipzig"])
+    assert parse_record_summary(content.encode("utf-8")) == {
+        "orcid": "0000-0002-1535-9767",
+        "firstname": "Rémi",
+        "lastname": "Gau",
+        "affiliation": "UCLouvain",
+    }
+
+
+def test_parse_record_summary_current_employment():
+    content = summary(
+        "0000-0002-1535-9767", "Rémi", "Gau", ["Leipzig", "UCLouvain"], ended=("Leipzig",)
+    )
+    assert parse_record_summary(content.encode("utf-8"))["affiliation"] == "UCLouvain"
+
+    content = summary(
+        "0000-0002-1535-9767",
+        "Rémi",
+        "Gau",
+        ["Leipzig", "UCLouvain"],
+        ended=("Leipzig", "UCLouvain"),
+    )
+    assert parse_record_summary(content.encode("utf-8"))["affiliation"] == "Leipzig"
+
+
+@pytest.mark.parametrize(
+    "given, family, firstname, lastname",
+    [("Melanie", None, "Melanie", ""), (None, "Ganz", "Ganz", "")],
+)
+def test_parse_author_from_index_single_name(
+    tmp_path, given, family, firstname, lastname
+):
+    archive = tmp_path / "summaries.tar"
+    data = summary("0000-0002-9120-8098", given, family, []).encode("utf-8")
+    with tarfile.open(archive, "w") as tar:
+        member = tarfile.TarInfo("summaries/098/0000-0002-9120-8098.xml")
+        member.size = len(data)
+        tar.addfile(member, io.BytesIO(data))
+    index_path = tmp_path / "orcid.sqlite"
+    import_public_data_file(archive, index_path)
+
+    configure_orcid_index(index_path)
+    try:
+        authors = update_authors(
+            {"Authors": ["0000-0002-9120-8098"]}, skip_prompt=True, max_workers=1
+        )
+    finally:
+        configure_orcid_index(None)
+
+    # the author is not dropped for not having a first name
+    assert authors == [
+        {
+            "firstname": firstname,
+            "lastname": lastname,
+            "affiliation": None,
+            "id": "ORCID:0000-0002-9120-8098",
+        }
+    ]
+
+
+def test_import_public_data_file(monkeypatch, tmp_path, summaries_archive):
+    monkeypatch.setattr("bids2cite._orcid_index.IMPORT_BATCH_SIZE", 1)
+    index_path = tmp_path / "orcid.sqlite"
+
+    assert import_public_data_file(summaries_archive, index_path) == 2
+    # importing again replaces the records
+    assert import_public_data_file(summaries_archive, index_path) == 2
+
+    index = configure_orcid_index(index_path)
+    try:
+        assert len(index) == 2
+        assert index.get("0000-0002-9120-8098") == {
+            "firstname": "Melanie",
+            "lastname": "Ganz",
+            "affiliation": None,
+            "id": "ORCID:0000-0002-9120-8098",
+        }
+        assert index.get("0000-0002-1866-8645") is None
+    finally:
+        configure_orcid_index(None)
+
+
+def test_parse_author_from_index(orcid_index):
+    # no request is sent: the test archive is not used
+    assert parse_author("Remi Gau, ORCID:0000-0002-1535-9767") == {
+        "firstname": "Rémi",
+        "lastname": "Gau",
+        "affiliation": "UCLouvain",
+        "id": "ORCID:0000-0002-1535-9767",
+    }
+    assert get_author_info_from_orcid("https://orcid.org/0000-0002-9120-8098")
+
+
+def test_configure_orcid_index_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        configure_orcid_index(tmp_path / "missing.sqlite")
+
+
+def test_cli(tmp_path, summaries_archive):
+    index_path = tmp_path / "orcid.sqlite"
+    try:
+        _cli(["bids2cite-orcid-index", str(summaries_archive), str(index_path)])
+    finally:
+        logging.getLogger("bids2datacite").setLevel("WARNING")
+
+    index = configure_orcid_index(index_path)
+    try:
+        assert len(index) == 2
+    finally:
+        configure_orcid_index(None)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from bids2cite._profile import (
+    count,
+    disable_profiling,
+    enable_profiling,
+    get_profiler,
+    span,
+)
+
+
+@pytest.fixture
+def profiler():
+    profiler = enable_profiling()
+    yield profiler
+    disable_profiling()
+
+
+def test_span_disabled():
+    assert get_profiler() is None
+    with span("foo") as event:
+        assert event is None
+    count("bar")
+
+
+def test_span(profiler):
+    with span("foo", "http", url="https://foo.org") as event:
+        event["bytes"] = 2048
+    with span("foo", "http") as event:
+        event["retries"] = 1
+    count("cache hit: orcid")
+    count("cache hit: orcid")
+
+    assert [x["name"] for x in profiler.events] == ["foo", "foo"]
+    assert profiler.events[0]["args"] == {"url": "https://foo.org", "bytes": 2048}
+    assert profiler.counters == {"cache hit: orcid": 2}
+
+    (row,) = profiler.summary()
+    assert row["count"] == 2
+    assert row["bytes"] == 2048
+    assert row["retries"] == 1
+
+    profiler.print_summary()
+
+
+def test_write_trace(profiler, tmp_path):
+    with span("foo"):
+        pass
+    trace_file = tmp_path / "trace.json"
+    profiler.write_trace(trace_file)
+
+    trace = json.loads(trace_file.read_text())
+    (event,) = trace["traceEvents"]
+    assert event["ph"] == "X"
+    assert event["dur"] >= 0
+
+
+def test_disable_profiling(profiler):
+    assert disable_profiling() is profiler
+    assert get_profiler() is None
+
+
+def test_import_does_not_import_rich():
+    code = "import sys, bids2cite._profile; print('rich' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output == "False\n"
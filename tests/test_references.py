@@ -1,8 +1,79 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
+from urllib.parse import unquote
+
 import pytest
 
-from bids2cite._references import get_reference_id, references_for_datacite
+from bids2cite._http import configure_http
+from bids2cite._references import (
+    crossref_limits,
+    get_reference_id,
+    get_reference_info_from_doi,
+    get_references_info_from_dois,
+    get_references_info_from_pmids,
+    read_crossref_work,
+    references_for_datacite,
+    update_references,
+)
+from tests.conftest import SYNTHETIC_DOI
+
+# lookups are answered from tests/data/http_archive.json
+pytestmark = pytest.mark.usefixtures("http_archive")
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return self.content
+
+
+class FakeStreamedResponse(FakeResponse):
+    def iter_content(self, chunk_size):
+        yield json.dumps({"status": "ok", "message": self.content}).encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def pubmed_summary(pmid):
+    return {
+        "uid": pmid,
+        "title": f"title {pmid}",
+        "fulljournalname": "Neuron",
+        "pubdate": "2021 Jun 2",
+        "authors": [{"name": "Gau R"}, {"name": "Noble S"}],
+        "articleids": [{"idtype": "doi", "value": f"10.666/{pmid}"}],
+    }
+
+
+@pytest.fixture
+def fake_esummary(monkeypatch):
+    requested = []
+
+    def fake_get(url, params=None, **kwargs):
+        pmids = params["id"].split(",")
+        requested.append(pmids)
+        result = {"uids": pmids}
+        for pmid in pmids:
+            if pmid == "0":
+                result[pmid] = {"uid": pmid, "error": "cannot get document summary"}
+            else:
+                result[pmid] = pubmed_summary(pmid)
+        return FakeResponse({"result": result})
+
+    monkeypatch.setattr("bids2cite._references.http_get", fake_get)
+    monkeypatch.setattr("bids2cite._references.PUBMED_REQUEST_INTERVAL", 0)
+    return requested
 
 
 @pytest.mark.parametrize(
@@ -25,3 +96,227 @@ def test_references_for_datacite():
     )
 
     assert tmp == ["foobarbaz"]
+
+
+def test_get_references_info_from_pmids(fake_esummary):
+    info = get_references_info_from_pmids(["1", "2", "0", "1"])
+
+    assert fake_esummary == [["1", "2", "0"]]
+    assert info["0"] is None
+    assert info["2"] == {
+        "title": "title 2",
+        "journal": "Neuron",
+        "year": "2021",
+        "authors": ["Gau R", "Noble S"],
+        "doi": "10.666/2",
+    }
+
+    # already fetched PMIDs come from the cache
+    get_references_info_from_pmids(["1", "3"])
+    assert fake_esummary == [["1", "2", "0"], ["3"]]
+
+
+def test_get_references_info_from_pmids_batches(monkeypatch, fake_esummary):
+    monkeypatch.setattr("bids2cite._references.PUBMED_BATCH_SIZE", 2)
+
+    info = get_references_info_from_pmids(["1", "2", "3"])
+
+    assert fake_esummary == [["1", "2"], ["3"]]
+    assert list(info) == ["1", "2", "3"]
+
+
+def test_update_references_pubmed(fake_esummary):
+    ds_desc = {
+        "ReferencesAndLinks": [
+            "pmid:1",
+            "foo",
+            "https://www.ncbi.nlm.nih.gov/pubmed/2",
+            "pmid:0",
+        ]
+    }
+
+    references = update_references(ds_desc, skip_prompt=True)
+
+    assert fake_esummary == [["1", "2", "0"]]
+    assert [x["citation"] for x in references] == [
+        "Gau R, Noble S; title 1; Neuron; 2021; pmid:1",
+        "foo",
+        "Gau R, Noble S; title 2; Neuron; 2021; pmid:2",
+        "pmid:0",
+    ]
+
+
+def test_get_reference_info_from_doi():
+    info = get_reference_info_from_doi(SYNTHETIC_DOI)
+
+    assert info["journal"] == "Example Journal"
+    assert info["year"] == 2019
+    assert info["authors"] == ["Jane, Doe", "John, Smith", "Example Consortium"]
+
+
+@pytest.mark.parametrize(
+    "missing, expected",
+    [
+        ("author", {"authors": []}),
+        ("short-container-title", {"journal": ""}),
+        ("created", {"year": ""}),
+        ("title", {"title": ""}),
+    ],
+)
+def test_get_reference_info_from_doi_missing_field(monkeypatch, missing, expected):
+    work = {
+        "DOI": "10.5555/foo",
+        "title": ["foo"],
+        "short-container-title": ["Neuron"],
+        "created": {"date-parts": [[2020, 1, 1]]},
+        "author": [{"name": "ENIGMA Consortium"}],
+    }
+    del work[missing]
+    monkeypatch.setattr(
+        "bids2cite._references.http_get",
+        lambda *args, **kwargs: FakeStreamedResponse(work),
+    )
+
+    info = get_reference_info_from_doi("10.5555/foo")
+
+    assert info == {
+        "title": "foo",
+        "journal": "Neuron",
+        "year": 2020,
+        "authors": ["ENIGMA Consortium"],
+        "doi": "10.5555/foo",
+        **expected,
+    }
+
+
+@pytest.mark.network
+def test_get_reference_info_from_doi_crossref():
+    info = get_reference_info_from_doi("10.1016/j.neuroimage.2019.116081")
+
+    assert info["journal"] == "NeuroImage"
+    assert info["year"] == 2019
+    assert info["authors"][:2] == ["César, Caballero-Gaudes", "Stefano, Moia"]
+
+
+def test_get_reference_info_from_doi_not_found():
+    assert get_reference_info_from_doi("10.666/not.recorded") is None
+
+
+def consortium_work(authors_first):
+    authors = [{"given": f"Given{i}", "family": f"Family{i}"} for i in range(5000)]
+    fields = {
+        "DOI": "10.666/enigma",
+        "title": ["ENIGMA"],
+        "short-container-title": ["Neuron"],
+        "created": {"date-parts": [[2020, 1, 1]]},
+    }
+    work = (
+        {"author": authors, **fields} if authors_first else {**fields, "author": authors}
+    )
+    work["reference"] = [{"key": f"ref{i}"} for i in range(5000)]
+    content = {"status": "ok", "message-type": "work", "message": work}
+    return json.dumps(content).encode()
+
+
+@pytest.mark.parametrize("authors_first", [True, False])
+def test_read_crossref_work(authors_first):
+    data = consortium_work(authors_first)
+    read = []
+
+    def chunks():
+        for i in range(0, len(data), 1024):
+            read.append(i)
+            yield data[i : i + 1024]
+
+    work = read_crossref_work(chunks(), max_authors=5)
+
+    assert work["title"] == ["ENIGMA"]
+    assert work["created"] == {"date-parts": [[2020, 1, 1]]}
+    assert [x["family"] for x in work["author"]] == [f"Family{i}" for i in range(5)]
+    # reading stops before the references
+    assert len(read) * 1024 < data.index(b'"reference"') + 1024
+    if not authors_first:
+        # and the authors after the first ones
+        assert len(read) * 1024 < len(data) / 100
+
+
+def test_read_crossref_work_not_found():
+    content = {"status": "failed", "message": []}
+    assert read_crossref_work([json.dumps(content).encode()], max_authors=5) is None
+
+
+def test_get_reference_info_from_doi_with_comma(monkeypatch):
+    # Crossref splits filters on commas: the DOI must be in the path
+    doi = "10.1002/(SICI)1097-0258(19980815/30)17:15/16<1661::AID-SIM968>3.0.CO;2-2,x"
+    work = json.loads(consortium_work(authors_first=False))["message"]
+    work["DOI"] = doi
+    requested = []
+
+    def fake_get(url, params=None, **kwargs):
+        requested.append((url, params))
+        return FakeStreamedResponse(work)
+
+    monkeypatch.setattr("bids2cite._references.http_get", fake_get)
+
+    assert get_reference_info_from_doi(doi)["doi"] == doi
+    url, params = requested[0]
+    assert params is None
+    assert "," not in url
+    assert unquote(url) == f"https://api.crossref.org/works/{doi}"
+
+
+@pytest.fixture
+def fake_crossref(monkeypatch):
+    """Replace the DOI lookup by a fake recording the highest number of parallel calls."""
+    calls = {"running": 0, "max_running": 0}
+    lock = threading.Lock()
+
+    def fake_get_reference_info_from_doi(doi):
+        with lock:
+            calls["running"] += 1
+            calls["max_running"] = max(calls["max_running"], calls["running"])
+        time.sleep(0.02)
+        with lock:
+            calls["running"] -= 1
+        return None if doi == "missing" else {"doi": doi}
+
+    monkeypatch.setattr(
+        "bids2cite._references.get_reference_info_from_doi",
+        fake_get_reference_info_from_doi,
+    )
+    monkeypatch.setattr(
+        "bids2cite._references.CROSSREF_LIMITS",
+        {
+            "public": (1000, 1),
+            "polite": (1000, 3),
+        },
+    )
+    return calls
+
+
+@pytest.mark.parametrize("mailto, max_running", [(None, 1), ("jane@example.org", 3)])
+def test_get_references_info_from_dois(fake_crossref, mailto, max_running):
+    configure_http(mailto=mailto)
+    dois = [f"10.5555/{i}" for i in range(8)] + ["missing", "10.5555/0"]
+
+    info = get_references_info_from_dois(dois, max_workers=8)
+
+    assert list(info) == dois[:-1]
+    assert info["10.5555/3"] == {"doi": "10.5555/3"}
+    assert info["missing"] is None
+    assert fake_crossref["max_running"] == max_running
+
+
+def test_get_references_info_from_dois_not_crossref(fake_crossref):
+    # replayed requests are not limited
+    assert crossref_limits() is None
+    get_references_info_from_dois([f"10.5555/{i}" for i in range(8)], max_workers=4)
+    assert fake_crossref["max_running"] == 4
+
+
+def test_crossref_limits():
+    # single work requests, not replayed
+    configure_http()
+    assert crossref_limits() == (5, 1)
+    configure_http(mailto="jane@example.org")
+    assert crossref_limits() == (10, 3)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bids2cite._server import Bids2citeService, make_server
+from tests.conftest import SYNTHETIC_DOI, SYNTHETIC_ORCID
+
+
+@pytest.fixture
+def service(http_archive):
+    return Bids2citeService(max_workers=2, n_jobs=2)
+
+
+@pytest.fixture
+def server(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def request(address, method, path, content=None, connection=None):
+    connection = connection or http.client.HTTPConnection(*address, timeout=10)
+    body = None if content is None else json.dumps(content)
+    try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_health(server):
+    status, content = request(server, "GET", "/health")
+    assert status == 200
+    assert content["status"] == "ok"
+
+
+def test_not_found(server):
+    assert request(server, "GET", "/foo")[0] == 404
+    assert request(server, "POST", "/foo", {})[0] == 404
+
+
+def test_inline_dataset_description(server):
+    ds_desc = {
+        "Name": "foo",
+        "Authors": [f"Jane Doe, ORCID:{SYNTHETIC_ORCID}"],
+        "ReferencesAndLinks": [f"doi:{SYNTHETIC_DOI}"],
+        "License": "CC0-1.0",
+    }
+    status, content = request(
+        server,
+        "POST",
+        "/bids2cite",
+        {"dataset_description": ds_desc, "output_format": "citation,zenodo"},
+    )
+
+    assert status == 200
+    assert content["status"] == "success"
+    assert set(content["files"]) == {
+        "dataset_description.json",
+        "CITATION.cff",
+        ".zenodo.json",
+    }
+    assert "family-names: Doe" in content["files"]["CITATION.cff"]
+    assert content["not_enriched"] == []
+
+
+def test_bids_dir(server, bids_dir):
+    status, content = request(
+        server, "POST", "/bids2cite", {"bids_dir": str(bids_dir), "max_lookup_time": 0}
+    )
+
+    assert status == 200
+    assert (bids_dir / "derivatives" / "bids2cite" / "datacite.yml").exists()
+    assert content["output_dir"] == str(bids_dir / "derivatives" / "bids2cite")
+    assert "Remi Gau, ORCID:0000-0002-1535-9767" in content["not_enriched"]
+
+
+def test_concurrent_requests_same_dataset(server, synthetic_bids_dir):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda _: request(
+                    server, "POST", "/bids2cite", {"bids_dir": str(synthetic_bids_dir)}
+                ),
+                range(4),
+            )
+        )
+
+    assert all(status == 200 for status, _ in results)
+    assert len({x["files"]["datacite.yml"] for _, x in results}) == 1
+
+
+@pytest.mark.parametrize(
+    "content,error",
+    [
+        ([], "JSON object"),
+        ({}, "'bids_dir' or 'dataset_description'"),
+        ({"bids_dir": "/not/a/dataset"}, "dataset_description.json not found"),
+        ({"dataset_description": {}}, "'Name'"),
+        ({"bids_dir": ".", "output_format": "foo"}, "'foo'"),
+        ({"bids_dir": ".", "force": "yes"}, "'force'"),
+        ({"bids_dir": ".", "max_lookup_time": True}, "'max_lookup_time'"),
+    ],
+)
+def test_invalid_request(server, content, error):
+    status, answer = request(server, "POST", "/bids2cite", content)
+    assert status == 400
+    assert error in answer["error"]
+
+
+def test_invalid_json(server):
+    connection = http.client.HTTPConnection(*server, timeout=10)
+    try:
+        connection.request("POST", "/bids2cite", body="{")
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Invalid JSON" in json.loads(response.read())["error"]
+    finally:
+        connection.close()
+
+
+class UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost", timeout=10)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no Unix socket on Windows")
+def test_unix_socket(service, tmp_path):
+    unix_socket = tmp_path / "bids2cite.sock"
+    server = make_server(service, unix_socket=unix_socket)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, content = request(
+            None, "GET", "/health", connection=UnixConnection(str(unix_socket))
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert status == 200
+    assert content["status"] == "ok"
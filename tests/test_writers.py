@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+
+import jsonschema
+import pytest
+
+from bids2cite._writers import (
+    WRITERS,
+    Metadata,
+    citation_validator,
+    load_writers,
+    parse_output_formats,
+    render_bibtex,
+    render_citation,
+    render_codemeta,
+    render_csl_json,
+    render_zenodo,
+    write_outputs,
+)
+
+
+@pytest.fixture
+def metadata() -> Metadata:
+    return Metadata(
+        name="The mother of all experiments",
+        description="add something",
+        keywords=["foo", "bar"],
+        authors=[
+            {"firstname": "Paul", "lastname": "Broca"},
+            {
+                "firstname": "Remi",
+                "lastname": "Gau",
+                "id": "ORCID:0000-0002-1535-9767",
+                "affiliation": "UCLouvain",
+            },
+        ],
+        references=[
+            {"citation": "Foo; bar_baz", "id": "doi:10.1234/foo", "reftype": "IsSupplementTo"},
+            {"citation": "Baz", "id": "pmid:123", "reftype": "IsSupplementTo"},
+        ],
+        funding=["EU, EU.12345"],
+        license_name="CC0-1.0",
+        license_url="https://creativecommons.org/publicdomain/zero/1.0/",
+        doi="10.0.2.3/dfjj.10",
+    )
+
+
+@pytest.mark.parametrize(
+    "output_format, expected",
+    [
+        ("datacite", ["datacite"]),
+        ("datacite, citation", ["datacite", "citation"]),
+        ("citation,Citation", ["citation"]),
+        (["zenodo", "bibtex"], ["zenodo", "bibtex"]),
+        ("all", list(WRITERS)),
+    ],
+)
+def test_parse_output_formats(output_format, expected):
+    assert parse_output_formats(output_format) == expected
+
+
+@pytest.mark.parametrize("output_format", ["foo", "datacite,foo", ""])
+def test_parse_output_formats_error(output_format):
+    with pytest.raises(ValueError):
+        parse_output_formats(output_format)
+
+
+def test_render_zenodo(metadata):
+    zenodo = json.loads(render_zenodo(metadata))
+    assert zenodo["upload_type"] == "dataset"
+    assert zenodo["creators"][1] == {
+        "name": "Gau, Remi",
+        "orcid": "0000-0002-1535-9767",
+        "affiliation": "UCLouvain",
+    }
+    assert zenodo["license"] == "cc0-1.0"
+    assert zenodo["related_identifiers"] == [
+        {"identifier": "10.1234/foo", "relation": "isSupplementTo", "scheme": "doi"}
+    ]
+
+
+def test_render_bibtex(metadata):
+    bibtex = render_bibtex(metadata)
+    assert bibtex.startswith("@misc{broca_the_mother_of,\n")
+    assert "  author = {Broca, Paul and Gau, Remi},\n" in bibtex
+    assert "  doi = {10.0.2.3/dfjj.10},\n" in bibtex
+    assert bibtex.endswith("}\n")
+
+
+def test_render_csl_json(metadata):
+    (item,) = json.loads(render_csl_json(metadata))
+    assert item["type"] == "dataset"
+    assert item["author"][0] == {"family": "Broca", "given": "Paul"}
+    assert item["DOI"] == "10.0.2.3/dfjj.10"
+
+
+def test_render_codemeta(metadata):
+    codemeta = json.loads(render_codemeta(metadata))
+    assert codemeta["@type"] == "Dataset"
+    assert codemeta["author"][1]["@id"] == "https://orcid.org/0000-0002-1535-9767"
+    assert codemeta["license"] == metadata.license_url
+    assert codemeta["referencePublication"][0]["identifier"] == "https://doi.org/10.1234/foo"
+
+
+def test_write_outputs(tmp_path, metadata):
+    written = {}
+    files = write_outputs(
+        metadata,
+        tmp_path,
+        ["citation", "datacite"],
+        write=lambda path, content: (
+            written.update({path.name: content}),
+            path.write_text(content),
+        ),
+    )
+    assert files == [tmp_path / "CITATION.cff", tmp_path / "datacite.yml"]
+    assert "cff-version: 1.2.0" in written["CITATION.cff"]
+    assert "templateversion: 1.2" in written["datacite.yml"]
+
+
+def test_render_citation(metadata):
+    citation = render_citation(metadata)
+    assert "cff-version: 1.2.0" in citation
+    assert "value: 10.1234/foo" in citation
+
+
+def test_render_citation_without_identifiers(metadata):
+    metadata.references = []
+    metadata.license_name = ""
+    citation = render_citation(metadata)
+    assert "identifiers" not in citation
+    assert "license" not in citation
+
+
+def test_render_citation_invalid(metadata):
+    metadata.authors = []
+    with pytest.raises(jsonschema.ValidationError):
+        render_citation(metadata)
+
+
+def test_citation_validator_is_cached():
+    assert citation_validator() is citation_validator()
+
+
+def test_load_writers():
+    load_writers()
+
+    assert citation_validator.cache_info().currsize == 1
+
+
+def test_write_outputs_invalid(tmp_path, metadata):
+    metadata.authors = []
+    with pytest.raises(jsonschema.ValidationError):
+        write_outputs(
+            metadata,
+            tmp_path,
+            ["datacite", "citation"],
+            write=lambda path, content: path.write_text(content),
+        )
+    # nothing is written if one of the outputs is not valid
+    assert list(tmp_path.iterdir()) == []
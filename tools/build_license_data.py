@@ -0,0 +1,203 @@
+"""Build the license data bundled with bids2cite.
+
+- bids2cite/data/spdx_licenses.json.gz: the licenses of the SPDX license list
+  with their names and URLs, read by supported_licenses().
+- bids2cite/data/license_fingerprints.json.gz: the fingerprints of the
+  license texts, read by license_fingerprints().
+
+Names come from the SPDX license list (spdx-license-list package),
+URLs and license texts from the ScanCode LicenseDB
+(licensedcode/data/licenses of the scancode-toolkit-mini wheel).
+Run from the root of the repository, with bids2cite installed::
+
+    pip install spdx-license-list==3.29.0
+    pip download --no-deps scancode-toolkit-mini==32.5.0
+    unzip scancode_toolkit_mini-32.5.0-*.whl 'licensedcode/data/licenses/*' -d scancode
+    python tools/build_license_data.py scancode/licensedcode/data/licenses
+
+The outputs do not depend on when they are built:
+rebuilding from the same inputs gives the same files.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import gzip
+import json
+import struct
+import sys
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+from ruamel.yaml import YAML
+
+from bids2cite._license import license_sketch
+
+DATA_DIR = Path(__file__).parents[1] / "bids2cite" / "data"
+
+# licenses available from the GitHub licenses API
+GITHUB_LICENSES = {
+    "0BSD", "AFL-3.0", "AGPL-3.0", "Apache-2.0", "Artistic-2.0", "BSD-2-Clause",
+    "BSD-3-Clause", "BSD-3-Clause-Clear", "BSD-4-Clause", "BSL-1.0", "CC-BY-4.0",
+    "CC-BY-SA-4.0", "CC0-1.0", "ECL-2.0", "EPL-1.0", "EPL-2.0", "EUPL-1.1", "EUPL-1.2",
+    "GPL-2.0", "GPL-3.0", "ISC", "LGPL-2.1", "LGPL-3.0", "LPPL-1.3c", "MIT", "MIT-0",
+    "MPL-2.0", "MS-PL", "MS-RL", "MulanPSL-2.0", "NCSA", "ODbL-1.0", "OFL-1.1",
+    "OSL-3.0", "PostgreSQL", "Unlicense", "UPL-1.0", "Vim", "WTFPL", "Zlib",
+}  # fmt: skip
+
+# URLs and values bids2cite recognized before using the SPDX license list
+EXTRA: dict[str, dict[str, Any]] = {
+    "CC0-1.0": {
+        "url": "https://creativecommons.org/publicdomain/zero/1.0/",
+        "aliases": ["cc0", "creative commons zero"],
+    },
+    "CC-BY-NC-SA-4.0": {
+        "url": "https://creativecommons.org/licenses/by-nc-sa/4.0/",
+        "aliases": ["attribution-noncommercial-sharealike 4.0"],
+    },
+    "PDDL-1.0": {
+        "url": "https://opendatacommons.org/licenses/pddl/1-0/",
+        "api_url": "https://opendatacommons.org/licenses/pddl/pddl-10.txt",
+        "aliases": ["pddl", "public domain dedication and license 1.0"],
+    },
+}
+
+# texts shorter than this are notices pointing to the license, not license texts
+MIN_TEXT_WORDS = 20
+
+
+def read_scancode_licenses(directory: Path) -> dict[str, tuple[dict[str, Any], str]]:
+    """Return the metadata and text of the ScanCode licenses by SPDX identifier.
+
+    Each .LICENSE file starts with its metadata as YAML front matter.
+    Only the first license of each SPDX identifier is kept.
+    """
+    yaml = YAML(typ="safe")
+    licenses: dict[str, tuple[dict[str, Any], str]] = {}
+    for file in sorted(directory.glob("*.LICENSE")):
+        lines = file.read_text(encoding="utf-8").split("\n")
+        separators = [i for i, line in enumerate(lines) if line == "---"]
+        meta = yaml.load("\n".join(lines[separators[0] + 1 : separators[1]]))
+        key = meta.get("spdx_license_key")
+        if not key or key.startswith("LicenseRef") or key in licenses:
+            continue
+        licenses[key] = (meta, "\n".join(lines[separators[1] + 1 :]))
+    return licenses
+
+
+def _https(url: str) -> str:
+    return "https://" + url[len("http://") :] if url.startswith("http://") else url
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc.removeprefix("www.")
+
+
+def build_registry(
+    spdx_licenses: dict[str, Any], scancode: dict[str, tuple[dict[str, Any], str]]
+) -> list[dict[str, Any]]:
+    """Return an entry for each license of the SPDX license list.
+
+    The values of an entry are the aliases used to recognize the license:
+    its names and the URLs of its home page and texts.
+    """
+    registry = []
+    for spdx_id, spdx_license in spdx_licenses.items():
+        meta = scancode.get(spdx_id, ({}, ""))[0]
+        homepage = meta.get("homepage_url")
+        urls = [
+            x
+            for x in [homepage, *(meta.get("text_urls") or []), meta.get("osi_url")]
+            if x
+        ]
+        # other URLs are also articles about the license: only keep its own sites
+        hosts = {_host(x) for x in urls}
+        urls += [x for x in meta.get("other_urls") or [] if _host(x) in hosts]
+
+        aliases = [spdx_license.name]
+        for key in ("short_name", "name"):
+            if meta.get(key) and meta[key] not in aliases:
+                aliases.append(meta[key])
+        aliases += list(dict.fromkeys(urls))
+
+        entry: dict[str, Any] = {
+            "name": spdx_id,
+            "title": spdx_license.name,
+            "url": (
+                _https(homepage)
+                if homepage
+                else f"https://spdx.org/licenses/{spdx_id}.html"
+            ),
+        }
+        if spdx_license.deprecated_id:
+            entry["deprecated"] = True
+        github_key = spdx_id.removesuffix("-only").removesuffix("-or-later")
+        if github_key in GITHUB_LICENSES:
+            entry["api_url"] = f"https://api.github.com/licenses/{github_key.lower()}"
+        extra = EXTRA.get(spdx_id, {})
+        entry.update({k: v for k, v in extra.items() if k != "aliases"})
+        entry["values"] = extra.get("aliases", []) + aliases
+        registry.append(entry)
+    return registry
+
+
+def build_fingerprints(
+    names: set[str], scancode: dict[str, tuple[dict[str, Any], str]]
+) -> dict[str, str]:
+    """Return the fingerprints of the license texts of the registry.
+
+    Each fingerprint is stored as base64 encoded little-endian uint32.
+    License exceptions are left out: they are added to a license, not used alone.
+    """
+    fingerprints = {}
+    for key, (meta, text) in scancode.items():
+        if key not in names or meta.get("is_exception"):
+            continue
+        if len(text.split()) < MIN_TEXT_WORDS:
+            continue
+        sketch = license_sketch(text)
+        packed = struct.pack(f"<{len(sketch)}I", *sketch)
+        fingerprints[key] = base64.b64encode(packed).decode()
+    return fingerprints
+
+
+def write_data(path: Path, spdx_version: str, licenses: Any) -> None:
+    """Write compressed JSON data that does not change if rebuilt."""
+    content = {"spdx_license_list_version": spdx_version, "licenses": licenses}
+    data = json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode()
+    path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    print(f"{path}: {len(licenses)} licenses")
+
+
+def main(argv: list[str] = sys.argv) -> None:
+    """Build the license data bundled with bids2cite."""
+    import spdx_license_list
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "scancode_licenses",
+        help="licensedcode/data/licenses directory of scancode-toolkit-mini.",
+        type=Path,
+    )
+    parser.add_argument(
+        "--output-dir", help="Defaults to bids2cite/data.", type=Path, default=DATA_DIR
+    )
+    args = parser.parse_args(argv[1:])
+
+    spdx_version = ".".join(version("spdx-license-list").split(".")[:2])
+    scancode = read_scancode_licenses(args.scancode_licenses)
+
+    registry = build_registry(spdx_license_list.LICENSES, scancode)
+    write_data(args.output_dir / "spdx_licenses.json.gz", spdx_version, registry)
+
+    fingerprints = build_fingerprints({x["name"] for x in registry}, scancode)
+    write_data(
+        args.output_dir / "license_fingerprints.json.gz", spdx_version, fingerprints
+    )
+
+
+if __name__ == "__main__":
+    main()